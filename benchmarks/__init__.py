@@ -0,0 +1,56 @@
+"""
+Benchmarks for schemaish.
+
+Each module can be run as a script from the top of the source tree, e.g.::
+
+    python -m benchmarks.bench_plan
+
+or several of them, saving and comparing their results, with the package
+itself (see benchmarks/__main__.py)::
+
+    python -m benchmarks core plan --output results.json
+"""
+
+import timeit
+
+
+# List that bench and record append (label, value) pairs to, if it's not
+# None.
+results = None
+
+
+def bench(label, func, number=None, repeat=3):
+    """
+    Time func, printing and returning the best time per call in microseconds.
+
+    @param label: Label to print alongside the result.
+    @param func: Callable taking no arguments.
+    @keyword number: Number of calls per timing run. Calibrated to take at
+        least 0.2s per run if not given.
+    @keyword repeat: Number of timing runs, the best of which is used.
+    """
+    timer = timeit.Timer(func)
+    if number is None:
+        number = 1
+        while timer.timeit(number) < 0.2:
+            number *= 2
+    best = min(timer.repeat(repeat, number)) / number * 1e6
+    print '%-50s %12.2f usec' % (label, best)
+    if results is not None:
+        results.append((label, best))
+    return best
+
+
+def record(label, value, unit):
+    """
+    Print and record a result that is not a time, e.g. a size in bytes.
+    Like times, larger values are worse.
+
+    @param label: Label to print alongside the result.
+    @param value: The result.
+    @param unit: Unit to print after the result.
+    """
+    print '%-50s %12.2f %s' % (label, value, unit)
+    if results is not None:
+        results.append((label, value))
+    return value
@@ -0,0 +1,153 @@
+"""
+Run benchmark modules, saving their results as JSON and comparing them with a
+baseline.
+
+Usage, from the top of the source tree::
+
+    python -m benchmarks [options] [module ...]
+
+Modules are named without their bench_ prefix, e.g. core or plan, and default
+to core. --all runs every module. Every result of benchmarks.bench is
+recorded, keyed by '<module>: <label>', in microseconds, as is every result
+of benchmarks.record, in its own unit.
+
+Options:
+
+ --output FILE      Save the results to FILE as JSON.
+ --baseline FILE    Compare the results with those in FILE, as saved by
+                    --output, and exit with status 1 if any is worse than
+                    allowed by the threshold. Defaults to
+                    benchmarks/baseline.json, if it exists. Results missing
+                    from the baseline are not compared.
+ --threshold RATIO  Slowdown allowed before a result is a regression, as a
+                    ratio; 0.25 (the default) allows 25% slower.
+ --list             List the modules and exit.
+
+Results depend on the machine, so a baseline is only meaningful on the
+machine it was made on. The stored benchmarks/baseline.json is a reference
+run of core, classes and memory against schemaish 0.5.6, omitting cases
+that need newer APIs; to use your own, save one before making a change, e.g.
+with --output benchmarks/baseline.json, and compare with it afterwards.
+"""
+
+import json
+import optparse
+import os
+import pkgutil
+import platform
+import sys
+
+import benchmarks
+
+
+_DEFAULT_BASELINE = os.path.join(os.path.dirname(benchmarks.__file__),
+                                 'baseline.json')
+
+
+def available():
+    """
+    Return the names of the benchmark modules, without their bench_ prefix.
+    """
+    return sorted(name[len('bench_'):] for loader, name, ispkg in
+                  pkgutil.iter_modules(benchmarks.__path__)
+                  if name.startswith('bench_'))
+
+
+def run(names):
+    """
+    Run the named benchmark modules, returning a dict of their results.
+    """
+    results = {}
+    for name in names:
+        print '== %s' % name
+        module = __import__('benchmarks.bench_' + name, fromlist=['main'])
+        benchmarks.results = []
+        try:
+            module.main()
+        finally:
+            recorded, benchmarks.results = benchmarks.results, None
+        for label, value in recorded:
+            results['%s: %s' % (name, label)] = value
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the results alongside the baseline's, returning the keys of those
+    worse than allowed by the threshold.
+    """
+    regressions = []
+    print
+    print '%-50s %12s %12s %8s' % ('', 'baseline', 'current', 'change')
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        before, after = baseline[key], results[key]
+        change = float(after) / before - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print '%-50s %12.2f %12.2f %+7.1f%%%s' % (key[:50], before, after,
+                                                  change * 100, flag)
+    return regressions
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(
+        usage='python -m benchmarks [options] [module ...]')
+    parser.add_option('--all', action='store_true',
+                      help='run every benchmark module')
+    parser.add_option('--output', metavar='FILE',
+                      help='save the results to FILE as JSON')
+    parser.add_option('--baseline', metavar='FILE',
+                      help='compare the results with a saved baseline')
+    parser.add_option('--threshold', type='float', default=0.25,
+                      metavar='RATIO',
+                      help='slowdown allowed, as a ratio (default 0.25)')
+    parser.add_option('--list', action='store_true',
+                      help='list the benchmark modules')
+    options, names = parser.parse_args(argv)
+    modules = available()
+    if options.list:
+        print '\n'.join(modules)
+        return 0
+    if options.all:
+        names = modules
+    elif not names:
+        names = ['core']
+    unknown = [name for name in names if name not in modules]
+    if unknown:
+        parser.error('unknown benchmark module(s): %s' % ', '.join(unknown))
+    baseline_path = options.baseline
+    if baseline_path is None and os.path.exists(_DEFAULT_BASELINE):
+        baseline_path = _DEFAULT_BASELINE
+    baseline = None
+    if baseline_path is not None:
+        f = open(baseline_path)
+        try:
+            baseline = json.load(f)['results']
+        finally:
+            f.close()
+    results = run(names)
+    if options.output:
+        f = open(options.output, 'w')
+        try:
+            json.dump({'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'results': results}, f, indent=1, sort_keys=True)
+            f.write('\n')
+        finally:
+            f.close()
+    if baseline is not None:
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print
+            print '%d regression(s) over %d%%' % (
+                len(regressions), round(options.threshold * 100))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Load a schema of 200 declarative structures, of 20 validated fields each,
+by executing the (already compiled) module defining them, by unpickling it
+and by loading it from schemaish.binary's format.
+"""
+
+import cPickle
+import os
+import tempfile
+
+import schemaish
+from schemaish import binary
+from benchmarks import bench
+
+
+def module_source(forms, width):
+    """
+    Return the source of a module defining forms Structure subclasses of
+    width fields and a schema using them all.
+    """
+    lines = ['import validatish', 'import schemaish']
+    for i in range(forms):
+        lines.append('class Form%d(schemaish.Structure):' % i)
+        for j in range(width):
+            if j % 2:
+                lines.append('    f%d = schemaish.Integer('
+                             'validator=validatish.Range(min=0, max=%d))'
+                             % (j, j * 10))
+            else:
+                lines.append('    f%d = schemaish.String(title=%r, '
+                             'validator=validatish.Required())'
+                             % (j, 'Field %d' % j))
+    lines.append('schema = schemaish.Structure([%s])' % ', '.join(
+        ['("form%d", Form%d())' % (i, i) for i in range(forms)]))
+    return '\n'.join(lines) + '\n'
+
+
+def execute(code):
+    namespace = {}
+    exec code in namespace
+    return namespace['schema']
+
+
+def main():
+    code = compile(module_source(200, 20), '<forms>', 'exec')
+    schema = execute(code)
+    data = binary.dumps(schema)
+    # The classes can't be imported by name to unpickle them so pickle the
+    # equivalent plain structures instead.
+    pickled = cPickle.dumps(binary.loads(data), 2)
+    print '%-50s %12d bytes' % ('pickle size', len(pickled))
+    print '%-50s %12d bytes' % ('binary size', len(data))
+    bench('execute module', lambda: execute(code), repeat=5)
+    bench('cPickle.loads', lambda: cPickle.loads(pickled), repeat=5)
+    bench('binary.loads', lambda: binary.loads(data), repeat=5)
+    fd, path = tempfile.mkstemp()
+    try:
+        os.write(fd, data)
+        os.close(fd)
+        def load_file():
+            fp = open(path, 'rb')
+            try:
+                binary.load(fp)
+            finally:
+                fp.close()
+        bench('binary.load from a file', load_file, repeat=5)
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Compare validating orders of 100 items, drawn from 5 distinct products, with
+and without a cache of the product's validation results.
+"""
+
+import validatish
+
+import schemaish
+from schemaish.cache import ValidationCache, frozen_key
+from benchmarks import bench
+
+
+def order_schema(cache=None):
+    product = schemaish.Structure([
+        ('sku', schemaish.String(validator=validatish.All(
+            validatish.Required(), validatish.Length(min=4, max=12)))),
+        ('name', schemaish.String(validator=validatish.Required())),
+        ('price', schemaish.Float(validator=validatish.Range(min=0))),
+        ('tags', schemaish.Sequence(schemaish.String(
+            validator=validatish.Length(max=20))))],
+        cache=cache)
+    return schemaish.Structure([
+        ('customer', schemaish.String(validator=validatish.Required())),
+        ('items', schemaish.Sequence(product))])
+
+
+def order_value(size):
+    products = [{'sku': 'SKU-%04d' % n, 'name': 'Product %d' % n,
+                 'price': n * 1.5, 'tags': ['new', 'sale']}
+                for n in range(5)]
+    return {'customer': 'Tim',
+            'items': [products[n % 5] for n in range(size)]}
+
+
+def main():
+    value = order_value(100)
+    plain = order_schema()
+    cache = ValidationCache(key=frozen_key)
+    cached = order_schema(cache)
+    slow = bench('no cache, 100 items', lambda: plain.validate(value))
+    fast = bench('frozen_key cache, 100 items',
+                 lambda: cached.validate(value))
+    print '%-50s %11.2fx' % ('speedup', slow / fast)
+    print '%-50s %r' % ('cache', cache)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Create 5k declarative Structure subclasses from a mixin hierarchy, as
+applications that generate their schemas at startup do.
+"""
+
+import schemaish
+from benchmarks import bench
+
+
+def fields(prefix, count):
+    return dict(('%s%d' % (prefix, i), schemaish.String())
+                for i in range(count))
+
+
+def subclasses(number):
+    """
+    Return the (name, bases, clsattrs) of number subclasses of a hierarchy
+    with 55 fields, so that their fields are created beforehand and not
+    timed.
+    """
+    Base = type('Base', (schemaish.Structure,), fields('base', 50))
+    Audit = type('Audit', (Base,), fields('audit', 5))
+    Extra = type('Extra', (schemaish.Structure,), fields('extra', 5))
+    classes = []
+    for i in range(number):
+        if i % 10:
+            # Single inheritance, the common case.
+            classes.append(('Form%d' % i, (Audit,), fields('f', 3)))
+        else:
+            classes.append(('Form%d' % i, (Audit, Extra), fields('f', 3)))
+    return classes
+
+
+def main():
+    classes = subclasses(5000)
+    bench('create 5000 subclasses',
+          lambda: [type(name, bases, clsattrs)
+                   for name, bases, clsattrs in classes],
+          number=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare validating 100 field records with Structure.validate, a compiled
+validation plan and a generated validator.
+"""
+
+import validatish
+
+import schemaish
+from benchmarks import bench
+
+
+def record_schema(width):
+    """
+    Build a flat structure of width fields: required strings, ranged
+    integers and unvalidated strings in turn.
+    """
+    schema = schemaish.Structure()
+    for i in range(width):
+        if i % 3 == 0:
+            attr = schemaish.String(validator=validatish.Required())
+        elif i % 3 == 1:
+            attr = schemaish.Integer(validator=validatish.Range(min=0))
+        else:
+            attr = schemaish.String()
+        schema.add('f%d' % i, attr)
+    return schema
+
+
+def record_value(width):
+    return dict(('f%d' % i, i % 3 == 1 and i or 'value')
+                for i in range(width))
+
+
+def main():
+    schema = record_schema(100)
+    value = record_value(100)
+    plan = schema.compile()
+    generated = schema.compile(generate=True)
+    tree = bench('Structure.validate, 100 fields',
+                 lambda: schema.validate(value))
+    bench('compiled plan, 100 fields', lambda: plan.validate(value))
+    fast = bench('generated validator, 100 fields',
+                 lambda: generated.validate(value))
+    print '%-50s %11.2fx' % ('speedup', tree / fast)
+    invalid = dict(value, f0='', f1=-1)
+    bench('Structure.validate, 2 errors', lambda: _invalid(schema, invalid))
+    bench('generated validator, 2 errors',
+          lambda: _invalid(generated, invalid))
+    bench('generate validator, 100 fields',
+          lambda: schema.compile(generate=True))
+
+
+def _invalid(schema, value):
+    try:
+        schema.validate(value)
+    except schemaish.Invalid:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Convert 100 field records of form strings to Python and back, with a
+precompiled Converter and with a naive converter that looks up each field's
+type and parses it with strptime on every call.
+"""
+
+import datetime
+import decimal
+
+import schemaish
+from schemaish.convert import Converter
+from benchmarks import bench
+
+
+_leaves = [
+    (schemaish.Integer, '42'),
+    (schemaish.Float, '1.5'),
+    (schemaish.Decimal, '9.99'),
+    (schemaish.Boolean, 'true'),
+    (schemaish.Date, '2010-02-10'),
+    (schemaish.String, 'x'),
+    ]
+
+
+def schema(width):
+    """
+    Create a Structure with width fields of mixed types and a form value for
+    it.
+    """
+    attrs, value = [], {}
+    for i in range(width):
+        cls, v = _leaves[i % len(_leaves)]
+        attrs.append(('f%d' % i, cls()))
+        value['f%d' % i] = v
+    return schemaish.Structure(attrs), value
+
+
+_naive = {
+    'Integer': int,
+    'Float': float,
+    'Decimal': decimal.Decimal,
+    'Boolean': lambda v: v.lower() in ('true', 'yes', 'on', '1'),
+    'Date': lambda v: datetime.datetime.strptime(v, '%Y-%m-%d').date(),
+    }
+
+
+def naive_to_python(attr, value):
+    """
+    Convert value by walking the schema and dispatching on each attribute's
+    type.
+    """
+    if value is None:
+        return None
+    if attr.type == 'Structure':
+        return dict((name, naive_to_python(a, value.get(name)))
+                    for name, a in attr.attrs)
+    if attr.type == 'Sequence':
+        return [naive_to_python(attr.attr, v) for v in value]
+    convert = _naive.get(attr.type)
+    if convert is None:
+        return value
+    return convert(value)
+
+
+def main():
+    form, value = schema(100)
+    converter = Converter(form)
+    strings = Converter(form, 'string')
+    assert naive_to_python(form, value) == converter.to_python(value)
+    python = converter.to_python(value)
+    bench('naive to_python, 100 fields', lambda: naive_to_python(form, value))
+    bench('Converter.to_python, 100 fields',
+          lambda: converter.to_python(value))
+    bench('Converter.from_python json, 100 fields',
+          lambda: converter.from_python(python))
+    bench('Converter.from_python string, 100 fields',
+          lambda: strings.from_python(python))
+    bench('build Converter, 100 fields', lambda: Converter(form))
+
+
+if __name__ == '__main__':
+    main()
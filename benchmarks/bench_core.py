@@ -0,0 +1,112 @@
+"""
+The core validation hot paths: a single leaf, flat, wide, deep and
+sequence-heavy schemas with valid and invalid values, building Invalid
+errors, creating and instantiating Structure classes and importing
+schemaish.
+
+This is the default set run by python -m benchmarks, and its results are
+those kept in benchmarks/baseline.json.
+"""
+
+import sys
+
+import validatish
+
+import schemaish
+from benchmarks import bench
+from benchmarks.bench_codegen import record_schema, record_value
+from benchmarks.bench_plan import nested_schema, nested_value
+
+
+def invalid_record(width, invalid):
+    """
+    Return a value for record_schema(width) with the first invalid fields
+    invalid.
+    """
+    value = record_value(width)
+    for i in range(invalid):
+        value['f%d' % i] = i % 3 == 1 and -1 or ''
+    return value
+
+
+def records_schema():
+    return schemaish.Sequence(schemaish.Structure([
+        ('name', schemaish.String(validator=validatish.Required())),
+        ('age', schemaish.Integer(validator=validatish.Range(min=0))),
+        ('email', schemaish.String())]))
+
+
+def records_value(count, invalid_every=None):
+    value = []
+    for n in range(count):
+        age = n
+        if invalid_every and not n % invalid_every:
+            age = -1
+        value.append({'name': 'name', 'age': age, 'email': 'a@b.c'})
+    return value
+
+
+def validate(schema, value):
+    try:
+        schema.validate(value)
+    except schemaish.Invalid:
+        pass
+
+
+def import_schemaish():
+    """
+    Import schemaish, and all its modules, afresh and then put back the
+    modules imported before.
+    """
+    saved = dict((name, module) for name, module in sys.modules.items()
+                 if name == 'schemaish' or name.startswith('schemaish.'))
+    for name in saved:
+        del sys.modules[name]
+    try:
+        __import__('schemaish')
+    finally:
+        for name in list(sys.modules):
+            if name == 'schemaish' or name.startswith('schemaish.'):
+                del sys.modules[name]
+        sys.modules.update(saved)
+
+
+def main():
+    for width, label in ((10, 'flat'), (200, 'wide')):
+        schema = record_schema(width)
+        valid = record_value(width)
+        invalid = invalid_record(width, width // 10)
+        bench('%s, %d fields, valid' % (label, width),
+              lambda: validate(schema, valid))
+        bench('%s, %d fields, 10%% invalid' % (label, width),
+              lambda: validate(schema, invalid))
+    leaf = schemaish.String(validator=validatish.Required())
+    bench('leaf, valid', lambda: validate(leaf, 'value'))
+    deep = nested_schema(20, 4)
+    deep_value = nested_value(20, 4)
+    bench('deep, 20 levels, valid', lambda: validate(deep, deep_value))
+    records = records_schema()
+    valid_records = records_value(1000)
+    invalid_records = records_value(1000, invalid_every=10)
+    bench('sequence, 1000 records, valid',
+          lambda: validate(records, valid_records))
+    bench('sequence, 1000 records, 10% invalid',
+          lambda: validate(records, invalid_records))
+    numbers = schemaish.Sequence(schemaish.Integer(
+        validator=validatish.Range(min=0)))
+    bench('sequence, 10000 integers, valid',
+          lambda: validate(numbers, range(10000)))
+    errors = dict(('f%d' % n, validatish.Invalid('is required'))
+                  for n in range(1000))
+    bench('Invalid, 1000 errors, str', lambda: str(schemaish.Invalid(errors)))
+    fields = dict(('f%d' % i, schemaish.String()) for i in range(50))
+    bench('create Structure class, 50 fields',
+          lambda: type('Form', (schemaish.Structure,), fields))
+    Form = type('Form', (schemaish.Structure,), fields)
+    bench('instantiate Structure class, 50 fields', Form)
+    bench('build Structure, 50 fields', lambda: record_schema(50))
+    bench('import schemaish', import_schemaish)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Validate payloads with many invalid leaves, where the cost of collecting and
+keying errors dominates.
+"""
+
+import validatish
+
+import schemaish
+from benchmarks import bench
+
+
+def record_schema(depth):
+    """
+    Build a record nested depth levels deep with five required fields per
+    level.
+    """
+    schema = schemaish.Structure()
+    for i in range(5):
+        schema.add('f%d' % i, schemaish.String(validator=validatish.Required()))
+    if depth > 1:
+        schema.add('child', record_schema(depth - 1))
+    return schema
+
+
+def empty_record(depth):
+    if depth > 1:
+        return {'child': empty_record(depth - 1)}
+    return {}
+
+
+def main():
+    for depth in (1, 4, 8):
+        schema = schemaish.Sequence(record_schema(depth))
+        value = [empty_record(depth) for i in range(200)]
+        def validate():
+            try:
+                schema.validate(value)
+            except schemaish.Invalid:
+                pass
+        bench('200 invalid records, depth %d (%d errors)' % (
+            depth, 200 * 5 * depth), validate)
+
+
+if __name__ == '__main__':
+    main()
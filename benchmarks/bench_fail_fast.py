@@ -0,0 +1,27 @@
+"""
+Reject large invalid payloads with and without fail-fast validation.
+"""
+
+import validatish
+
+import schemaish
+from benchmarks import bench
+
+
+def main():
+    schema = schemaish.Sequence(schemaish.Integer(
+        validator=validatish.Range(min=0)))
+    for size in (1000, 10000, 100000):
+        value = [-1] + range(size - 1)
+        for fail_fast in (False, True):
+            def validate():
+                try:
+                    schema.validate(value, fail_fast=fail_fast)
+                except schemaish.Invalid:
+                    pass
+            bench('%d items, first invalid, fail_fast=%s' % (
+                size, fail_fast), validate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Compare checking the size and sha256 and md5 digests of a 16MB upload by
+reading it into memory, and by scanning it in chunks and memory mapped.
+"""
+
+import hashlib
+import io
+import tempfile
+
+from schemaish.type import scan
+from benchmarks import bench
+
+
+SIZE = 16 * 1024 * 1024
+
+
+def read_whole(fp):
+    fp.seek(0)
+    data = fp.read()
+    digests = dict((name, hashlib.new(name, data).hexdigest())
+                   for name in ('sha256', 'md5'))
+    return len(data), digests
+
+
+def main():
+    data = ''.join([chr(n % 251) for n in xrange(SIZE)])
+    stream = io.BytesIO(data)
+    disk = tempfile.TemporaryFile()
+    disk.write(data)
+    disk.flush()
+    disk.seek(0)
+    del data
+    bench('read into memory, 16MB', lambda: read_whole(disk), number=3)
+    bench('scan, readinto 64KB buffer, 16MB',
+          lambda: scan(stream, ('sha256', 'md5')), number=3)
+    disk.seek(0)
+    bench('scan, mmap temp file, 16MB',
+          lambda: scan(disk, ('sha256', 'md5')), number=3)
+    bench('scan, mmap temp file, max_size exceeded',
+          lambda: scan(disk, ('sha256', 'md5'), max_size=SIZE - 1))
+    bench('scan, readinto, max_size exceeded',
+          lambda: scan(stream, ('sha256', 'md5'), max_size=SIZE // 16))
+
+
+if __name__ == '__main__':
+    main()
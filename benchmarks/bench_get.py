@@ -0,0 +1,29 @@
+"""
+Look up every field of a structure by name, as form and serialisation code
+does, for structures of increasing width.
+"""
+
+import schemaish
+from benchmarks import bench
+
+
+def wide_schema(width):
+    schema = schemaish.Structure()
+    for i in range(width):
+        schema.add('f%d' % i, schemaish.String())
+    return schema
+
+
+def main():
+    for width in (10, 100, 1000):
+        schema = wide_schema(width)
+        names = schema.names()
+        def get_all():
+            get = schema.get
+            for name in names:
+                get(name)
+        bench('get every field, %d fields' % width, get_all)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Compare validating a 300 field nested structure again after changing one
+field, in full and with incremental revalidation.
+"""
+
+import validatish
+
+import schemaish
+from schemaish.incremental import revalidate
+from benchmarks import bench
+
+
+def section_schema(width):
+    section = schemaish.Structure()
+    for i in range(width):
+        if i % 2:
+            attr = schemaish.Integer(validator=validatish.Range(min=0))
+        else:
+            attr = schemaish.String(validator=validatish.Required())
+        section.add('f%d' % i, attr)
+    return section
+
+
+def main():
+    schema = schemaish.Structure()
+    value = {}
+    for n in range(10):
+        schema.add('s%d' % n, section_schema(30))
+        value['s%d' % n] = dict(('f%d' % i, i % 2 and i or 'value')
+                                for i in range(30))
+    value['s4']['f0'] = ''
+    errors = revalidate(schema, value, None, [''])
+    full = bench('Structure.validate, 300 fields',
+                 lambda: _invalid(schema, value))
+    fast = bench('revalidate, 1 of 300 fields changed',
+                 lambda: revalidate(schema, value, errors, ['s4.f0']))
+    print '%-50s %11.2fx' % ('speedup', full / fast)
+
+
+def _invalid(schema, value):
+    try:
+        schema.validate(value)
+    except schemaish.Invalid:
+        pass
+
+
+if __name__ == '__main__':
+    main()
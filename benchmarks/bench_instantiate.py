@@ -0,0 +1,35 @@
+"""
+Instantiate a declarative structure with 200 fields in a tight loop, as
+request handlers do, alone and followed by validating a small payload.
+"""
+
+import validatish
+
+import schemaish
+from benchmarks import bench
+
+
+def declarative_schema(width):
+    """
+    Create a Structure subclass with width string fields.
+    """
+    clsattrs = {}
+    for i in range(width):
+        clsattrs['f%d' % i] = schemaish.String(validator=validatish.Required())
+    return type('Form', (schemaish.Structure,), clsattrs)
+
+
+def main():
+    Form = declarative_schema(200)
+    value = dict(('f%d' % i, 'x') for i in range(200))
+    bench('instantiate 200 field structure', Form)
+    def instantiate_and_get():
+        Form().get('f100')
+    bench('instantiate and get a field', instantiate_and_get)
+    def instantiate_and_validate():
+        Form().validate(value)
+    bench('instantiate and validate', instantiate_and_validate)
+
+
+if __name__ == '__main__':
+    main()
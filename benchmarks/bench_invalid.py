@@ -0,0 +1,34 @@
+"""
+Validate a 10k item sequence where half the items fail, so building the Invalid
+exception is a significant part of the cost.
+"""
+
+import validatish
+
+import schemaish
+from benchmarks import bench
+
+
+def main():
+    schema = schemaish.Sequence(schemaish.Integer(
+        validator=validatish.Range(min=0)))
+    value = [i % 2 and -i or i for i in range(10000)]
+    def validate():
+        try:
+            schema.validate(value)
+        except schemaish.Invalid:
+            pass
+    def validate_and_read():
+        try:
+            schema.validate(value)
+        except schemaish.Invalid, e:
+            str(e)
+    error_dict = dict((str(n), validatish.Invalid('is invalid'))
+                      for n in range(5000))
+    bench('Invalid() with 5k errors', lambda: schemaish.Invalid(error_dict))
+    bench('10k items, 5k invalid', validate)
+    bench('10k items, 5k invalid, message read', validate_and_read)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Validate a stream of records against one structure, one validate() call per
+row versus validate_many().
+"""
+
+import validatish
+
+import schemaish
+from benchmarks import bench
+
+
+def row_schema():
+    schema = schemaish.Structure()
+    schema.add('id', schemaish.Integer(validator=validatish.Required()))
+    schema.add('name', schemaish.String(validator=validatish.Required()))
+    schema.add('email', schemaish.String())
+    schema.add('age', schemaish.Integer(
+        validator=validatish.Range(min=0, max=150)))
+    schema.add('notes', schemaish.String())
+    return schema
+
+
+def rows(count):
+    for n in xrange(count):
+        # Every tenth row is missing its name.
+        yield {'id': n, 'name': n % 10 and 'name' or '', 'age': 30,
+               'email': 'someone@example.com'}
+
+
+def main():
+    schema = row_schema()
+    def per_row():
+        for row in rows(10000):
+            try:
+                schema.validate(row)
+            except schemaish.Invalid, e:
+                e.error_dict
+    def many():
+        for n, errors in schema.validate_many(rows(10000)):
+            pass
+    bench('10k rows, validate() per row', per_row)
+    bench('10k rows, validate_many()', many)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Measure the memory used by a 50k node schema: 500 structures of 100 leaves,
+as built and after interning (see schemaish.interning).
+"""
+
+import gc
+import sys
+
+import validatish
+
+import schemaish
+from benchmarks import record
+from schemaish.interning import Interner
+
+
+def build():
+    schema = schemaish.Sequence(schemaish.Structure())
+    for i in range(500):
+        s = schemaish.Structure()
+        for j in range(50):
+            s.add('s%d' % j, schemaish.String())
+            s.add('i%d' % j, schemaish.Integer(
+                title='Number %d' % j, validator=validatish.Required()))
+        schema.attr.add('child%d' % i, s)
+    return schema
+
+
+def nodes(attr):
+    yield attr
+    if isinstance(attr, schemaish.Structure):
+        for name, child in attr.attrs:
+            for node in nodes(child):
+                yield node
+    elif isinstance(attr, schemaish.Sequence):
+        for node in nodes(attr.attr):
+            yield node
+
+
+def size(obj):
+    """
+    Size of an attribute object and its instance dict, excluding the values
+    they refer to, which are the same either way.
+    """
+    total = sys.getsizeof(obj)
+    d = getattr(obj, '__dict__', None)
+    if d is not None:
+        total += sys.getsizeof(d)
+    return total
+
+
+def report(label, schema):
+    all_nodes = list(nodes(schema))
+    # Count shared nodes once.
+    unique = dict((id(node), node) for node in all_nodes).values()
+    total = sum(size(node) for node in unique)
+    record('%s: distinct nodes' % label, len(unique), 'nodes')
+    record('%s: attribute objects and dicts' % label, total, 'bytes')
+    record('%s: per schema node' % label, float(total) / len(all_nodes),
+           'bytes')
+
+
+def main():
+    gc.collect()
+    schema = build()
+    report('built', schema)
+    report('interned', Interner().intern(schema))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Validate a large sequence of records serially and in parallel chunks using
+process pools of 1, 2 and 4 workers and of one worker per CPU. Requires
+concurrent.futures (the futures package on Python 2).
+"""
+
+import multiprocessing
+
+import validatish
+
+import schemaish
+from benchmarks import bench
+
+
+class Record(schemaish.Structure):
+    name = schemaish.String(validator=validatish.Required())
+    email = schemaish.String(validator=validatish.Email())
+    age = schemaish.Integer(validator=validatish.Range(min=0, max=150))
+
+
+def records(count):
+    return [{'name': 'name', 'email': 'someone%d@example.com' % n, 'age': 30}
+            for n in xrange(count)]
+
+
+def main():
+    from concurrent.futures import ProcessPoolExecutor
+    print 'cpus: %d' % multiprocessing.cpu_count()
+    schema = schemaish.Sequence(Record())
+    values = [(count, records(count)) for count in (1000, 10000, 100000)]
+    for count, value in values:
+        bench('%d records, serial' % count,
+              lambda: schema.validate(value), number=1)
+    for workers in sorted(set([1, 2, 4, multiprocessing.cpu_count()])):
+        executor = ProcessPoolExecutor(workers)
+        try:
+            for count, value in values:
+                for chunk_size in (100, 1000, 10000):
+                    if chunk_size > count:
+                        continue
+                    bench('%d records, %d workers, %d per chunk'
+                          % (count, workers, chunk_size),
+                          lambda: schema.validate(value, executor=executor,
+                                                  chunk_size=chunk_size),
+                          number=1)
+        finally:
+            executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Compare tree-walking validation with compiled validation plans on deeply
+nested structures.
+"""
+
+import validatish
+
+import schemaish
+from benchmarks import bench
+
+
+def nested_schema(depth, width):
+    """
+    Build a structure nested depth levels deep, each level with width
+    strings (every other one required), an optional string and a short
+    sequence of integers.
+    """
+    schema = schemaish.Structure()
+    for i in range(width):
+        if i % 2:
+            schema.add('f%d' % i, schemaish.String())
+        else:
+            schema.add('f%d' % i,
+                       schemaish.String(validator=validatish.Required()))
+    schema.add('optional', schemaish.String())
+    schema.add('numbers', schemaish.Sequence(schemaish.Integer(
+        validator=validatish.Range(min=0, max=100))))
+    if depth > 1:
+        schema.add('child', nested_schema(depth - 1, width))
+    return schema
+
+
+def nested_value(depth, width):
+    value = dict(('f%d' % i, 'value') for i in range(width))
+    value['numbers'] = [1, 2, 3]
+    if depth > 1:
+        value['child'] = nested_value(depth - 1, width)
+    return value
+
+
+def main():
+    for depth in (1, 5, 20):
+        schema = nested_schema(depth, 10)
+        value = nested_value(depth, 10)
+        plan = schema.compile()
+        tree = bench('tree walk, depth %d' % depth,
+                     lambda: schema.validate(value))
+        compiled = bench('compiled plan, depth %d' % depth,
+                         lambda: plan.validate(value))
+        print '%-50s %11.2fx' % ('speedup', tree / compiled)
+
+
+if __name__ == '__main__':
+    main()
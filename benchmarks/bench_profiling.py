@@ -0,0 +1,30 @@
+"""
+Compare validating 100 field records with no profiler, which is the cost when
+profiling is disabled, and with a profiler recording.
+"""
+
+from schemaish.profiling import Profiler
+from benchmarks import bench
+from benchmarks.bench_codegen import record_schema, record_value
+
+
+def main():
+    schema = record_schema(100)
+    value = record_value(100)
+    plain = bench('Structure.validate, 100 fields',
+                  lambda: schema.validate(value))
+    profiler = Profiler()
+    with profiler:
+        profiled = bench('Structure.validate, 100 fields, profiled',
+                         lambda: schema.validate(value))
+    print '%-50s %11.2fx' % ('profiling overhead', profiled / plain)
+    stats = profiler.stats()
+    slowest = sorted(stats, key=lambda path: -stats[path]['self_time'])[:3]
+    for path in slowest:
+        print '%-50s %12.2f usec' % (
+            'self time of %r per call' % path,
+            stats[path]['self_time'] / stats[path]['calls'] * 1e6)
+
+
+if __name__ == '__main__':
+    main()
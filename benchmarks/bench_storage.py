@@ -0,0 +1,54 @@
+"""
+Compare storing a 16MB upload by reading it into memory and writing it to a
+temporary file, and with the spooled and content addressed storages.
+"""
+
+import io
+import shutil
+import tempfile
+
+from schemaish.storage import ContentStore, SpooledStorage
+from benchmarks import bench
+
+
+SIZE = 16 * 1024 * 1024
+
+
+def read_and_write(upload):
+    upload.seek(0)
+    data = upload.read()
+    fp = tempfile.TemporaryFile()
+    fp.write(data)
+    fp.close()
+
+
+def save(storage, upload):
+    upload.seek(0)
+    return storage.save(upload)
+
+
+def save_and_delete(storage, upload):
+    storage.delete(save(storage, upload))
+
+
+def main():
+    upload = io.BytesIO(''.join([chr(n % 251) for n in xrange(SIZE)]))
+    root = tempfile.mkdtemp()
+    try:
+        bench('read into memory and write, 16MB',
+              lambda: read_and_write(upload), number=5)
+        spooled = SpooledStorage()
+        bench('SpooledStorage.save, 16MB',
+              lambda: save_and_delete(spooled, upload), number=5)
+        store = ContentStore(root)
+        bench('ContentStore.save, 16MB',
+              lambda: save_and_delete(store, upload), number=5)
+        save(store, upload)
+        bench('ContentStore.save, 16MB already stored',
+              lambda: save(store, upload), number=5)
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Validate a large JSON array of records loaded whole with json.load and
+streamed with schemaish.stream.validate_json, comparing time and peak memory.
+
+Each way is run in a child process so that its peak memory can be measured,
+and the child's results are recorded by this one.
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import validatish
+
+import schemaish
+from benchmarks import record
+from schemaish.stream import validate_json
+
+
+def schema():
+    return schemaish.Sequence(schemaish.Structure([
+        ('id', schemaish.Integer(validator=validatish.Required())),
+        ('name', schemaish.String(validator=validatish.Required())),
+        ('email', schemaish.String()),
+        ('address', schemaish.Structure([
+            ('street', schemaish.String()),
+            ('town', schemaish.String(validator=validatish.Required())),
+            ])),
+        ('tags', schemaish.Sequence(schemaish.String())),
+        ]))
+
+
+def write(fp, count):
+    fp.write('[')
+    for i in range(count):
+        if i:
+            fp.write(',\n')
+        json.dump({'id': i, 'name': 'Name %d' % i,
+                   'email': 'user%d@example.com' % i,
+                   'address': {'street': '%d High Street' % i,
+                               'town': '' if i % 1000 == 0 else 'Town'},
+                   'tags': ['a', 'b', 'c']}, fp)
+    fp.write(']')
+
+
+def run(how, filename):
+    """
+    Validate the file one way, printing the time taken in seconds, the peak
+    memory and the number of errors found as JSON.
+    """
+    errors = 0
+    start = time.time()
+    try:
+        if how == 'load':
+            schema().validate(json.load(open(filename, 'rb')))
+        else:
+            validate_json(schema(), open(filename, 'rb'))
+    except schemaish.Invalid, e:
+        errors = len(e.error_dict)
+    seconds = time.time() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print json.dumps([seconds, rss, errors])
+
+
+def main():
+    fd, filename = tempfile.mkstemp(suffix='.json')
+    try:
+        fp = os.fdopen(fd, 'wb')
+        write(fp, 200000)
+        fp.close()
+        record('document size', os.path.getsize(filename) // 1024, 'KB')
+        for how in ('load', 'stream'):
+            seconds, rss, errors = json.loads(subprocess.check_output(
+                [sys.executable, '-m', 'benchmarks.bench_stream', how,
+                 filename]))
+            record('%s: time (%d errors)' % (how, errors), seconds * 1e6,
+                   'usec')
+            record('%s: peak memory' % how, rss, 'KB')
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        run(*sys.argv[1:])
+    else:
+        main()
@@ -0,0 +1,56 @@
+"""
+Validate a sequence of 1000 fixed-width tuples, e.g. rows of a ledger, valid
+and with every tenth row invalid, by walking the attribute tree, with a
+compiled plan and with a generated validator.
+"""
+
+import datetime
+import decimal
+
+import validatish
+
+import schemaish
+from benchmarks import bench
+
+
+def rows_schema():
+    return schemaish.Sequence(schemaish.Tuple([
+        schemaish.Date(validator=validatish.Required()),
+        schemaish.String(validator=validatish.Required()),
+        schemaish.Decimal(validator=validatish.Range(min=0)),
+        schemaish.Integer(validator=validatish.Range(min=0, max=10)),
+        schemaish.String()]))
+
+
+def rows_value(count, invalid_every=None):
+    rows = []
+    for n in range(count):
+        amount = decimal.Decimal('12.50')
+        if invalid_every and not n % invalid_every:
+            amount = -amount
+        rows.append((datetime.date(2010, 1, 1), 'account', amount, 3, ''))
+    return rows
+
+
+def validate(validator, value):
+    try:
+        validator.validate(value)
+    except schemaish.Invalid:
+        pass
+
+
+def main():
+    schema = rows_schema()
+    valid = rows_value(1000)
+    invalid = rows_value(1000, invalid_every=10)
+    for label, validator in (('validate', schema),
+                             ('plan', schema.compile()),
+                             ('generated', schema.compile(generate=True))):
+        bench('%s, 1000 tuples, valid' % label,
+              lambda: validate(validator, valid))
+        bench('%s, 1000 tuples, 10%% invalid' % label,
+              lambda: validate(validator, invalid))
+
+
+if __name__ == '__main__':
+    main()
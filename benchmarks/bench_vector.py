@@ -0,0 +1,35 @@
+"""
+Validate 100k numbers, item by item and vectorized, as a list, an array.array
+and (if installed) a NumPy array.
+"""
+
+import array
+
+import validatish
+
+import schemaish
+from benchmarks import bench
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def main():
+    attr = schemaish.Integer(validator=validatish.Range(min=0, max=1000000))
+    plain = schemaish.Sequence(attr)
+    vectorized = schemaish.Sequence(attr, vectorize=True)
+    values = [('list', range(100000)),
+              ('array.array', array.array('l', range(100000)))]
+    if numpy is not None:
+        values.append(('numpy', numpy.arange(100000)))
+    for label, value in values:
+        bench('100k items, %s, per item' % label,
+              lambda: plain.validate(value), number=3)
+        bench('100k items, %s, vectorized' % label,
+              lambda: vectorized.validate(value))
+
+
+if __name__ == '__main__':
+    main()
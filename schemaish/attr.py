@@ -8,6 +8,8 @@ __all__ = ['String', 'Integer', 'Float', 'Decimal', 'Date',
            'DateTime','File', 'Invalid']
 
 
+import bisect
+import collections
 import itertools
 import validatish
 
@@ -20,18 +22,22 @@ _meta_order = itertools.count()
 _MISSING = object()
 
 
+# The active schemaish.profiling.Profiler, if any.
+_profiler = None
+
+
 class Invalid(Exception):
     """
     basic schema validation exception
+
+    The message is only built, from the error_dict, when it's first used.
     """
 
+    _message = None
+
     def __init__(self, error_dict):
         Exception.__init__(self,error_dict)
         self.error_dict=error_dict
-        m = []
-        for k,v in self.error_dict.items():
-            m.append( 'field "%s" %s'%(k,v.message))
-        self.message = '\n'.join(m)
 
 
     def __str__(self):
@@ -39,26 +45,287 @@ class Invalid(Exception):
     __unicode__ = __str__
 
     # Hide Python 2.6 deprecation warnings.
-    def _get_message(self): return self._message
+    def _get_message(self):
+        message = self._message
+        if message is None:
+            m = []
+            for k,v in self.error_dict.items():
+                m.append( 'field "%s" %s'%(k,v.message))
+            message = self._message = '\n'.join(m)
+        return message
     def _set_message(self, message): self._message = message
     message = property(_get_message, _set_message)
 
 
+class _Stop(Exception):
+    """
+    Raised internally to abandon validation once an error has been found in
+    fail-fast mode.
+    """
+
+
+class _FirstError(dict):
+    """
+    Error dict that stops validation as soon as an error is stored in it.
+    """
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        raise _Stop()
+
+    def update(self, *a, **k):
+        dict.update(self, *a, **k)
+        if self:
+            raise _Stop()
+
+
+class _Collector(object):
+    """
+    Error collector passed down the attribute tree during validation.
+
+    Attributes record errors against the current path instead of raising
+    Invalid, so only one Invalid is raised, at the top of the tree, however
+    many errors are found.
+
+    @ivar errors: Dict of errors found so far, keyed as in Invalid.error_dict.
+    @ivar path: Stack of names/indexes leading to the attribute currently
+        being validated. Sequence indexes are kept as ints and only formatted
+        when an error is recorded.
+    @ivar executor: Optional executor used to validate sequence items in
+        parallel chunks of chunk_size items.
+    @ivar inline: False if every attribute must be validated through visit,
+        rather than containers calling their children's _validate directly.
+    """
+
+    executor = None
+    chunk_size = 1000
+    caching = True
+    inline = True
+
+    def __init__(self, fail_fast=False, executor=None, chunk_size=None):
+        if fail_fast:
+            self.errors = _FirstError()
+        else:
+            self.errors = {}
+        self.path = []
+        if executor is not None:
+            self.executor = executor
+        if chunk_size is not None:
+            self.chunk_size = chunk_size
+
+    def key(self):
+        """
+        Return the error_dict key of the attribute currently being validated.
+        """
+        path = self.path
+        if not path:
+            return ''
+        if len(path) == 1:
+            return '%s' % (path[0],)
+        try:
+            return '.'.join(path)
+        except TypeError:
+            return '.'.join(['%s' % (p,) for p in path])
+
+    def add(self, error):
+        """
+        Record a validatish error against the current path.
+        """
+        self.errors[self.key()] = error
+
+    def defer(self, result):
+        """
+        Handle a value returned by a validator. A future-like result, i.e.
+        one with a result() method, is waited for immediately; other values
+        are ignored.
+        """
+        wait = getattr(result, 'result', None)
+        if wait is None:
+            return
+        try:
+            wait()
+        except validatish.Invalid, e:
+            self.add(e)
+
+    def visit(self, attr, value):
+        """
+        Validate value using attr at the current path.
+
+        Attributes that override validate, rather than _validate, are called
+        the old way and their errors merged in.
+        """
+        try:
+            kind = _kinds[type(attr)]
+        except KeyError:
+            kind = _validation_kind(type(attr))
+        if kind != _VISIT:
+            if attr.cache is not None and self.caching:
+                self._visit_cached(attr, value)
+            else:
+                attr._validate(value, self)
+            return
+        try:
+            attr.validate(value)
+        except Invalid, e:
+            if not self.path:
+                self.errors.update(e.error_dict)
+                return
+            key = self.key()
+            errors = {}
+            for k, v in e.error_dict.items():
+                if k == '':
+                    errors[key] = v
+                else:
+                    errors['%s.%s' % (key, k)] = v
+            self.errors.update(errors)
+
+    def root(self, attr, value):
+        """
+        Validate value using attr at the top of the tree, as attr's own
+        validate does.
+        """
+        if attr.cache is not None and self.caching:
+            self._visit_cached(attr, value)
+        else:
+            attr._validate(value, self)
+
+    def _visit_cached(self, attr, value):
+        """
+        Validate value using attr, which has a cache, at the current path.
+        """
+        cache = attr.cache
+        key = None
+        if cache.enabled:
+            key = cache.key(value)
+        if key is None:
+            attr._validate(value, self)
+            return
+        errors = cache.get(attr, key)
+        if errors is None:
+            # Find all the errors, in order, so that the first error is
+            # known when failing fast.
+            collector = _Collector(executor=self.executor,
+                                   chunk_size=self.chunk_size)
+            collector.errors = collections.OrderedDict()
+            attr._validate(value, collector)
+            errors = tuple(collector.errors.iteritems())
+            cache.put(attr, key, errors)
+        if not errors:
+            return
+        if not self.path:
+            for k, error in errors:
+                self.errors[k] = error
+            return
+        prefix = self.key()
+        for k, error in errors:
+            if k == '':
+                self.errors[prefix] = error
+            else:
+                self.errors['%s.%s' % (prefix, k)] = error
+
+
+# Slot defaults of the attribute classes instantiated so far, by class.
+_defaults = {}
+
+
+def _class_defaults(cls):
+    """
+    Return the values the slots of cls's instances take when they're not
+    given, by name: a class attribute overriding the slot or the class's
+    default for it. They're only worked out once per class.
+    """
+    try:
+        return _defaults[cls]
+    except KeyError:
+        pass
+    defaults = {}
+    for name, value in cls._slot_defaults.iteritems():
+        override = getattr(cls, name)
+        if not isinstance(override, _member_descriptor):
+            value = override
+        defaults[name] = value
+    _defaults[cls] = defaults
+    return defaults
+
+
+def _slot_names(cls):
+    """
+    Return the names of all the slots of cls.
+    """
+    names = []
+    for c in cls.__mro__:
+        slots = c.__dict__.get('__slots__', ())
+        if isinstance(slots, basestring):
+            slots = [slots]
+        for name in slots:
+            if name not in ('__dict__', '__weakref__'):
+                names.append(name)
+    return names
+
+
+# Default collectors that found no errors, ready to be used again.
+_spare_collectors = []
+
+
+class _DeferringCollector(_Collector):
+    """
+    Collector that leaves future-like validator results pending until the
+    whole tree has been visited, so they complete concurrently.
+    """
+
+    # Cached results can't include pending ones.
+    caching = False
+
+    def __init__(self):
+        super(_DeferringCollector, self).__init__()
+        self.pending = []
+
+    def defer(self, result):
+        if getattr(result, 'result', None) is not None:
+            self.pending.append((self.key(), result))
+
+    def wait(self):
+        """
+        Wait for all pending results, recording their errors.
+        """
+        for key, result in self.pending:
+            try:
+                result.result()
+            except validatish.Invalid, e:
+                self.errors[key] = e
+        self.pending = []
+
 
 class Attribute(object):
     """
     Abstract base class for all attribute types in the package.
 
+    Attributes use __slots__ to keep large schemas small. A slot not set by a
+    keyword argument is set from the class: either a subclass attribute of
+    the same name, e.g. "title = 'Title'", or the default in _slot_defaults.
+
     @ivar title: Title of the attribute.
     @ivar description: Optional description.
     @ivar validator: Optional FormEncode validator.
+    @ivar cache: Optional L{schemaish.cache.ValidationCache} of validation
+        results.
+    @ivar frozen: True if the attribute has been made immutable, see freeze.
     """
 
+    __slots__ = ('title', 'description', 'validator', 'default', 'cache',
+                 '_meta_order', '__weakref__')
+
     type = None
-    title = None
-    description = None
-    validator = validatish.Always()
-    default = None
+    frozen = False
+    _slot_defaults = {
+        'title': None,
+        'description': None,
+        'validator': validatish.Always(),
+        'default': None,
+        'cache': None,
+        }
+    # Names of the slots set from keyword arguments.
+    _keywords = frozenset(_slot_defaults)
 
     def __init__(self, **k):
         """
@@ -68,34 +335,205 @@ class Attribute(object):
         @keyword description: Optional description.
         @keyword validator: Optional validatish validator.
         @keyword default: Optional default value for the attribute (or None).
+        @keyword cache: Optional L{schemaish.cache.ValidationCache} to keep
+            the results of validating values in.
         """
         self._meta_order = _meta_order.next()
-        title = k.pop('title', _MISSING)
-        if title is not _MISSING:
-            self.title = title
-        description = k.pop('description', _MISSING)
-        if description is not _MISSING:
-            self.description = description
-        validator = k.pop('validator', _MISSING)
-        if validator is not _MISSING:
-            self.validator = validator
-        default = k.pop('default', _MISSING)
-        if default is not _MISSING:
-            self.default = default
+        defaults = _class_defaults(type(self))
         if k:
-            raise TypeError("__init__() got unexpected keyword arguments: %r"%list(k))
-
-
-    def validate(self, value):
+            if not Attribute._keywords.issuperset(k):
+                unexpected = [name for name in k
+                              if name not in Attribute._keywords]
+                raise TypeError("__init__() got unexpected keyword arguments: %r"%unexpected)
+            defaults = defaults.copy()
+            defaults.update(k)
+        self.title = defaults['title']
+        self.description = defaults['description']
+        self.validator = defaults['validator']
+        self.default = defaults['default']
+        self.cache = defaults['cache']
+
+    def __getstate__(self):
+        state = {}
+        for name in _slot_names(type(self)):
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                state[name] = value
+        state.update(getattr(self, '__dict__', {}))
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.iteritems():
+            setattr(self, name, value)
+
+    def validate(self, value, fail_fast=False, executor=None, chunk_size=None):
         """
-        Validate the value if a validator has been provided.
+        Validate the value, raising Invalid if it's not valid.
+
+        @keyword fail_fast: Stop at the first error found, in which case the
+            Invalid's error_dict only includes that error.
+        @keyword executor: An executor, e.g. a
+            concurrent.futures.ProcessPoolExecutor, used to validate the items
+            of sequences in parallel. The schema and the items must be
+            picklable to use a process pool.
+        @keyword chunk_size: Number of sequence items validated per task when
+            an executor is used.
         """
-        if not self.validator:
+        direct = _profiler is None and self.cache is None
+        if direct and type(self) in _leaves:
+            # A leaf has one validator to call and needs no collector.
+            validator = self.validator
+            if validator:
+                try:
+                    result = validator(value)
+                    if result is not None:
+                        wait = getattr(result, 'result', None)
+                        if wait is not None:
+                            wait()
+                except validatish.Invalid, e:
+                    raise Invalid({'': e})
             return
+        if type(self) not in _kinds:
+            _validation_kind(type(self))
+        plain = (direct and not fail_fast and executor is None
+                 and chunk_size is None)
+        if plain:
+            # Validate with a spare collector, calling _validate directly.
+            try:
+                collector = _spare_collectors.pop()
+            except IndexError:
+                collector = _Collector()
+        elif _profiler is None:
+            collector = _Collector(fail_fast, executor, chunk_size)
+        else:
+            collector = _profiler._collector(fail_fast, executor, chunk_size)
         try:
-            self.validator(value)
+            if plain or (self.cache is None and collector.inline):
+                self._validate(value, collector)
+            else:
+                collector.root(self, value)
+        except _Stop:
+            pass
+        errors = collector.errors
+        if errors:
+            if fail_fast:
+                errors = dict(errors)
+            raise Invalid(errors)
+        if plain:
+            # Left as it was created, so it can be used again.
+            _spare_collectors.append(collector)
+
+    def _validate(self, value, collector):
+        """
+        Validate the value if a validator has been provided, recording any
+        error with the collector.
+
+        Subclasses extend this, rather than validate, to take part in
+        collector based validation.
+        """
+        validator = self.validator
+        if not validator:
+            return
+        try:
+            result = validator(value)
         except validatish.Invalid, e:
-            raise Invalid({'':e})
+            collector.add(e)
+        else:
+            if result is not None:
+                collector.defer(result)
+
+    def avalidate(self, value):
+        """
+        Validate the value, allowing validators to work concurrently.
+
+        Validators may return a future, or anything else with a result()
+        method, instead of raising validatish.Invalid straight away, e.g. after
+        submitting a database lookup to a thread pool. Every field of every
+        structure, and every sequence item, is checked and its future started
+        before any future is waited for, so one slow validator does not hold
+        up the rest. The Invalid raised is the same as validate's.
+
+        (validate also accepts such validators but waits for each one in
+        turn.)
+        """
+        collector = _DeferringCollector()
+        self._validate(value, collector)
+        collector.wait()
+        if collector.errors:
+            raise Invalid(collector.errors)
+
+    def validate_many(self, values):
+        """
+        Validate many values, e.g. the rows of an import, against the
+        attribute.
+
+        Values are consumed and results produced lazily, so values may be a
+        generator of any length. No exceptions are raised for invalid values.
+
+        @param values: Iterable of values to validate.
+        @return: Iterator of (index, error_dict) pairs, where error_dict is as
+            Invalid.error_dict or None if the value is valid.
+        """
+        return self.compile().validate_many(values)
+
+    def revalidate(self, value, errors, changed):
+        """
+        Validate a value again after changing parts of it, raising Invalid
+        exactly as validate would, but only validating the changed parts and
+        the containers holding them (see L{schemaish.incremental}).
+
+        @param value: The changed value.
+        @param errors: The Invalid.error_dict from validating the value before
+            it was changed, or None if it was valid.
+        @param changed: Iterable of the paths of the changed parts, e.g.
+            'people.3.name'.
+        """
+        from schemaish.incremental import revalidate
+        errors = revalidate(self, value, errors, changed)
+        if errors:
+            raise Invalid(errors)
+
+    def compile(self, generate=False):
+        """
+        Compile the attribute into a reusable validation plan.
+
+        The plan's validate method gives exactly the same result as the
+        attribute's but avoids walking the attribute tree on every call.
+
+        @keyword generate: Generate and compile Python source for the
+            attribute instead, which is faster again to validate with but
+            slower to build (see L{schemaish.codegen}).
+        @return: A L{schemaish.plan.ValidationPlan}, or a
+            L{schemaish.codegen.GeneratedValidator} if generate is true.
+        """
+        if generate:
+            from schemaish.codegen import GeneratedValidator
+            return GeneratedValidator(self)
+        from schemaish.plan import ValidationPlan
+        return ValidationPlan(self)
+
+    def freeze(self):
+        """
+        Make the attribute, and all the attributes it contains, immutable so
+        that it can be shared safely, e.g. between schemas.
+
+        Setting or deleting an attribute of a frozen attribute raises
+        AttributeError and adding to a frozen container raises TypeError.
+        Frozen attributes are otherwise unchanged; they validate, pickle and
+        copy as before. Freezing is permanent.
+
+        @return: The attribute itself.
+        """
+        self._freeze_children()
+        self.__class__ = _frozen_class(type(self))
+        return self
+
+    def _freeze_children(self):
+        """
+        Freeze any attributes this attribute contains, making its own
+        collections of them immutable.
+        """
+        pass
 
     def __repr__(self):
         attributes = []
@@ -111,10 +549,102 @@ class Attribute(object):
                                      ', '.join(attributes))
 
 
+_member_descriptor = type(Attribute.title)
+_attribute_validate = Attribute.validate.im_func
+_attribute__validate = Attribute._validate.im_func
+
+
+# How instances of a class are validated.
+_VISIT = 1      # Through their own validate, which they override.
+_NATIVE = 2     # Through their own _validate, which they extend.
+_LEAF = 3       # By calling their validator.
+
+# Kinds of the classes validated so far, by class, and those of them that
+# are leaves and native. Classes are only found in the sets once visited.
+_kinds = {}
+_leaves = set()
+_natives = set()
+
+
+def _validation_kind(cls):
+    """
+    Return how instances of cls are validated, remembering it in _kinds.
+    """
+    if cls.validate.im_func is not _attribute_validate:
+        kind = _VISIT
+    elif cls._validate.im_func is _attribute__validate:
+        kind = _LEAF
+    else:
+        kind = _NATIVE
+    _kinds[cls] = kind
+    if kind == _LEAF:
+        _leaves.add(cls)
+    elif kind == _NATIVE:
+        _natives.add(cls)
+    return kind
+
+
+class _Frozen(object):
+    """
+    Mixin of the frozen variant of an attribute class, see
+    Attribute.freeze.
+    """
+    __slots__ = ()
+    frozen = True
+
+    def __setattr__(self, name, value):
+        raise AttributeError("can't set %r of a frozen attribute" % name)
+
+    def __delattr__(self, name):
+        raise AttributeError("can't delete %r of a frozen attribute" % name)
+
+    def freeze(self):
+        return self
+
+    def __reduce__(self):
+        return _unpickle_frozen, (self._unfrozen_class, self.__getstate__())
+
+
+def _frozen_add(self, *args):
+    raise TypeError("can't add to a frozen attribute")
+
+
+_frozen_classes = {}
+
+
+def _frozen_class(cls):
+    """
+    Return the frozen variant of cls, creating it on first use. The variant
+    has the same name and instance layout as cls so an instance can be
+    switched to it.
+    """
+    if issubclass(cls, _Frozen):
+        return cls
+    frozen = _frozen_classes.get(cls)
+    if frozen is None:
+        clsattrs = {'__slots__': (), '__module__': cls.__module__,
+                    '_unfrozen_class': cls}
+        if hasattr(cls, 'add'):
+            clsattrs['add'] = _frozen_add
+        frozen = type(cls)(cls.__name__, (_Frozen, cls), clsattrs)
+        _frozen_classes[cls] = frozen
+    return frozen
+
+
+def _unpickle_frozen(cls, state):
+    """
+    Recreate a frozen attribute from its unfrozen class and state.
+    """
+    attr = cls.__new__(cls)
+    attr.__setstate__(state)
+    return attr.freeze()
+
+
 class String(Attribute):
     """
     A Python unicode instance.
     """
+    __slots__ = ()
     type = 'String'
 
 
@@ -122,6 +652,7 @@ class Integer(Attribute):
     """
     A Python integer.
     """
+    __slots__ = ()
     type='Integer'
 
 
@@ -129,6 +660,7 @@ class Float(Attribute):
     """
     A Python float.
     """
+    __slots__ = ()
     type='Float'
 
 
@@ -136,6 +668,7 @@ class Decimal(Attribute):
     """
     A decimal.Decimal instance.
     """
+    __slots__ = ()
     type='Decimal'
 
 
@@ -143,6 +676,7 @@ class Date(Attribute):
     """
     A datetime.date instance.
     """
+    __slots__ = ()
     type='Date'
 
 
@@ -150,6 +684,7 @@ class Time(Attribute):
     """
     A datetime.time instance.
     """
+    __slots__ = ()
     type='Time'
 
 
@@ -157,6 +692,7 @@ class DateTime(Attribute):
     """
     A datetime.datetime instance.
     """
+    __slots__ = ()
     type='DateTime'
 
 
@@ -164,10 +700,12 @@ class Boolean(Attribute):
     """
     A Python Boolean instance.
     """
+    __slots__ = ()
     type='Boolean'
 
 
 class Container(Attribute):
+    __slots__ = ()
     type='Container'
 
 
@@ -177,57 +715,157 @@ class Sequence(Container):
 
     @ivar attr: Attribute type of items in the sequence.
     """
+    __slots__ = ('attr', 'vectorize')
     type = 'Sequence'
-    attr = None
+    _slot_defaults = dict(Attribute._slot_defaults, attr=None, vectorize=False)
 
-    def __init__(self, attr=None, **k):
+    def __init__(self, attr=None, vectorize=None, **k):
         """
         Create a new Sequence instance.
 
         @keyword attr: Attribute type of items in the sequence.
+        @keyword vectorize: Check all items in one batched pass where the
+            item attribute's validator allows it (see L{schemaish.vector}).
         """
         super(Sequence, self).__init__(**k)
-        if attr is not None:
-            self.attr = attr
-
-    def validate(self, value):
+        if attr is None or vectorize is None:
+            defaults = _class_defaults(type(self))
+            if attr is None:
+                attr = defaults['attr']
+            if vectorize is None:
+                vectorize = defaults['vectorize']
+        self.attr = attr
+        self.vectorize = vectorize
+
+    def _validate(self, value, collector):
         """
         Validate all items in the sequence and then validate the Sequence
         itself.
         """
-        error_dict= {}
         if value is not None:
-            for n, item in enumerate(value):
-                try:
-                    self.attr.validate(item)
-                except Invalid, e:
-                    for k, v in e.error_dict.items():
-                        if k == '':
-                            error_dict[str(n)] = v
-                        else:
-                            error_dict['%s.%s' % (str(n), k)] = v
+            if collector.executor is not None:
+                self._validate_chunked(value, collector)
+            else:
+                self._validate_items(value, 0, collector)
+        if self.validator:
+            _attribute__validate(self, value, collector)
 
+    def _validate_items(self, items, offset, collector):
+        """
+        Validate items, numbering them from offset.
+        """
+        attr, path = self.attr, collector.path
         try:
-            super(Sequence, self).validate(value)
-        except Invalid, e:
-            error_dict.update(e.error_dict)
-            
-        if error_dict:
-            raise Invalid(error_dict)
+            kind = _kinds[type(attr)]
+        except KeyError:
+            kind = _validation_kind(type(attr))
+        # Inline the common cases of visit.
+        native = collector.inline and kind != _VISIT and attr.cache is None
+        check = None
+        if native and self.vectorize:
+            check = self._batch_check()
+        path.append(None)
+        if check is not None:
+            for n, item in check(items):
+                path[-1] = n + offset
+                attr._validate(item, collector)
+        elif native and kind == _LEAF:
+            # Only record the index of items that fail.
+            validator = attr.validator
+            if validator:
+                for n, item in enumerate(items, offset):
+                    try:
+                        result = validator(item)
+                    except validatish.Invalid, e:
+                        path[-1] = n
+                        collector.add(e)
+                    else:
+                        if result is not None:
+                            path[-1] = n
+                            collector.defer(result)
+        elif native:
+            for n, item in enumerate(items, offset):
+                path[-1] = n
+                attr._validate(item, collector)
+        else:
+            for n, item in enumerate(items, offset):
+                path[-1] = n
+                collector.visit(attr, item)
+        path.pop()
+
+    def _validate_chunked(self, value, collector):
+        """
+        Validate the items in chunks, in parallel, using the collector's
+        executor and merge the errors back in, in order.
+        """
+        if not hasattr(value, '__getitem__'):
+            value = list(value)
+        size = collector.chunk_size
+        futures = [
+            collector.executor.submit(_validate_chunk, self,
+                                      value[offset:offset+size], offset,
+                                      isinstance(collector.errors, _FirstError))
+            for offset in xrange(0, len(value), size)]
+        key = None
+        if collector.path:
+            key = collector.key()
+        try:
+            for future in futures:
+                errors = future.result()
+                if errors and key is not None:
+                    errors = dict(('%s.%s' % (key, k), v)
+                                  for k, v in errors.iteritems())
+                collector.errors.update(errors)
+        except _Stop:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _batch_check(self):
+        """
+        Return the batched check for the items of the sequence, or None if
+        the items must be validated one by one.
+        """
+        if _validation_kind(type(self.attr)) != _LEAF or \
+                self.attr.cache is not None:
+            return None
+        from schemaish.vector import batch_check
+        return batch_check(self.attr.validator)
+
+    def _freeze_children(self):
+        if self.attr is not None:
+            self.attr.freeze()
 
     def __repr__(self):
         return 'schemaish.Sequence(%r)'%self.attr
 
 
+def _validate_chunk(sequence, items, offset, fail_fast):
+    """
+    Validate a chunk of a sequence's items, returning the errors with keys
+    relative to the sequence. Run by an executor, possibly in another process.
+    """
+    collector = _Collector(fail_fast)
+    try:
+        sequence._validate_items(items, offset, collector)
+    except _Stop:
+        pass
+    return dict(collector.errors)
+
+
 class Tuple(Attribute):
     """
     A Python tuple of attributes of specific types.
 
+    Errors in the tuple's items are keyed by their position, as a sequence's
+    are, e.g. 'point.1'.
+
     @ivar attrs: List of Attributes that define the items in the tuple.
     """
  
+    __slots__ = ('attrs', '_attr_index')
     type = 'Tuple'
-    attrs = None
+    _slot_defaults = dict(Attribute._slot_defaults, attrs=None)
 
     def __init__(self, attrs=None, **k):
         """
@@ -236,8 +874,9 @@ class Tuple(Attribute):
         @param attrs: List of Attributes that define the items in the tuple.
         """
         super(Tuple, self).__init__(**k)
-        if attrs is not None:
-            self.attrs = attrs
+        if attrs is None:
+            attrs = _class_defaults(type(self))['attrs']
+        self.attrs = attrs
 
     def add(self, attr):
         """
@@ -250,35 +889,179 @@ class Tuple(Attribute):
         else:
             self.attrs.append(attr)
 
-    def validate(self, value):
+    def _positions(self):
         """
-        Validate the tuple's items and the tuple itself.
+        Return the tuple's (attr, key) pairs and their number, rebuilding them
+        if the attrs list has been replaced or modified directly.
+        """
+        attrs = self.attrs
+        index = getattr(self, '_attr_index', None)
+        if index is None or index[0] is not attrs or \
+                index[1] != len(attrs or ()):
+            index = self._attr_index = _index_positions(attrs)
+        return index[2], index[1]
+
+    def _validate(self, value, collector):
+        """
+        Validate the tuple's items, recording errors against their positions,
+        and then the tuple itself. A tuple of the wrong size is only recorded
+        as such.
         """
         if value:
-            if len(self.attrs) != len(value):
-                raise Invalid({'':validatish.Invalid("Incorrect size")})
-            for attr, item in zip(self.attrs, value):
-                attr.validate(item)
-        super(Tuple, self).validate(value)
+            positions, arity = self._positions()
+            if len(value) != arity:
+                collector.add(validatish.Invalid("Incorrect size"))
+                return
+            path = collector.path
+            if collector.inline:
+                leaves, natives = _leaves, _natives
+            else:
+                leaves = natives = ()
+            for n, item in enumerate(value):
+                attr, key = positions[n]
+                # Inline the common cases of visit, only extending the path
+                # for items that are descended into or fail.
+                if type(attr) in leaves and attr.cache is None:
+                    validator = attr.validator
+                    if validator:
+                        try:
+                            result = validator(item)
+                        except validatish.Invalid, e:
+                            path.append(key)
+                            collector.add(e)
+                            path.pop()
+                        else:
+                            if result is not None:
+                                path.append(key)
+                                collector.defer(result)
+                                path.pop()
+                    continue
+                path.append(key)
+                if type(attr) in natives and attr.cache is None:
+                    attr._validate(item, collector)
+                else:
+                    collector.visit(attr, item)
+                path.pop()
+        if self.validator:
+            _attribute__validate(self, value, collector)
+
+    def _freeze_children(self):
+        if self.attrs is not None:
+            self.attrs = tuple(attr.freeze() for attr in self.attrs)
+        self._attr_index = _index_positions(self.attrs)
 
     def __repr__(self):
         return 'schemaish.Tuple(%r)'%(self.attrs,)
 
 
+def _index_positions(attrs):
+    """
+    Build the (attr, key) pairs of a tuple's attrs list, stored, like a
+    structure's name index, with the list and its length.
+    """
+    positions = tuple((attr, str(n)) for n, attr in enumerate(attrs or ()))
+    return attrs, len(positions), positions
+
+
 class _StructureMeta(type):
     def __init__(cls, name, bases, clsattrs):
-        # Gather attrs specific to this class.
-        cls.__schemaish_structure_attrs__ = list(
-            (name, value) for (name, value) in clsattrs.iteritems()
-            if isinstance(value, Attribute))
-        # Combine all attrs from this class and its subclasses.
-        attrs = []
-        for c in cls.__mro__:
-            attrs.extend(getattr(c, '__schemaish_structure_attrs__', []))
-        # Sort the attrs to maintain the order as defined, and assign to the
-        # class.
-        attrs.sort(key=lambda i: i[1]._meta_order)
-        cls.attrs = attrs
+        # Gather attrs specific to this class, in the order they were defined.
+        own = [(name, value) for (name, value) in clsattrs.iteritems()
+               if isinstance(value, Attribute)]
+        own.sort(key=lambda i: i[1]._meta_order)
+        cls.__schemaish_structure_attrs__ = own
+        # Combine all attrs from this class and its subclasses, sorted to
+        # maintain the order as defined, and assign to the class. Instances
+        # share the list until they change it, see _StructureAttrs.
+        parents = [b for b in bases if isinstance(b, _StructureMeta)]
+        if len(parents) == 1 and parents[0]._attr_orders is not None and \
+                len(parents[0]._attr_orders) == len(parents[0]._class_attrs):
+            attrs, orders, index = _extend_attrs(parents[0], own)
+        else:
+            attrs = []
+            for c in cls.__mro__:
+                attrs.extend(getattr(c, '__schemaish_structure_attrs__', []))
+            attrs.sort(key=lambda i: i[1]._meta_order)
+            orders = [attr._meta_order for (name, attr) in attrs]
+            index = _index_attrs(attrs)
+        cls._class_attrs = attrs
+        cls._attr_orders = orders
+        cls._attr_index = index
+
+    def __setattr__(cls, name, value):
+        if name == 'attrs':
+            # Replace the attrs the class's instances share, keeping the
+            # descriptor. Subclasses created afterwards gather their attrs
+            # from the declarations again, as the orders are unknown.
+            type.__setattr__(cls, '_class_attrs', value)
+            type.__setattr__(cls, '_attr_orders', None)
+            type.__setattr__(cls, '_attr_index', _index_attrs(value))
+            return
+        type.__setattr__(cls, name, value)
+
+
+def _extend_attrs(parent, own):
+    """
+    Merge a structure class's own attrs, sorted, into the already sorted
+    attrs of its only structure base class, giving the same result as sorting
+    them all. Returns the attrs, their orders and their name index.
+
+    Where attrs share an order, e.g. an attribute overridden by the same
+    attribute, the class's own come first.
+    """
+    attrs, orders = parent._class_attrs, parent._attr_orders
+    if not own:
+        attrs = list(attrs)
+        return attrs, orders, (attrs, len(attrs), parent._attr_index[2])
+    own_orders = [attr._meta_order for (name, attr) in own]
+    if not orders or own_orders[0] > orders[-1]:
+        # The usual case: a subclass's attributes are created after those of
+        # its base.
+        index = dict(parent._attr_index[2])
+        attrs = attrs + own
+        for n, (name, attr) in enumerate(own, len(orders)):
+            index.setdefault(name, n)
+        return attrs, orders + own_orders, (attrs, len(attrs), index)
+    attrs, orders = list(attrs), list(orders)
+    for item, order in reversed(zip(own, own_orders)):
+        n = bisect.bisect_left(orders, order)
+        attrs.insert(n, item)
+        orders.insert(n, order)
+    return attrs, orders, _index_attrs(attrs)
+
+
+class _StructureAttrs(object):
+    """
+    Descriptor for Structure.attrs.
+
+    A structure instance shares its class's attrs list until the list is
+    accessed through the instance, and so might be changed, at which point
+    the instance is given its own copy. Structure's own methods read the
+    attrs with _current_attrs, which never copies.
+    """
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return cls._class_attrs
+        attrs = obj.__dict__.get('attrs')
+        if attrs is None:
+            attrs = obj.__dict__['attrs'] = list(obj._class_attrs)
+        return attrs
+
+    def __set__(self, obj, value):
+        obj.__dict__['attrs'] = value
+
+
+def _index_attrs(attrs):
+    """
+    Build the name index of a structure's attrs list. The index is stored with
+    the list it was built from and its length so that a stale index can be
+    detected cheaply.
+    """
+    index = {}
+    for n, (name, attr) in enumerate(attrs):
+        index.setdefault(name, n)
+    return attrs, len(attrs), index
 
 
 class Structure(Container):
@@ -319,13 +1102,12 @@ class Structure(Container):
         """
         super(Structure, self).__init__(**k)
         # If attrs has been passed as an arg then use that as the attrs of the
-        # structure. Otherwise use the class's attrs, making a copy to ensure
-        # that any added attrs to the instance do not get appended to te
-        # class's attrs.
+        # structure. Otherwise share the class's attrs; the instance is given
+        # a copy when it's changed so that the class's attrs are not.
         if attrs is not None:
             self.attrs = attrs
-        else:
-            self.attrs = list(self.attrs)
+
+    attrs = _StructureAttrs()
 
     def add(self, name, attr):
         """
@@ -334,7 +1116,11 @@ class Structure(Container):
         @param name: Attribute name.
         @param attr: Attribute type.
         """
-        self.attrs.append((name, attr))
+        # The name index picks up appended items when it is next used.
+        attrs = self.__dict__.get('attrs')
+        if attrs is None:
+            attrs = self.attrs
+        attrs.append((name, attr))
 
     def get(self, name):
         """
@@ -343,44 +1129,232 @@ class Structure(Container):
         @param name: Name of the attribute to return.
         @raise KeyError: Attribute name could not be found.
         """
-        for (attr_name, attr) in self.attrs:
-            if attr_name == name:
-                return attr
-        raise KeyError(name)
+        attrs = self._current_attrs()
+        n = self._position(attrs, name)
+        if n is None:
+            raise KeyError(name)
+        return attrs[n][1]
 
-    def validate(self, value):
+    def names(self):
         """
-        Validate all items in the sequence and then validate the Sequence
-        itself.
+        Return the names of the structure's attributes, in order.
+        """
+        return [name for (name, attr) in self._current_attrs()]
+
+    def __contains__(self, name):
+        """
+        Test if the structure has an attribute with the given name.
+        """
+        return self._position(self._current_attrs(), name) is not None
+
+    def _position(self, attrs, name):
+        """
+        Return the position in attrs, the current attrs list, of the first
+        attribute called name, or None.
+        """
+        indexed, size, index = self._attr_index
+        if indexed is not attrs or size != len(attrs):
+            index = self._index()
+        n = index.get(name)
+        if n is not None and attrs[n][0] == name:
+            return n
+        # The name isn't where the index has it, or isn't in it: items of
+        # the list may have been replaced.
+        for item in attrs:
+            if item[0] == name:
+                return self._reindex()[name]
+        return None
+
+    def _index(self):
+        """
+        Return the name to attrs position index, rebuilding it if the attrs
+        list has been replaced or shortened and indexing any items appended
+        to it since. Positions must still be checked, as items may have been
+        replaced in place.
+        """
+        attrs, size, index = self._attr_index
+        current = self._current_attrs()
+        if attrs is not current or size > len(attrs):
+            attrs, size, index = self._attr_index = _index_attrs(current)
+        elif size < len(attrs):
+            for n in xrange(size, len(attrs)):
+                index.setdefault(attrs[n][0], n)
+            self._attr_index = attrs, len(attrs), index
+        return index
+
+    def _checked_index(self):
+        """
+        Return the name to attrs position index, checking every position,
+        for callers looking up many names.
+        """
+        attrs = self._current_attrs()
+        index = self._index()
+        for name, n in index.iteritems():
+            if attrs[n][0] != name:
+                return self._reindex()
+        return index
+
+    def _reindex(self):
+        """
+        Rebuild and return the name to attrs position index.
+        """
+        index = _index_attrs(self._current_attrs())
+        if not self.frozen:
+            self._attr_index = index
+        return index[2]
+
+    def _current_attrs(self):
+        """
+        Return the structure's attrs without copying the class's.
+        """
+        return self.__dict__.get('attrs', self._class_attrs)
+
+    def __getstate__(self):
+        state = super(Structure, self).__getstate__()
+        state['attrs'] = self._current_attrs()
+        return state
+
+    def _validate(self, value, collector):
+        """
+        Validate all attributes of the structure and then validate the
+        structure itself.
         """
-        error_dict = {}
         if value is not None:
-            for (name, attr) in self.attrs:
-                try:
-                    attr.validate(value.get(name))
-                except Invalid, e:
-                    for k, v in e.error_dict.items():
-                        if k == '':
-                            error_dict[name] = v
+            path = collector.path
+            if collector.inline:
+                leaves, natives = _leaves, _natives
+            else:
+                leaves = natives = ()
+            for (name, attr) in self.__dict__.get('attrs', self._class_attrs):
+                # Inline the common cases of visit, only extending the path
+                # for attributes that are descended into or fail.
+                if type(attr) in leaves and attr.cache is None:
+                    validator = attr.validator
+                    if validator:
+                        try:
+                            result = validator(value.get(name))
+                        except validatish.Invalid, e:
+                            path.append(name)
+                            collector.add(e)
+                            path.pop()
                         else:
-                            error_dict['%s.%s' % (name, k)] = v
-        try:
-            super(Structure, self).validate(value)
-        except Invalid, e:
-            error_dict.update(e.error_dict)
-            
-        if error_dict:
-            raise Invalid(error_dict)
+                            if result is not None:
+                                path.append(name)
+                                collector.defer(result)
+                                path.pop()
+                    continue
+                path.append(name)
+                if type(attr) in natives and attr.cache is None:
+                    attr._validate(value.get(name), collector)
+                else:
+                    collector.visit(attr, value.get(name))
+                path.pop()
+        if self.validator:
+            _attribute__validate(self, value, collector)
+
+    def _freeze_children(self):
+        self.attrs = tuple((name, attr.freeze())
+                           for (name, attr) in self._current_attrs())
+        self._attr_index = _index_attrs(self.attrs)
 
     def __repr__(self):
         item = '"%s": %s'
-        attrstrings = [item%a for a in self.attrs]
+        attrstrings = [item%a for a in self._current_attrs()]
         return 'schemaish.Structure(%s)'%(', '.join(attrstrings))
 
 
 class File(Attribute):
     """
     A File Object
+
+    Values are L{schemaish.type.File} instances. Their size, type and
+    checksums are checked in one pass over the file (see
+    L{schemaish.type.scan}), if any of them are to be checked.
+
+    @ivar max_size: Maximum size of the file in bytes, or None.
+    @ivar mimetypes: Allowed mimetypes, e.g. ('image/png', 'image/*'), or
+        None for any. The type is sniffed from the file's content, falling
+        back to the value's mimetype if it's not recognized.
+    @ivar digests: Names of hashlib algorithms, e.g. ('sha256',), to checksum
+        the file with. A digest already in the value's metadata must match;
+        otherwise the digest is added to it.
     """
+    __slots__ = ('max_size', 'mimetypes', 'digests')
     type = 'File'
+    _slot_defaults = dict(Attribute._slot_defaults, max_size=None,
+                          mimetypes=None, digests=())
+
+    def __init__(self, max_size=None, mimetypes=None, digests=None, **k):
+        """
+        Create a File instance.
+
+        @keyword max_size: Maximum size of the file in bytes.
+        @keyword mimetypes: Allowed mimetypes; a type may end in '/*'.
+        @keyword digests: Names of hashlib algorithms to checksum the file
+            with.
+        """
+        super(File, self).__init__(**k)
+        if max_size is None or mimetypes is None or digests is None:
+            defaults = _class_defaults(type(self))
+            if max_size is None:
+                max_size = defaults['max_size']
+            if mimetypes is None:
+                mimetypes = defaults['mimetypes']
+            if digests is None:
+                digests = defaults['digests']
+        if mimetypes is not None:
+            mimetypes = tuple(mimetypes)
+        self.max_size = max_size
+        self.mimetypes = mimetypes
+        self.digests = tuple(digests)
+
+    def _validate(self, value, collector):
+        """
+        Check the file's size, type and checksums, and then validate the
+        File itself if they're all right.
+        """
+        if value is not None and getattr(value, 'file', None) is not None \
+                and (self.max_size is not None or self.mimetypes or
+                     self.digests):
+            error = self._check(value)
+            if error is not None:
+                collector.add(error)
+                return
+        super(File, self)._validate(value, collector)
+
+    def _check(self, value):
+        """
+        Return the validatish.Invalid error for the file, or None.
+        """
+        from schemaish.type import scan, sniff
+        found = scan(value.file, self.digests, self.max_size,
+                     head_only=True)
+        if not found.complete:
+            return validatish.Invalid(
+                'must be at most %d bytes' % self.max_size)
+        if self.mimetypes:
+            mimetype = sniff(found.head) or value.mimetype
+            if not _mimetype_allowed(mimetype, self.mimetypes):
+                return validatish.Invalid('is not an allowed type of file')
+        metadata = value.metadata
+        for name in self.digests:
+            digest = found.digests[name]
+            expected = metadata.get(name)
+            if expected is None:
+                metadata[name] = digest
+            elif expected.lower() != digest:
+                return validatish.Invalid('does not match its %s checksum'
+                                          % name)
+        return None
+
+
+def _mimetype_allowed(mimetype, allowed):
+    if not mimetype:
+        return False
+    mimetype = mimetype.split(';', 1)[0].strip().lower()
+    for pattern in allowed:
+        if pattern == mimetype or pattern.endswith('/*') and \
+                mimetype.startswith(pattern[:-1]):
+            return True
+    return False
 
@@ -0,0 +1,474 @@
+"""
+Compact binary serialization of attribute trees.
+
+Building a large schema by importing modules full of Structure subclasses is
+slow. A schema dumped with L{dumps} or L{dump} loads back with L{loads} or
+L{load} without executing any of that code:
+
+>>> from schemaish import Structure, String
+>>> from schemaish import binary
+>>> schema = Structure([('name', String(title='Name'))])
+>>> binary.loads(binary.dumps(schema))
+schemaish.Structure("name": schemaish.String(title='Name'))
+
+The format is a short header, naming the format's version, followed by the
+schema in marshal format. Attributes used in more than one place (e.g. by
+interned schemas, see L{schemaish.interning}) are stored once and shared again
+when loaded, as are equal validatish validators, and frozen attributes are
+loaded frozen.
+
+All the attribute types can be dumped, as can validatish validators,
+functions and classes that can be imported by name (they're imported when
+loaded) and attribute settings and defaults made of None, booleans, numbers,
+strings, dates, times, decimals and lists, tuples, sets and dicts of them.
+Subclasses of the attribute types that only declare attributes or override
+settings, such as most declarative structures, are loaded as the schemaish
+class they're based on, so that their modules don't need importing.
+
+The marshal format is specific to the version of Python, so data should only
+be loaded by the version that dumped it.
+"""
+
+import datetime
+import decimal
+import marshal
+import keyword
+import mmap
+import re
+import sys
+
+import validatish.validator
+
+from schemaish import attr as _attr
+from schemaish.attr import Attribute, _MISSING, _member_descriptor
+from schemaish.attr import _slot_names
+from schemaish.fingerprint import _canonical
+
+
+MAGIC = 'schemaish'
+VERSION = 1
+
+_HEADER = '%s%c' % (MAGIC, VERSION)
+
+
+def dumps(attr):
+    """
+    Return the attribute tree serialized as a string.
+
+    @param attr: The attribute to serialize.
+    @raise ValueError: The attribute has a setting or validator that can't
+        be serialized.
+    """
+    return _HEADER + marshal.dumps(_Dumper().dump(attr))
+
+
+def dump(attr, fp):
+    """
+    Write the attribute tree, serialized, to a file.
+
+    @param attr: The attribute to serialize.
+    @param fp: File opened for writing in binary mode.
+    """
+    fp.write(dumps(attr))
+
+
+def loads(data):
+    """
+    Load an attribute tree from a string, or any read-only buffer, returned
+    by L{dumps}.
+
+    @raise ValueError: The data is not a serialized attribute tree of this
+        version of the format.
+    """
+    header = len(_HEADER)
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a serialized schema')
+    if data[len(MAGIC):header] != _HEADER[len(MAGIC):]:
+        raise ValueError('Unsupported version %d of the schema format' %
+                         ord(data[len(MAGIC):header] or '\0'))
+    try:
+        return _load(marshal.loads(buffer(data, header)))
+    except (EOFError, IndexError, TypeError, ValueError):
+        raise ValueError('Corrupt serialized schema')
+
+
+def load(fp):
+    """
+    Load an attribute tree from a file written by L{dump}.
+
+    A real file is memory mapped rather than read into a string first.
+    Either way loading starts at the file's current position and leaves the
+    file at its end.
+
+    @param fp: File opened for reading in binary mode.
+    """
+    try:
+        fileno = fp.fileno()
+        start = fp.tell()
+    except (AttributeError, IOError):
+        return loads(fp.read())
+    # Maps must start at a multiple of the allocation granularity.
+    offset = start - start % mmap.ALLOCATIONGRANULARITY
+    try:
+        data = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ, offset=offset)
+    except (EnvironmentError, ValueError):
+        # e.g. an empty file, or a pipe.
+        return loads(fp.read())
+    try:
+        return loads(buffer(data, start - offset))
+    finally:
+        data.close()
+        fp.seek(0, 2)
+
+
+# Tags of encoded values. Encoded values are tuples starting with their tag;
+# None, booleans, numbers and strings are stored as they are.
+_ATTR = 0       # An attribute, by index.
+_VALIDATOR = 1  # A validator, by index.
+_GLOBAL = 2     # A class or function, by index.
+_ATTRS = 3      # A list of attributes.
+_ITEMS = 4      # A list of (name, attribute) pairs.
+_TUPLE = 5
+_LIST = 6
+_DICT = 7
+_SET = 8
+_FROZENSET = 9
+_DATE = 10
+_TIME = 11
+_DATETIME = 12
+_DECIMAL = 13
+
+
+_scalar_types = frozenset([type(None), bool, int, long, float, str, unicode])
+
+
+class _Dumper(object):
+    """
+    Serializer of one attribute tree into tables of globals, kinds,
+    validators and attributes, each entry only referring to entries before
+    it.
+
+    Validators and attributes are stored as (kind, values, encoded) tuples.
+    The kind is their class, whether they're frozen and the names of their
+    state's values, split into those stored as they are (values) and those
+    that are encoded; it's stored once for all the validators or attributes
+    that share it. Settings an attribute takes from its class, e.g. the
+    shared default validator, are left out.
+    """
+
+    def __init__(self):
+        self.globals = []
+        self.kinds = []
+        self.validators = []
+        self.attrs = []
+        self._ids = {}
+        # Keep everything seen alive so ids are not reused while dumping.
+        self._seen = []
+
+    def dump(self, attr):
+        root = self.attr(attr)
+        return self.globals, self.kinds, self.validators, self.attrs, root
+
+    def _index(self, obj, table, make):
+        key = id(table), id(obj)
+        index = self._ids.get(key)
+        if index is None:
+            entry = make(obj)
+            index = self._ids[key] = len(table)
+            table.append(entry)
+            self._seen.append(obj)
+        return index
+
+    def attr(self, attr):
+        return self._index(attr, self.attrs, self._attr_entry)
+
+    def _attr_entry(self, attr):
+        cls = _plain_class(getattr(type(attr), '_unfrozen_class', type(attr)))
+        state = attr.__getstate__()
+        state.pop('_meta_order', None)
+        state.pop('_attr_index', None)
+        # Caches are not saved; loaded attributes have none.
+        state.pop('cache', None)
+        for name, default in _defaults(cls):
+            if state.get(name, _MISSING) is default:
+                del state[name]
+        return self.entry(cls, attr.frozen, state)
+
+    def global_(self, obj):
+        return self._index(obj, self.globals, _global_entry)
+
+    def validator(self, validator):
+        # Equal validators are stored once, as interning shares them.
+        key = 'validator', _canonical(validator)
+        index = self._ids.get(key)
+        if index is None:
+            index = self._ids[key] = self._index(validator, self.validators,
+                                                 self._validator_entry)
+        return index
+
+    def _validator_entry(self, validator):
+        return self.entry(type(validator), False, vars(validator))
+
+    def entry(self, cls, frozen, state):
+        plain, encoded = [], []
+        for name in sorted(state):
+            if type(state[name]) in _scalar_types:
+                plain.append(name)
+            else:
+                encoded.append(name)
+        kind = self.global_(cls), frozen, tuple(plain), tuple(encoded)
+        index = self._ids.get(kind)
+        if index is None:
+            index = self._ids[kind] = len(self.kinds)
+            self.kinds.append(kind)
+        return (index, tuple([state[name] for name in plain]),
+                tuple([self.value(state[name]) for name in encoded]))
+
+    def value(self, value):
+        """
+        Return the encoded form of a setting's value.
+        """
+        if type(value) in _scalar_types:
+            return value
+        if isinstance(value, Attribute):
+            return _ATTR, self.attr(value)
+        if isinstance(value, validatish.validator.Validator):
+            return _VALIDATOR, self.validator(value)
+        if isinstance(value, (list, tuple)):
+            if value and all(isinstance(v, Attribute) for v in value):
+                return _ATTRS, [self.attr(v) for v in value]
+            if value and all(type(v) in (list, tuple) and len(v) == 2 and
+                             isinstance(v[1], Attribute) and
+                             isinstance(v[0], basestring) for v in value):
+                return _ITEMS, [(name, self.attr(v)) for (name, v) in value]
+            tag = _LIST
+            if isinstance(value, tuple):
+                tag = _TUPLE
+            return tag, [self.value(v) for v in value]
+        if isinstance(value, dict):
+            return _DICT, [(self.value(k), self.value(v))
+                           for (k, v) in value.iteritems()]
+        if isinstance(value, (set, frozenset)):
+            tag = _SET
+            if isinstance(value, frozenset):
+                tag = _FROZENSET
+            return tag, [self.value(v) for v in value]
+        if isinstance(value, datetime.datetime):
+            if value.tzinfo is None:
+                return (_DATETIME, value.year, value.month, value.day,
+                        value.hour, value.minute, value.second,
+                        value.microsecond)
+        elif isinstance(value, datetime.date):
+            return _DATE, value.year, value.month, value.day
+        elif isinstance(value, datetime.time):
+            if value.tzinfo is None:
+                return (_TIME, value.hour, value.minute, value.second,
+                        value.microsecond)
+        elif isinstance(value, decimal.Decimal):
+            return _DECIMAL, str(value)
+        elif _global_entry(value, False) is not None:
+            return _GLOBAL, self.global_(value)
+        raise ValueError("Can't serialize %r" % (value,))
+
+
+def _global_entry(obj, required=True):
+    """
+    Return the (module, name) a class or function can be imported by, or
+    raise ValueError (return None if not required) if it can't be.
+    """
+    module = getattr(obj, '__module__', None)
+    name = getattr(obj, '__name__', None)
+    if module is not None and name is not None and \
+            getattr(sys.modules.get(module), name, None) is obj:
+        return module, name
+    if required:
+        raise ValueError("Can't serialize %r" % (obj,))
+    return None
+
+
+# Class attributes added by _StructureMeta and Python itself.
+_bookkeeping = frozenset([
+    '__doc__', '__module__', '__dict__', '__weakref__', '__slots__',
+    '__schemaish_structure_attrs__', '_class_attrs', '_attr_orders',
+    '_attr_index'])
+
+
+def _plain_class(cls):
+    """
+    Return the schemaish class cls is based on if cls only declares
+    attributes or overrides settings, or cls itself.
+    """
+    for base in cls.__mro__:
+        if base.__module__ == _attr.__name__:
+            break
+    else:
+        return cls
+    names = _bookkeeping.union(_slot_names(base))
+    for c in cls.__mro__[:cls.__mro__.index(base)]:
+        for name, value in c.__dict__.iteritems():
+            if name not in names and not isinstance(value, Attribute):
+                return cls
+    return base
+
+
+def _defaults(cls):
+    """
+    Return (name, value) pairs of the settings instances of cls take from
+    the class when they're not given.
+    """
+    defaults = []
+    for name in _slot_names(cls):
+        value = getattr(cls, name, _MISSING)
+        if isinstance(value, _member_descriptor):
+            value = cls._slot_defaults.get(name, _MISSING)
+        if value is not _MISSING:
+            defaults.append((name, value))
+    return defaults
+
+
+def _load(payload):
+    globals_, kinds, validators, attrs, root = payload
+    resolved = [getattr(_import(module), name) for module, name in globals_]
+    loaded_validators = []
+    loaded_attrs = []
+
+    def value(v):
+        tag = v[0]
+        if tag == _VALIDATOR:
+            return loaded_validators[v[1]]
+        if tag == _ATTR:
+            return loaded_attrs[v[1]]
+        if tag == _ATTRS:
+            return [loaded_attrs[i] for i in v[1]]
+        if tag == _ITEMS:
+            return [(name, loaded_attrs[i]) for name, i in v[1]]
+        if tag == _GLOBAL:
+            return resolved[v[1]]
+        if tag == _DICT:
+            return dict((decode(k), decode(i)) for k, i in v[1])
+        if tag == _DATE:
+            return datetime.date(*v[1:])
+        if tag == _TIME:
+            return datetime.time(*v[1:])
+        if tag == _DATETIME:
+            return datetime.datetime(*v[1:])
+        if tag == _DECIMAL:
+            return decimal.Decimal(v[1])
+        return _containers[tag](decode(i) for i in v[1])
+
+    def decode(v):
+        if type(v) is tuple:
+            return value(v)
+        return v
+
+    loaded_kinds = []
+    for cls, frozen, plain, encoded in kinds:
+        cls = resolved[cls]
+        if issubclass(cls, Attribute):
+            # Settings left out because they're the class's.
+            defaults = [(name, default) for (name, default) in _defaults(cls)
+                        if name not in plain and name not in encoded]
+            build = _builder(cls, defaults, plain, encoded, value)
+        else:
+            build = _validator_builder(cls, plain, encoded, value)
+        loaded_kinds.append((build, frozen))
+
+    for kind, values, encoded in validators:
+        loaded_validators.append(loaded_kinds[kind][0](values, encoded))
+
+    to_freeze = []
+    for kind, values, encoded in attrs:
+        build, frozen = loaded_kinds[kind]
+        attr = build(values, encoded)
+        loaded_attrs.append(attr)
+        if frozen:
+            to_freeze.append(attr)
+    # Children come first so they're frozen before their containers.
+    for attr in to_freeze:
+        attr.freeze()
+    return loaded_attrs[root]
+
+
+def _validator_builder(cls, names, encoded_names, value):
+    """
+    Return a function creating a validator of cls from the values and
+    encoded values of its state.
+    """
+    def build(values, encoded):
+        validator = cls.__new__(cls)
+        state = validator.__dict__
+        state.update(zip(names, values))
+        for name, v in zip(encoded_names, encoded):
+            state[name] = value(v)
+        return validator
+    return build
+
+
+_IDENTIFIER = re.compile(r'[A-Za-z_]\w*$')
+
+_builder_code = {}
+
+
+def _builder(cls, defaults, names, encoded_names, value):
+    """
+    Return a function creating an attribute of cls from the values and
+    encoded values of its state, setting defaults first.
+
+    The function is generated, as attributes are loaded by the thousand and
+    assigning their settings one by one is much faster than setattr.
+    """
+    default_names = [name for name, default in defaults]
+    all_names = default_names + list(names) + list(encoded_names)
+    if not all(_IDENTIFIER.match(n) and not keyword.iskeyword(n)
+               for n in all_names):
+        return _generic_builder(cls, defaults, names, encoded_names, value)
+    key = tuple(default_names), names, encoded_names
+    code = _builder_code.get(key)
+    if code is None:
+        lines = ['def make(cls, defaults, value, next):',
+                 '    new = cls.__new__',
+                 '    def build(values, encoded):',
+                 '        attr = new(cls)']
+        for n, name in enumerate(default_names):
+            lines.append('        attr.%s = defaults[%d]' % (name, n))
+        if names:
+            lines.append('        %s, = values' % ', '.join(
+                ['attr.%s' % name for name in names]))
+        for n, name in enumerate(encoded_names):
+            lines.append('        attr.%s = value(encoded[%d])' % (name, n))
+        lines.extend(['        attr._meta_order = next()',
+                      '        return attr',
+                      '    return build'])
+        code = _builder_code[key] = compile('\n'.join(lines) + '\n',
+                                            '<schemaish.binary>', 'exec')
+    namespace = {}
+    exec code in namespace
+    return namespace['make'](cls, [default for name, default in defaults],
+                             value, _attr._meta_order.next)
+
+
+def _generic_builder(cls, defaults, names, encoded_names, value):
+    def build(values, encoded):
+        attr = cls.__new__(cls)
+        for name, v in defaults:
+            setattr(attr, name, v)
+        for name, v in zip(names, values):
+            setattr(attr, name, v)
+        for name, v in zip(encoded_names, encoded):
+            setattr(attr, name, value(v))
+        attr._meta_order = _attr._meta_order.next()
+        return attr
+    return build
+
+
+_containers = {
+    _TUPLE: tuple,
+    _LIST: list,
+    _SET: set,
+    _FROZENSET: frozenset,
+    }
+
+
+def _import(module):
+    __import__(module)
+    return sys.modules[module]
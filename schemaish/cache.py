@@ -0,0 +1,240 @@
+"""
+Caching of validation results.
+
+Validating the same value against the same attribute always gives the same
+result, as long as neither changes and the attribute's validators have no
+side effects. An attribute given a L{ValidationCache} remembers the result of
+validating each value and, when it sees an equal value again, reuses it
+instead of validating the value again:
+
+>>> from schemaish import Structure, String
+>>> from schemaish.cache import ValidationCache, frozen_key
+>>> import validatish
+>>> cache = ValidationCache(key=frozen_key)
+>>> address = Structure([('street', String(validator=validatish.Required()))],
+...                     cache=cache)
+>>> schema = Structure([('home', address), ('work', address)])
+>>> schema.validate({'home': {'street': 'x'}, 'work': {'street': 'x'}})
+>>> cache.hits, cache.misses
+(1, 1)
+
+Any attribute can have a cache, including containers, whose cached result
+covers everything they contain, and one cache can be shared by any number of
+attributes. Caches are used by validate, compiled plans, generated validators
+and stream validation alike (but not by avalidate) and errors are reported
+exactly as they are without a cache.
+
+Invalidation rules:
+
+ - Results are cached for an attribute and a key of the value. By default the
+   key is the value itself, and only values of immutable types (None,
+   booleans, numbers, strings, decimals, dates and times and tuples and
+   frozensets of them) are cached, so a cached result only goes stale if the
+   attribute changes. Pass a key function to cache other values; its key must
+   change whenever the value does.
+ - Attributes can be changed at any time unless they're frozen (see
+   L{schemaish.attr.Attribute.freeze}). Call L{ValidationCache.clear} after
+   changing an attribute with a cache, or anything it contains.
+ - Attributes with validators that have side effects, or depend on anything
+   but the value, should not have a cache. Set enabled to False to stop
+   using a cache temporarily; it's then neither read nor updated.
+
+Attributes that override validate, rather than _validate, are not cached.
+"""
+
+import datetime
+import decimal
+import threading
+
+
+class ValidationCache(object):
+    """
+    Bounded, least recently used cache of validation results. A cache can be
+    shared between threads, e.g. those validating the chunks of a sequence.
+
+    @ivar maxsize: Maximum number of results kept.
+    @ivar enabled: Set to False to stop using the cache.
+    @ivar hits: Number of validations answered from the cache.
+    @ivar misses: Number of cacheable validations not found in the cache.
+    """
+
+    def __init__(self, maxsize=1024, key=None, enabled=True):
+        """
+        Create an empty cache.
+
+        @keyword maxsize: Maximum number of results kept.
+        @keyword key: Function returning the hashable key of a value, or
+            None if the value must not be cached. By default, values of
+            immutable types are their own keys and other values are not
+            cached.
+        @keyword enabled: Whether the cache is used.
+        """
+        self.maxsize = maxsize
+        self.enabled = enabled
+        if key is not None:
+            self.key = key
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        # Entries are kept in a circular doubly linked list of
+        # [prev, next, key, errors] links, least recently used first, and
+        # found by key in a dict, as by Python 3's functools.lru_cache.
+        root = []
+        root[:] = [root, root, None, None]
+        self._root = root
+        self._entries = {}
+
+    def key(self, value):
+        """
+        Return the key of a value, or None if it must not be cached.
+        """
+        if _immutable(value):
+            return frozen_key(value)
+        return None
+
+    def get(self, attr, key):
+        """
+        Return the cached errors, as a tuple of (key, error) pairs, for
+        validating a value with the key with attr, or None if there are none.
+        """
+        with self._lock:
+            link = self._entries.get((attr, key))
+            if link is None:
+                self.misses += 1
+                return None
+            # Move the link to the most recently used end.
+            prev, next, _, errors = link
+            prev[1] = next
+            next[0] = prev
+            root = self._root
+            last = root[0]
+            last[1] = root[0] = link
+            link[0] = last
+            link[1] = root
+            self.hits += 1
+            return errors
+
+    def put(self, attr, key, errors):
+        """
+        Cache the errors found validating a value with the key with attr.
+        """
+        key = (attr, key)
+        with self._lock:
+            entries = self._entries
+            if key in entries or self.maxsize <= 0:
+                return
+            root = self._root
+            if len(entries) >= self.maxsize:
+                # Store the entry in the root, making it the most recently
+                # used, and make the least recently used link the new, empty,
+                # root.
+                root[2] = key
+                root[3] = errors
+                entries[key] = root
+                root = self._root = root[1]
+                del entries[root[2]]
+                root[2] = root[3] = None
+                return
+            last = root[0]
+            link = [last, root, key, errors]
+            last[1] = root[0] = entries[key] = link
+
+    def clear(self):
+        """
+        Forget all cached results and reset the counters.
+        """
+        with self._lock:
+            self._clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        """
+        Return a dict of the cache's hits, misses, size and maxsize.
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        # Results are not worth pickling, and refer to the attributes.
+        state = self.__dict__.copy()
+        del state['_root'], state['_entries'], state['_lock']
+        state['hits'] = state['misses'] = 0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._clear()
+
+    def __repr__(self):
+        return '<schemaish.cache.ValidationCache %r>' % (self.info(),)
+
+
+_immutable_types = frozenset([
+    type(None), bool, int, long, float, str, unicode, decimal.Decimal,
+    datetime.date, datetime.time, datetime.datetime, datetime.timedelta])
+
+
+def _immutable(value):
+    if type(value) in _immutable_types:
+        return True
+    if type(value) in (tuple, frozenset):
+        for item in value:
+            if not _immutable(item):
+                return False
+        return True
+    return False
+
+
+def frozen_key(value):
+    """
+    Key function for caching dicts and lists as well as immutable values.
+    The key is a copy of the value made of tuples, or None if the value
+    contains anything else.
+    """
+    # Types are part of the key to keep e.g. 1, 1.0 and True apart. Leaves
+    # are handled inline, rather than recursively, as they're most common.
+    kind = type(value)
+    if kind in _immutable_types:
+        return kind, value
+    if kind is dict:
+        items = []
+        append = items.append
+        for k, v in value.iteritems():
+            k_kind, v_kind = type(k), type(v)
+            if k_kind in _immutable_types:
+                k = k_kind, k
+            else:
+                k = frozen_key(k)
+                if k is None:
+                    return None
+            if v_kind in _immutable_types:
+                v = v_kind, v
+            else:
+                v = frozen_key(v)
+                if v is None:
+                    return None
+            append((k, v))
+        return dict, frozenset(items)
+    if kind in (list, tuple, frozenset):
+        items = []
+        append = items.append
+        for v in value:
+            v_kind = type(v)
+            if v_kind in _immutable_types:
+                append((v_kind, v))
+            else:
+                v = frozen_key(v)
+                if v is None:
+                    return None
+                append(v)
+        if kind is frozenset:
+            return frozenset, frozenset(items)
+        return kind, tuple(items)
+    return None
@@ -0,0 +1,392 @@
+"""
+Validators generated as Python source.
+
+A L{GeneratedValidator} turns an attribute tree into the source of a single
+Python function, with each structure field unrolled into its own statements,
+field names and error keys written in as constants and fields that can't fail
+(e.g. those validated by validatish.Always) left out. The source is compiled
+once and then validates values without walking the attribute tree, or the
+steps of a L{schemaish.plan.ValidationPlan}, at all.
+
+>>> from schemaish import Structure, String
+>>> import validatish
+>>> schema = Structure([('name', String(validator=validatish.Required()))])
+>>> validator = schema.compile(generate=True)
+>>> validator.validate({'name': 'Tim'})
+
+The generated source only depends on the shape of the attribute tree, i.e.
+its types, names and which attributes have validators; the validators
+themselves are passed in when the compiled source is run. Compiled source is
+cached by the source itself, so schemas of the same shape are compiled only
+once however many times they're built. A frozen attribute can't change, so
+the source and validators generated for it are remembered for as long as it
+exists and it's only generated once however many times it's compiled. Only the
+compiled source is shared between schemas; each generated validator calls
+its own attribute's validators.
+
+Attributes that extend validate or _validate are called as validate would
+call them, so the result is always exactly that of the attribute's validate.
+Like plans, generated validators take a snapshot of the schema; generate a
+new one if the schema is changed afterwards.
+"""
+
+import itertools
+import re
+import weakref
+
+import validatish
+
+from schemaish.attr import Sequence, Structure, Tuple, Invalid
+from schemaish.attr import _Collector, _FirstError, _Stop
+from schemaish.plan import _is_leaf, _is_native, _wait
+
+
+# Limits past which containers are delegated to instead of generated, to stay
+# within Python's limits on statically nested blocks and indentation.
+_MAX_LOOPS = 8
+_MAX_INDENT = 80
+
+# Maximum number of compiled sources kept in the cache.
+cache_size = 256
+
+_cache = {}
+# (source, consts) generated for frozen attributes, by attribute.
+_generated = weakref.WeakKeyDictionary()
+
+
+class GeneratedValidator(object):
+    """
+    A validator generated and compiled from an attribute tree.
+
+    @ivar attr: The attribute the validator was generated from.
+    @ivar source: The generated Python source.
+    """
+
+    def __init__(self, attr):
+        """
+        Generate and compile a validator for the attribute.
+
+        @param attr: The attribute to generate a validator for.
+        """
+        self.attr = attr
+        generated = None
+        if attr.frozen:
+            generated = _generated.get(attr)
+        if generated is None:
+            generated = _generate(attr)
+            # An attribute delegated to is one of its own consts, which would
+            # keep it alive in the weak table.
+            if attr.frozen and not [c for c in generated[1] if c is attr]:
+                _generated[attr] = generated
+        self.source, consts = generated
+        code = _cache.get(self.source)
+        if code is None:
+            code = _add(_cache, self.source,
+                        compile(self.source, '<schemaish.codegen>', 'exec'))
+        namespace = {'Invalid': validatish.Invalid, '_wait': _wait,
+                     '_delegate': _delegate}
+        exec code in namespace
+        self._validate = namespace['_factory'](consts)
+
+    def validate(self, value, fail_fast=False):
+        """
+        Validate the value, raising L{Invalid} exactly as C{attr.validate}
+        would.
+
+        @keyword fail_fast: Stop at the first error found.
+        """
+        if fail_fast:
+            errors = _FirstError()
+            try:
+                self._validate(value, errors)
+            except _Stop:
+                pass
+            errors = dict(errors)
+        else:
+            errors = {}
+            self._validate(value, errors)
+        if errors:
+            raise Invalid(errors)
+
+    def validate_many(self, values):
+        """
+        Validate each of an iterable of values, lazily yielding an
+        (index, error_dict) pair for each. error_dict is None for valid values.
+        """
+        validate = self._validate
+        for n, value in enumerate(values):
+            errors = {}
+            validate(value, errors)
+            yield n, errors or None
+
+    def __repr__(self):
+        return '<schemaish.codegen.GeneratedValidator %r>' % (self.attr,)
+
+
+def clear_cache():
+    """
+    Forget all compiled and generated sources.
+    """
+    _cache.clear()
+    _generated.clear()
+
+
+def _add(cache, key, value):
+    if len(cache) >= cache_size:
+        cache.clear()
+    cache[key] = value
+    return value
+
+
+def _delegate(attr, value, errors, key):
+    """
+    Validate value with an attribute the generated code can't inline,
+    recording errors under key.
+    """
+    collector = _Collector()
+    collector.errors = errors
+    if key != '':
+        collector.path = [key]
+    collector.visit(attr, value)
+
+
+def _generate(attr):
+    """
+    Return the source of a module defining _factory(consts), which returns
+    the validate(value, errors) function for attr, and the consts to pass.
+    """
+    generator = _Generator()
+    generator.attr(attr, 'value', None, 2)
+    lines = ['def _factory(_consts):']
+    if generator.consts:
+        names = ['c%d' % n for n in range(len(generator.consts))]
+        lines.append('    %s, = _consts' % ', '.join(names))
+    lines.append('    def validate(value, errors):')
+    lines.extend(generator.lines or ['        pass'])
+    lines.append('    return validate')
+    return '\n'.join(lines) + '\n', generator.consts
+
+
+def _escape(value):
+    return ('%s' % (value,)).replace('%', '%%')
+
+
+class _Generator(object):
+    """
+    Source generator for an attribute tree.
+
+    Error keys are passed around as None for the top-level attribute, as
+    ('raw', key) for a key known when generating and as ('format', template,
+    names) for a key that includes the indexes of sequence items, held in
+    the variables names.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.consts = []
+        self.loops = 0
+        self._names = itertools.count()
+
+    def emit(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def name(self, prefix):
+        return '%s%d' % (prefix, self._names.next())
+
+    def const(self, value):
+        """
+        Return an expression for a constant value.
+        """
+        if type(value) in (str, unicode):
+            return repr(value)
+        self.consts.append(value)
+        return 'c%d' % (len(self.consts) - 1)
+
+    def key(self, key):
+        """
+        Return an expression for an error key.
+        """
+        if key is None:
+            return "''"
+        if key[0] == 'raw':
+            return self.const(key[1])
+        return '%s %% (%s,)' % (self.const(key[1]), ', '.join(key[2]))
+
+    def attr(self, attr, value, key, indent):
+        """
+        Emit the statements validating the attribute's value, which is the
+        expression value. Only leaves' values may be expressions other than
+        a variable's name, as they're only used once.
+        """
+        if _is_leaf(attr):
+            self.check(attr.validator, value, key, indent)
+        elif indent > _MAX_INDENT:
+            self.delegate(attr, value, key, indent)
+        elif _is_native(attr, Structure):
+            self.structure(attr, value, key, indent)
+        elif _is_native(attr, Sequence) and self.loops < _MAX_LOOPS:
+            self.sequence(attr, value, key, indent)
+        elif _is_native(attr, Tuple):
+            self.tuple(attr, value, key, indent)
+        else:
+            self.delegate(attr, value, key, indent)
+
+    def delegate(self, attr, value, key, indent):
+        self.emit(indent, '_delegate(%s, %s, errors, %s)' % (
+            self.const(attr), value, self.key(key)))
+
+    def check(self, validator, value, key, indent):
+        """
+        Emit a call of a leaf validator.
+        """
+        if not validator:
+            return
+        tests = _guards.get(type(validator))
+        if tests is None:
+            self.emit(indent, 'try:')
+            self.emit(indent + 1, 'r = %s(%s)' % (self.const(validator),
+                                                  value))
+            self.emit(indent + 1, 'if r is not None:')
+            self.emit(indent + 2, '_wait(r)')
+        else:
+            # Only call the validator, to raise its error, if it would fail.
+            tests = tests(validator)
+            if not tests:
+                return
+            if not _NAME.match(value):
+                var = self.name('v')
+                self.emit(indent, '%s = %s' % (var, value))
+                value = var
+            self.emit(indent, 'if %s:' % ' or '.join(
+                [test % {'value': value, 'const': c is not None and
+                         self.const(c)} for test, c in tests]))
+            indent += 1
+            self.emit(indent, 'try:')
+            self.emit(indent + 1, '%s(%s)' % (self.const(validator), value))
+        self.emit(indent, 'except Invalid, e:')
+        self.emit(indent + 1, 'errors[%s] = e' % self.key(key))
+
+    def structure(self, attr, value, key, indent):
+        attrs = attr._current_attrs()
+        if attrs:
+            self.emit(indent, 'if %s is not None:' % value)
+            get = self.name('g')
+            self.emit(indent + 1, '%s = %s.get' % (get, value))
+            for name, child in attrs:
+                if _is_leaf(child):
+                    self.check(child.validator,
+                               '%s(%s)' % (get, self.const(name)),
+                               _child_key(key, name), indent + 1)
+                    continue
+                var = self.name('v')
+                self.emit(indent + 1, '%s = %s(%s)' % (var, get,
+                                                       self.const(name)))
+                self.attr(child, var, _child_key(key, name), indent + 1)
+        self.check(attr.validator, value, key, indent)
+
+    def sequence(self, attr, value, key, indent):
+        item = attr.attr
+        check = None
+        if attr.vectorize:
+            check = attr._batch_check()
+        if check is not None:
+            loop = '%s(%s)' % (self.const(check), '%s')
+        elif _is_leaf(item) and not item.validator:
+            loop = None
+        else:
+            loop = 'enumerate(%s)'
+        if loop is not None:
+            start = len(self.lines)
+            self.emit(indent, 'if %s is not None:' % value)
+            n, var = self.name('n'), self.name('v')
+            self.emit(indent + 1, 'for %s, %s in %s:' % (n, var, loop % value))
+            body = len(self.lines)
+            self.loops += 1
+            self.attr(item, var, _item_key(key, n), indent + 2)
+            self.loops -= 1
+            if len(self.lines) == body:
+                # Nothing to check in the items.
+                del self.lines[start:]
+        self.check(attr.validator, value, key, indent)
+
+    def tuple(self, attr, value, key, indent):
+        # The items, and the tuple itself, are only validated if the tuple is
+        # the right size.
+        positions, arity = attr._positions()
+        ok = None
+        if attr.validator:
+            ok = self.name('ok')
+            self.emit(indent, '%s = True' % ok)
+        self.emit(indent, 'if %s:' % value)
+        self.emit(indent + 1, 'if len(%s) != %d:' % (value, arity))
+        self.emit(indent + 2, "errors[%s] = Invalid('Incorrect size')"
+                  % self.key(key))
+        if ok is not None:
+            self.emit(indent + 2, '%s = False' % ok)
+        if positions:
+            start = len(self.lines)
+            items = [self.name('v') for p in positions]
+            self.emit(indent + 1, 'else:')
+            self.emit(indent + 2, '%s, = %s' % (', '.join(items), value))
+            body = len(self.lines)
+            for (item, name), var in zip(positions, items):
+                self.attr(item, var, _child_key(key, name), indent + 2)
+            if len(self.lines) == body:
+                del self.lines[start:]
+        if ok is not None:
+            self.emit(indent, 'if %s:' % ok)
+            self.check(attr.validator, value, key, indent + 1)
+
+
+_NAME = re.compile(r'[A-Za-z_]\w*$')
+
+
+def _required_tests(validator):
+    return [('not %(value)s and %(value)s != 0', None)]
+
+
+def _range_tests(validator):
+    # In the order the validator compares them.
+    tests = []
+    if validator.max is not None:
+        tests.append(('%(value)s > %(const)s', validator.max))
+    if validator.min is not None:
+        tests.append(('%(value)s < %(const)s', validator.min))
+    return tests
+
+
+# Validators whose checks are written into the generated source. Each
+# function returns a list of (template, constant) tests, any of which is true
+# if the validator may fail, or an empty list if the validator always passes.
+# Templates refer to the value being validated and to the (optional) constant
+# by name.
+_guards = {
+    validatish.Required: _required_tests,
+    validatish.Range: _range_tests,
+    }
+
+
+def _child_key(key, name):
+    """
+    Return the key of a structure's field given the structure's key.
+    """
+    if key is None:
+        return 'raw', name
+    if key[0] == 'raw':
+        try:
+            return 'raw', '.'.join([key[1], name])
+        except TypeError:
+            return 'raw', '%s.%s' % (key[1], name)
+    return 'format', '%s.%s' % (key[1], _escape(name)), key[2]
+
+
+def _item_key(key, n):
+    """
+    Return the key of a sequence's item, whose index is in the variable n,
+    given the sequence's key.
+    """
+    if key is None:
+        return 'format', '%d', [n]
+    if key[0] == 'raw':
+        return 'format', '%s.%%d' % _escape(key[1]), [n]
+    return 'format', '%s.%%d' % key[1], key[2] + [n]
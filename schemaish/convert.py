@@ -0,0 +1,435 @@
+"""
+Conversion of data to and from the Python types of a schema.
+
+A L{Converter} is built once for an attribute and precompiles a conversion
+function for it, so converting a value does not look at the schema's types
+again.
+
+>>> from schemaish import Structure, Integer, Date
+>>> from schemaish.convert import Converter
+>>> schema = Structure([('count', Integer()), ('when', Date())])
+>>> converter = Converter(schema)
+>>> converter.to_python({'count': '12', 'when': '2010-02-10'})
+{'count': 12, 'when': datetime.date(2010, 2, 10)}
+>>> converter.from_python({'count': 12, 'when': None})
+{'count': 12, 'when': None}
+
+to_python accepts strings, as from a form or query string, as well as JSON
+values and values that are already of the right type: Integer accepts 12 and
+'12', Boolean True, 'true', 'yes', 'on' and '1', and so on; Date, Time and
+DateTime accept ISO 8601 strings without a time zone. None, and an empty
+string for anything but a String, is converted to None. Structures are
+converted to dicts with an item for each of their attributes, sequences to
+lists and tuples to tuples.
+
+from_python produces JSON values by default, converting decimals, dates and
+times to strings and tuples to lists. With format='string' every leaf value
+is converted to a string, e.g. for a form; None stays None.
+
+Values that can't be converted are reported by raising L{Invalid}, keyed as
+validate keys errors, e.g. tuple items by their position, with messages in
+validatish's style, e.g. 'must be an integer'.
+
+Leaves are converted according to their attribute's type, e.g. 'Integer', so
+subclasses of the leaf attributes are converted as their base. Leaves of
+types with no conversion, i.e. String, File and attributes of any other type,
+are passed through unchanged, in both directions.
+"""
+
+import datetime
+import decimal
+import re
+
+import validatish
+
+from schemaish.attr import Invalid, Sequence, Structure, Tuple
+from schemaish.vector import _number
+
+
+class Converter(object):
+    """
+    Converter between data and the Python types of an attribute.
+
+    @ivar attr: The attribute the converter was built for.
+    @ivar format: The format from_python produces: 'json' or 'string'.
+    """
+
+    def __init__(self, attr, format='json'):
+        """
+        Build a converter for the attribute.
+
+        @param attr: The attribute to convert values of.
+        @keyword format: 'json' (the default) or 'string', see from_python.
+        """
+        if format not in _from_python:
+            raise ValueError('Unknown format %r' % (format,))
+        self.attr = attr
+        self.format = format
+        self._to_python = _compile(attr, _to_python)
+        self._from_python = _compile(attr, _from_python[format])
+
+    def to_python(self, value):
+        """
+        Convert the value to the attribute's Python types.
+
+        @raise Invalid: Some of the value could not be converted.
+        """
+        return _convert(self._to_python, value)
+
+    def from_python(self, value):
+        """
+        Convert the value from the attribute's Python types to the
+        converter's format.
+
+        @raise Invalid: Some of the value is not of the attribute's types.
+        """
+        return _convert(self._from_python, value)
+
+    def __repr__(self):
+        return '<schemaish.convert.Converter %r %r>' % (self.format,
+                                                         self.attr)
+
+
+class _Errors(Exception):
+    """
+    Conversion errors from inside a container, keyed relative to it.
+    """
+
+    def __init__(self, errors):
+        Exception.__init__(self, errors)
+        self.errors = errors
+
+
+def _convert(convert, value):
+    if convert is None or value is None:
+        return value
+    try:
+        return convert(value)
+    except validatish.Invalid, e:
+        raise Invalid({'': e})
+    except _Errors, e:
+        raise Invalid(e.errors)
+
+
+def _record(errors, key, error):
+    """
+    Record the error (a validatish.Invalid or _Errors) raised converting the
+    item with the given key of a container.
+    """
+    if isinstance(error, _Errors):
+        for k, v in error.errors.iteritems():
+            errors['%s.%s' % (key, k)] = v
+    else:
+        errors[key] = error
+
+
+def _compile(attr, leaves):
+    """
+    Return the function converting values of attr, given the functions
+    converting leaves by type. A leaf that needs no conversion gives None.
+
+    The functions are only called for values that are not None. A Sequence
+    without an item attribute or a Tuple without attrs converts nothing.
+    """
+    if attr is None:
+        return None
+    if isinstance(attr, Structure):
+        return _structure([(name, _compile(a, leaves))
+                           for (name, a) in attr._current_attrs()])
+    if isinstance(attr, Sequence):
+        return _sequence(_compile(attr.attr, leaves))
+    if isinstance(attr, Tuple):
+        return _tuple([_compile(a, leaves) for a in attr.attrs or ()],
+                      leaves is _to_python)
+    return leaves.get(attr.type)
+
+
+def _structure(items):
+    def convert(value):
+        try:
+            get = value.get
+        except AttributeError:
+            raise validatish.Invalid('must be a structure')
+        result = {}
+        errors = None
+        for name, item in items:
+            v = get(name)
+            if item is None or v is None:
+                result[name] = v
+                continue
+            try:
+                result[name] = item(v)
+            except (validatish.Invalid, _Errors), e:
+                if errors is None:
+                    errors = {}
+                _record(errors, name, e)
+        if errors:
+            raise _Errors(errors)
+        return result
+    return convert
+
+
+def _sequence(item):
+    def convert(value):
+        if isinstance(value, (basestring, dict)):
+            raise validatish.Invalid('must be a sequence')
+        if item is None:
+            return list(value)
+        result = []
+        append = result.append
+        errors = None
+        for n, v in enumerate(value):
+            if v is None:
+                append(None)
+                continue
+            try:
+                append(item(v))
+            except (validatish.Invalid, _Errors), e:
+                if errors is None:
+                    errors = {}
+                _record(errors, str(n), e)
+        if errors:
+            raise _Errors(errors)
+        return result
+    return convert
+
+
+def _tuple(items, to_python):
+    size = len(items)
+    def convert(value):
+        if isinstance(value, (basestring, dict)):
+            raise validatish.Invalid('must be a tuple')
+        value = list(value)
+        if len(value) != size:
+            raise validatish.Invalid('must have %d items' % size)
+        result = []
+        errors = None
+        for n, (item, v) in enumerate(zip(items, value)):
+            if item is None or v is None:
+                result.append(v)
+                continue
+            try:
+                result.append(item(v))
+            except (validatish.Invalid, _Errors), e:
+                if errors is None:
+                    errors = {}
+                _record(errors, str(n), e)
+        if errors:
+            raise _Errors(errors)
+        if to_python:
+            return tuple(result)
+        return result
+    return convert
+
+
+# Leaf conversions to Python. Strings, the usual input, are checked for first.
+# An empty string is None for anything but a String.
+
+def _to_integer(value):
+    if isinstance(value, basestring):
+        value = value.strip()
+        if not value:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    elif _number(value):
+        try:
+            if value == int(value):
+                return int(value)
+        except (ValueError, OverflowError):
+            pass
+    raise validatish.Invalid('must be an integer')
+
+
+def _to_float(value):
+    if isinstance(value, basestring):
+        value = value.strip()
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    elif _number(value):
+        return float(value)
+    raise validatish.Invalid('must be a number')
+
+
+def _to_decimal(value):
+    if isinstance(value, basestring):
+        value = value.strip()
+        if not value:
+            return None
+        try:
+            return decimal.Decimal(value)
+        except decimal.InvalidOperation:
+            pass
+    elif isinstance(value, decimal.Decimal):
+        return value
+    elif isinstance(value, float):
+        return decimal.Decimal(repr(value))
+    elif _number(value):
+        return decimal.Decimal(value)
+    raise validatish.Invalid('must be a decimal')
+
+
+_booleans = {
+    'true': True, 'yes': True, 'on': True, '1': True,
+    'false': False, 'no': False, 'off': False, '0': False,
+    }
+
+
+def _to_boolean(value):
+    if isinstance(value, basestring):
+        value = value.strip()
+        if not value:
+            return None
+        result = _booleans.get(value.lower())
+        if result is not None:
+            return result
+    elif isinstance(value, bool):
+        return value
+    elif value == 0 or value == 1:
+        return bool(value)
+    raise validatish.Invalid('must be a boolean')
+
+
+_DATE = re.compile(r'\s*(\d{4})-(\d\d)-(\d\d)\s*$')
+_TIME = re.compile(r'\s*(\d\d):(\d\d)(?::(\d\d)(?:\.(\d{1,6})\d*)?)?\s*$')
+_DATETIME = re.compile(r'\s*(\d{4})-(\d\d)-(\d\d)[T ]'
+                       r'(\d\d):(\d\d)(?::(\d\d)(?:\.(\d{1,6})\d*)?)?\s*$')
+
+
+def _time_args(hour, minute, second, fraction):
+    return (int(hour), int(minute), int(second or 0),
+            int((fraction or '0').ljust(6, '0')))
+
+
+def _to_date(value):
+    if isinstance(value, basestring):
+        match = _DATE.match(value)
+        if match is not None:
+            year, month, day = match.groups()
+            try:
+                return datetime.date(int(year), int(month), int(day))
+            except ValueError:
+                pass
+        elif not value.strip():
+            return None
+    elif isinstance(value, datetime.date) and \
+            not isinstance(value, datetime.datetime):
+        return value
+    raise validatish.Invalid('must be a date')
+
+
+def _to_time(value):
+    if isinstance(value, basestring):
+        match = _TIME.match(value)
+        if match is not None:
+            try:
+                return datetime.time(*_time_args(*match.groups()))
+            except ValueError:
+                pass
+        elif not value.strip():
+            return None
+    elif isinstance(value, datetime.time):
+        return value
+    raise validatish.Invalid('must be a time')
+
+
+def _to_datetime(value):
+    if isinstance(value, basestring):
+        match = _DATETIME.match(value)
+        if match is not None:
+            year, month, day, hour, minute, second, fraction = match.groups()
+            try:
+                return datetime.datetime(
+                    int(year), int(month), int(day),
+                    *_time_args(hour, minute, second, fraction))
+            except ValueError:
+                pass
+        elif not value.strip():
+            return None
+    elif isinstance(value, datetime.datetime):
+        return value
+    raise validatish.Invalid('must be a datetime')
+
+
+_to_python = {
+    'Integer': _to_integer,
+    'Float': _to_float,
+    'Decimal': _to_decimal,
+    'Boolean': _to_boolean,
+    'Date': _to_date,
+    'Time': _to_time,
+    'DateTime': _to_datetime,
+    }
+
+
+# Leaf conversions from Python.
+
+def _checked(types, message, convert=None):
+    """
+    Return a function converting values of the given types with convert
+    (or leaving them unchanged) and raising Invalid for any others. Booleans
+    are only accepted if bool is one of the types.
+    """
+    if not isinstance(types, tuple):
+        types = (types,)
+    bools = bool in types
+    def check(value):
+        if not isinstance(value, types) or \
+                not bools and isinstance(value, bool):
+            raise validatish.Invalid(message)
+        if convert is None:
+            return value
+        return convert(value)
+    return check
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _date_from_python(value):
+    if isinstance(value, datetime.datetime) or \
+            not isinstance(value, datetime.date):
+        raise validatish.Invalid('must be a date')
+    return value.isoformat()
+
+
+def _float_string(value):
+    return repr(float(value))
+
+
+def _boolean_string(value):
+    if value:
+        return 'true'
+    return 'false'
+
+
+_from_python = {
+    'json': {
+        'Integer': _checked((int, long), 'must be an integer'),
+        'Float': _checked((int, long, float), 'must be a number'),
+        'Decimal': _checked(decimal.Decimal, 'must be a decimal', str),
+        'Boolean': _checked(bool, 'must be a boolean'),
+        'Date': _date_from_python,
+        'Time': _checked(datetime.time, 'must be a time', _isoformat),
+        'DateTime': _checked(datetime.datetime, 'must be a datetime',
+                             _isoformat),
+        },
+    'string': {
+        'Integer': _checked((int, long), 'must be an integer', str),
+        'Float': _checked((int, long, float), 'must be a number',
+                          _float_string),
+        'Decimal': _checked(decimal.Decimal, 'must be a decimal', str),
+        'Boolean': _checked(bool, 'must be a boolean', _boolean_string),
+        'Date': _date_from_python,
+        'Time': _checked(datetime.time, 'must be a time', _isoformat),
+        'DateTime': _checked(datetime.datetime, 'must be a datetime',
+                             _isoformat),
+        },
+    }
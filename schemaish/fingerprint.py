@@ -0,0 +1,146 @@
+"""
+Stable fingerprints of attribute trees.
+
+The fingerprint of an attribute is a hex digest of its structure: its class,
+its title, description, default and other settings, its validator and,
+recursively, the names, order and fingerprints of the attributes it contains.
+Equivalent schemas have the same fingerprint, whichever process or run built
+them, so fingerprints can key caches of anything derived from a schema.
+
+>>> from schemaish import Structure, String
+>>> from schemaish.fingerprint import fingerprint
+>>> a = Structure([('name', String(title='Name'))])
+>>> b = Structure([('name', String(title='Name'))])
+>>> fingerprint(a) == fingerprint(b)
+True
+>>> fingerprint(a) == fingerprint(Structure([('title', String())]))
+False
+
+Classes and functions, including validators that are plain functions, are
+identified by their module and name if they can be imported by them. Others,
+e.g. lambdas or functions defined inside functions, only identify themselves
+within the process, as do values whose repr is the default one and bound
+methods. validatish validators are identified by their class and settings and
+any other value by its class and repr.
+
+The fingerprint of a frozen attribute (see
+L{schemaish.attr.Attribute.freeze}) is computed once and remembered; that of
+any other attribute is computed each time, as it may have changed.
+"""
+
+import hashlib
+import sys
+import types
+import weakref
+
+import validatish.validator
+
+from schemaish.attr import Attribute
+
+
+_memo = weakref.WeakKeyDictionary()
+
+
+def fingerprint(attr):
+    """
+    Return the fingerprint of an attribute tree, as a string of 40 hex
+    digits.
+
+    @param attr: The attribute to fingerprint.
+    """
+    if attr.frozen:
+        result = _memo.get(attr)
+        if result is None:
+            result = _memo[attr] = _fingerprint(attr)
+        return result
+    return _fingerprint(attr)
+
+
+def _fingerprint(attr):
+    state = _state(attr)
+    # A cache doesn't change what the attribute validates.
+    state.pop('cache', None)
+    return hashlib.sha1(_describe(attr, state)).hexdigest()
+
+
+def _state(attr):
+    """
+    Return the state describing attr.
+    """
+    state = attr.__getstate__()
+    # The order attributes were declared in only matters once it's reflected
+    # in a structure's attrs.
+    state.pop('_meta_order', None)
+    state.pop('_attr_index', None)
+    return state
+
+
+def _describe(attr, state, attr_key=None):
+    """
+    Return a string that is equal for attributes of attr's class with
+    equivalent states. Attributes in the state are described by
+    attr_key(attribute) if it's given, or else by their fingerprints.
+    """
+    cls = getattr(type(attr), '_unfrozen_class', type(attr))
+    items = ['%s=%s' % (name, _canonical(state[name], attr_key))
+             for name in sorted(state)]
+    return '%s(%s)' % (_name(cls), ', '.join(items))
+
+
+def _name(obj):
+    """
+    Return the name of a class or function, made unique to the object if
+    it's not the object imported by that name.
+    """
+    module, name = obj.__module__, obj.__name__
+    if getattr(sys.modules.get(module), name, None) is obj:
+        return '%s.%s' % (module, name)
+    return '%s.%s@%x' % (module, name, id(obj))
+
+
+def _canonical(value, attr_key=None):
+    """
+    Return a string that is equal for equivalent values. Attributes are
+    described as by L{_describe}.
+    """
+    kind = _simple_types.get(type(value))
+    if kind is not None:
+        return '%s:%r' % (kind, value)
+    if isinstance(value, Attribute):
+        if attr_key is not None:
+            return 'attr:' + attr_key(value)
+        return 'attr:' + fingerprint(value)
+    if type(value) in (list, tuple):
+        items = [_canonical(item, attr_key) for item in value]
+        kind = type(value).__name__
+        if [i for i in items if i.startswith(('attr:', 'attrs:'))]:
+            # Containers hold lists of attributes which become tuples when
+            # frozen; both must match.
+            kind = 'attrs'
+        return '%s:[%s]' % (kind, ', '.join(items))
+    if type(value) is dict:
+        items = sorted([(_canonical(k, attr_key), _canonical(v, attr_key))
+                        for k, v in value.iteritems()])
+        return 'dict:{%s}' % ', '.join(['%s: %s' % item for item in items])
+    if isinstance(value, validatish.validator.Validator):
+        return '%s:%s' % (_name(type(value)),
+                          _canonical(vars(value), attr_key))
+    if isinstance(value, _named_types):
+        return 'def:' + _name(value)
+    if isinstance(value, types.MethodType):
+        return 'id:%x' % id(value)
+    text = repr(value)
+    if text.endswith(' at 0x%x>' % id(value)) or \
+            text.endswith(' at 0x%X>' % id(value)):
+        return 'id:%x' % id(value)
+    return '%s:%s' % (_name(type(value)), text)
+
+
+_simple_types = {
+    type(None): 'None', bool: 'bool', int: 'int', long: 'long',
+    float: 'float', str: 'str', unicode: 'unicode',
+    }
+
+
+_named_types = (type, types.ClassType, types.FunctionType,
+                types.BuiltinFunctionType)
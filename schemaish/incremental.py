@@ -0,0 +1,189 @@
+"""
+Incremental revalidation of changed values.
+
+When a value that has already been validated is changed in a few places, e.g.
+one field of a large form being edited, only the changed parts and the
+containers holding them need validating again:
+
+>>> from schemaish import Structure, String
+>>> import validatish
+>>> schema = Structure([('name', String(validator=validatish.Required())),
+...                     ('email', String(validator=validatish.Email()))])
+>>> value = {'name': '', 'email': 'tim@example.com'}
+>>> errors = revalidate(schema, value, None, [''])
+>>> sorted(errors)
+['name']
+>>> value['name'] = 'Tim'
+>>> revalidate(schema, value, errors, ['name'])
+{}
+
+Changed parts are given as paths, keyed as in Invalid.error_dict: a string of
+names and sequence indexes joined by '.', e.g. 'people.3.name', or a tuple or
+list of them, e.g. ('people', 3, 'name'), for names that contain a '.' or
+aren't strings. The empty path, '' or (), is the whole value. Each changed part
+is validated again, as a whole, and so is every container holding it, but only
+against the container's own validator; the other attributes in a container
+keep their previous errors.
+
+A change to the length of a sequence, or that moves its items, is a change to
+the sequence itself and must be given as such. Tuples, and attributes that
+extend validate or _validate, are always validated again as a whole.
+"""
+
+from schemaish.attr import Sequence, Structure, _Collector
+from schemaish.attr import _attribute__validate
+from schemaish.plan import _is_native
+
+
+# Dirty tree node of a part that changed as a whole.
+_ALL = True
+
+
+def revalidate(attr, value, errors, changed):
+    """
+    Validate the changed parts of a value again, returning the errors
+    validating the whole value would find.
+
+    @param attr: The attribute the value was validated with.
+    @param value: The value, changed since it was last validated.
+    @param errors: The errors found when it was last validated, as
+        Invalid.error_dict, or None if it was valid.
+    @param changed: Iterable of the paths of the parts of the value that have
+        changed since.
+    @return: A new dict of errors, as Invalid.error_dict; empty if the value
+        is valid.
+    """
+    dirty = _dirty(changed)
+    collector = _Collector()
+    if dirty is _ALL or errors is None:
+        errors = {}
+    if dirty is _ALL:
+        collector.visit(attr, value)
+        return collector.errors
+    collector.errors = dict(errors)
+    if dirty:
+        _revalidate(attr, value, dirty, collector)
+    return collector.errors
+
+
+def _split(path):
+    if isinstance(path, basestring):
+        if not path:
+            return ()
+        return path.split('.')
+    return path
+
+
+def _dirty(changed):
+    """
+    Return the tree of changed parts: _ALL if the whole value changed, or a
+    dict mapping the names or indexes of changed children to their own trees.
+    """
+    root = {}
+    for path in changed:
+        path = _split(path)
+        if not path:
+            return _ALL
+        node = root
+        for name in path[:-1]:
+            child = node.get(name)
+            if child is _ALL:
+                break
+            if child is None:
+                child = node[name] = {}
+            node = child
+        else:
+            node[path[-1]] = _ALL
+    return root
+
+
+def _revalidate(attr, value, dirty, collector):
+    """
+    Validate the changed parts, described by the dirty tree, of the value of
+    attr at the collector's path, replacing their errors.
+    """
+    if dirty is not _ALL and value is not None:
+        if _is_native(attr, Structure):
+            children = _structure_children(attr, value, dirty)
+        elif _is_native(attr, Sequence):
+            children = _sequence_children(attr, value, dirty)
+        else:
+            children = None
+        if children is not None:
+            path = collector.path
+            path.append(None)
+            for name, child, item, child_dirty in children:
+                path[-1] = name
+                _revalidate(child, item, child_dirty, collector)
+            path.pop()
+            # Only the container's own validator is left.
+            collector.errors.pop(collector.key(), None)
+            _attribute__validate(attr, value, collector)
+            return
+    _discard(collector.errors, collector.key())
+    collector.visit(attr, value)
+
+
+def _structure_children(attr, value, dirty):
+    """
+    Return (name, attr, value, dirty) tuples of a structure's changed
+    children, or None if the structure must be validated as a whole.
+    """
+    try:
+        get = value.get
+    except AttributeError:
+        return None
+    attrs = attr._current_attrs()
+    index = attr._checked_index()
+    children = []
+    if len(index) == len(attrs):
+        for name, child_dirty in dirty.iteritems():
+            position = index.get(name)
+            if position is not None:
+                children.append((name, attrs[position][1], get(name),
+                                 child_dirty))
+    else:
+        # Names are repeated; all attributes of a name are validated.
+        for name, child in attrs:
+            child_dirty = dirty.get(name)
+            if child_dirty is not None:
+                children.append((name, child, get(name), child_dirty))
+    return children
+
+
+def _sequence_children(attr, value, dirty):
+    """
+    Return (name, attr, value, dirty) tuples of a sequence's changed items,
+    or None if the sequence must be validated as a whole.
+    """
+    if isinstance(value, dict) or not hasattr(value, '__getitem__') or \
+            not hasattr(value, '__len__'):
+        return None
+    size = len(value)
+    children = []
+    for name, child_dirty in dirty.iteritems():
+        try:
+            n = int(name)
+        except (TypeError, ValueError):
+            return None
+        if not 0 <= n < size:
+            return None
+        children.append((str(n), attr.attr, value[n], child_dirty))
+    return children
+
+
+def _discard(errors, key):
+    """
+    Remove the errors of the part of the value with the given key, and of
+    everything it contains.
+    """
+    if key == '':
+        errors.clear()
+        return
+    if not isinstance(key, basestring):
+        errors.pop(key, None)
+        key = '%s' % (key,)
+    prefix = key + '.'
+    for k in errors.keys():
+        if k == key or isinstance(k, basestring) and k.startswith(prefix):
+            del errors[k]
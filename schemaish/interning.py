@@ -0,0 +1,118 @@
+"""
+Structural sharing of attributes.
+
+Schemas built programmatically often repeat the same attributes many times
+over: identical String() leaves, the same address or money structure in many
+places. An L{Interner} hashes attribute trees by their structure and returns a
+single, frozen (see L{schemaish.attr.Attribute.freeze}) attribute for all
+identical subtrees, so each distinct subtree is only held in memory once.
+
+>>> from schemaish import Structure, String
+>>> from schemaish.interning import intern_schema
+>>> a = intern_schema(Structure([('street', String()), ('town', String())]))
+>>> a.get('street') is a.get('town')
+True
+
+Two attributes are identical if they are of the same class, have equal
+titles, descriptions, defaults, validators and other settings, compared as
+L{schemaish.fingerprint} compares them, and have identical children and
+caches. The order attributes were declared in is ignored.
+"""
+
+import weakref
+
+import validatish.validator
+
+from schemaish.attr import Attribute
+from schemaish.fingerprint import _canonical, _describe, _state
+
+
+class Interner(object):
+    """
+    Table of shared attributes and validators.
+
+    The table only refers to its entries weakly so an entry is dropped once
+    no schema uses it any more.
+    """
+
+    def __init__(self):
+        self._table = weakref.WeakValueDictionary()
+
+    def intern(self, attr):
+        """
+        Return the shared, frozen equivalent of attr, which is attr itself
+        only if it's already frozen and shared. The attribute passed in is
+        never changed.
+
+        @param attr: Attribute to intern.
+        """
+        state = _state(attr)
+        changed = not attr.frozen
+        for name, value in state.items():
+            shared = self._share(value)
+            if shared is not value:
+                state[name] = shared
+                changed = True
+        # A cache holds results, so attributes only share the same one.
+        cache = state.pop('cache', None)
+        key = _describe(attr, state, _identity), id(cache)
+        result = self._table.get(key)
+        if result is None:
+            if changed:
+                cls = getattr(type(attr), '_unfrozen_class', type(attr))
+                result = cls.__new__(cls)
+                state['cache'] = cache
+                state['_meta_order'] = getattr(attr, '_meta_order', None)
+                result.__setstate__(state)
+                result.freeze()
+            else:
+                result = attr
+            self._table[key] = result
+        return result
+
+    def _share(self, value):
+        """
+        Return the shared equivalent of a value in an attribute's state.
+        """
+        if isinstance(value, Attribute):
+            return self.intern(value)
+        if isinstance(value, validatish.validator.Validator):
+            key = _canonical(value, _identity)
+            return self._table.setdefault(key, value)
+        if type(value) in (list, tuple):
+            shared = [self._share(item) for item in value]
+            if any(v is not item for v, item in zip(shared, value)):
+                value = type(value)(shared)
+        return value
+
+    def __len__(self):
+        return len(self._table)
+
+    def clear(self):
+        """
+        Forget all shared attributes. Attributes already interned stay
+        frozen.
+        """
+        self._table.clear()
+
+
+def _identity(attr):
+    """
+    Describe an attribute that is already interned, and so shared, by its
+    identity.
+    """
+    return '%x' % id(attr)
+
+
+_interner = Interner()
+
+
+def intern_schema(attr):
+    """
+    Intern attr using a module-wide Interner, sharing identical subtrees
+    with all other attributes interned this way.
+
+    @param attr: Attribute to intern.
+    @return: The shared, frozen equivalent of attr.
+    """
+    return _interner.intern(attr)
@@ -0,0 +1,301 @@
+"""
+Compiled validation plans.
+
+A plan is a flattened, precomputed form of an attribute tree's validation. It
+is built once, with L{schemaish.attr.Attribute.compile}, and can then be used
+to validate any number of values without walking the attribute tree again.
+
+>>> from schemaish import Structure, String
+>>> import validatish
+>>> schema = Structure()
+>>> schema.add('name', String(validator=validatish.Required()))
+>>> plan = schema.compile()
+>>> plan.validate({'name': 'Tim'})
+
+Plans take a snapshot of the schema when they are compiled; recompile the plan
+if the schema is changed afterwards.
+"""
+
+
+import validatish
+
+from schemaish.attr import Attribute, Sequence, Tuple, Structure, Invalid
+from schemaish.attr import _FirstError, _Stop
+
+
+# Step opcodes.
+_FIELD = 0      # Validate a leaf item of a structure.
+_LOAD = 1       # Load an item of a structure into a slot.
+_CHECK = 2      # Validate the value in a slot with a validator.
+_CALL = 3       # Delegate validation of the value in a slot to the attribute.
+_SEQUENCE = 4   # Validate the items of a sequence with a sub-plan.
+_TUPLE = 5      # Check a tuple's size and load its items into slots.
+_ITEMS = 6      # Validate the items of a sequence of leaves.
+_BATCH = 7      # Validate the items of a vectorized sequence of leaves.
+
+
+# Marker for slots whose value must not be validated because a container
+# further up the tree was None.
+_SKIP = object()
+
+
+class ValidationPlan(object):
+    """
+    A flattened validation plan for an attribute tree.
+
+    @ivar attr: The attribute the plan was compiled from.
+    @ivar steps: The flat list of steps making up the plan.
+    """
+
+    def __init__(self, attr):
+        """
+        Compile a plan for the attribute.
+
+        @param attr: The attribute to compile.
+        """
+        self.attr = attr
+        self.slots, self.steps = _compile(attr)
+
+    def validate(self, value, fail_fast=False):
+        """
+        Validate the value, raising L{Invalid} exactly as C{attr.validate}
+        would.
+
+        @keyword fail_fast: Stop at the first error found.
+        """
+        if fail_fast:
+            errors = _FirstError()
+            try:
+                _run(self.steps, self.slots, value, errors, None)
+            except _Stop:
+                pass
+            errors = dict(errors)
+        else:
+            errors = {}
+            _run(self.steps, self.slots, value, errors, None)
+        if errors:
+            raise Invalid(errors)
+
+    def validate_many(self, values):
+        """
+        Validate each of an iterable of values, lazily yielding an
+        (index, error_dict) pair for each. error_dict is None for valid values.
+        """
+        steps, slots = self.steps, self.slots
+        for n, value in enumerate(values):
+            errors = {}
+            _run(steps, slots, value, errors, None)
+            yield n, errors or None
+
+    def __repr__(self):
+        return '<schemaish.plan.ValidationPlan %r (%d steps)>' % (
+            self.attr, len(self.steps))
+
+
+def _is_native(attr, cls):
+    """
+    Test if the attribute validates exactly as cls does, i.e. it can be
+    compiled rather than delegated to. Attributes with a cache are always
+    delegated to.
+    """
+    attr_cls = type(attr)
+    return (isinstance(attr, cls) and attr.cache is None and
+            attr_cls.validate.im_func is Attribute.validate.im_func and
+            attr_cls._validate.im_func is cls._validate.im_func)
+
+
+def _is_leaf(attr):
+    """
+    Test if the attribute is a plain, validator-only attribute.
+    """
+    return _is_native(attr, Attribute)
+
+
+def _wait(result):
+    """
+    Wait for a future-like result returned by a validator, as
+    _Collector.defer does, letting validatish.Invalid through.
+    """
+    wait = getattr(result, 'result', None)
+    if wait is not None:
+        wait()
+
+
+def _path(prefix, key):
+    """
+    Combine a prefix with a key relative to it. Either may be None, meaning the
+    top-level attribute.
+    """
+    if key is None:
+        return prefix
+    if prefix is None:
+        return key
+    return '%s.%s' % (prefix, key)
+
+
+def _merge_key(path, key):
+    """
+    Map a key from an item's error_dict to a key of the container at path,
+    following the same rules as the container validate methods.
+    """
+    if path is None:
+        return key
+    if key == '':
+        return path
+    return '%s.%s' % (path, key)
+
+
+def _compile(attr):
+    """
+    Compile an attribute tree into a (slots, steps) pair. The attribute's value
+    is always in slot 0 and keys are relative to the attribute.
+    """
+    steps = []
+    slots = _compile_into(attr, 0, None, steps, 1)
+    return slots, steps
+
+
+def _compile_into(attr, slot, key, steps, slots):
+    """
+    Append the steps for attr, whose value will be in slot, to steps. Returns
+    the number of slots used so far.
+    """
+    if _is_native(attr, Structure):
+        for name, child in attr._current_attrs():
+            child_key = _path(key, name)
+            if _is_leaf(child):
+                if child.validator:
+                    steps.append((_FIELD, slot, name, child.validator,
+                                  child_key))
+                continue
+            child_slot = slots
+            slots += 1
+            steps.append((_LOAD, slot, name, child_slot, None))
+            slots = _compile_into(child, child_slot, child_key, steps, slots)
+        if attr.validator:
+            steps.append((_CHECK, slot, attr.validator, None, key))
+    elif _is_native(attr, Sequence):
+        check = None
+        if attr.vectorize:
+            check = attr._batch_check()
+        if check is not None:
+            steps.append((_BATCH, slot, check, attr.attr.validator, key))
+        elif _is_leaf(attr.attr):
+            if attr.attr.validator:
+                steps.append((_ITEMS, slot, attr.attr.validator, None, key))
+        else:
+            steps.append((_SEQUENCE, slot, _compile(attr.attr), None, key))
+        if attr.validator:
+            steps.append((_CHECK, slot, attr.validator, None, key))
+    elif _is_native(attr, Tuple):
+        positions, arity = attr._positions()
+        first = slots
+        slots += arity
+        steps.append((_TUPLE, slot, arity, first, key))
+        for n, (child, name) in enumerate(positions):
+            slots = _compile_into(child, first + n, _path(key, name), steps,
+                                  slots)
+        if attr.validator:
+            steps.append((_CHECK, slot, attr.validator, None, key))
+    elif _is_leaf(attr):
+        if attr.validator:
+            steps.append((_CHECK, slot, attr.validator, None, key))
+    else:
+        steps.append((_CALL, slot, attr, None, key))
+    return slots
+
+
+def _run(steps, slots, value, errors, prefix):
+    """
+    Run the steps against value, storing any errors in the errors dict. Keys
+    are made relative to prefix, unless it's None. Returns the number of errors
+    that were stored.
+    """
+    found = 0
+    values = [None] * slots
+    values[0] = value
+    for op, slot, a, b, key in steps:
+        v = values[slot]
+        if v is _SKIP:
+            if op == _LOAD:
+                values[b] = _SKIP
+            elif op == _TUPLE:
+                values[b:b + a] = [_SKIP] * a
+            continue
+        if op == _FIELD:
+            if v is None:
+                continue
+            try:
+                r = b(v.get(a))
+                if r is not None:
+                    _wait(r)
+            except validatish.Invalid, e:
+                errors[_path(prefix, key)] = e
+                found += 1
+        elif op == _LOAD:
+            if v is None:
+                values[b] = _SKIP
+            else:
+                values[b] = v.get(a)
+        elif op == _CHECK:
+            try:
+                r = a(v)
+                if r is not None:
+                    _wait(r)
+            except validatish.Invalid, e:
+                errors[_path(prefix, key) or ''] = e
+                found += 1
+        elif op == _SEQUENCE:
+            if v is None:
+                continue
+            path = _path(prefix, key)
+            item_slots, item_steps = a
+            for n, item in enumerate(v):
+                found += _run(item_steps, item_slots, item, errors,
+                              _path(path, str(n)))
+        elif op == _ITEMS:
+            if v is None:
+                continue
+            path = _path(prefix, key)
+            for n, item in enumerate(v):
+                try:
+                    r = a(item)
+                    if r is not None:
+                        _wait(r)
+                except validatish.Invalid, e:
+                    errors[_path(path, str(n))] = e
+                    found += 1
+        elif op == _BATCH:
+            if v is None:
+                continue
+            path = _path(prefix, key)
+            for n, item in a(v):
+                try:
+                    r = b(item)
+                    if r is not None:
+                        _wait(r)
+                except validatish.Invalid, e:
+                    errors[_path(path, str(n))] = e
+                    found += 1
+        elif op == _TUPLE:
+            if not v:
+                values[b:b + a] = [_SKIP] * a
+            elif len(v) != a:
+                errors[_path(prefix, key) or ''] = \
+                    validatish.Invalid("Incorrect size")
+                found += 1
+                # Nothing else is checked, not even the tuple's validator.
+                values[slot] = _SKIP
+                values[b:b + a] = [_SKIP] * a
+            else:
+                values[b:b + a] = v
+        else:
+            try:
+                a.validate(v)
+            except Invalid, e:
+                path = _path(prefix, key)
+                merged = dict((_merge_key(path, k), error)
+                              for k, error in e.error_dict.items())
+                found += len(merged)
+                errors.update(merged)
+    return found
@@ -0,0 +1,187 @@
+"""
+Profiling of validation by attribute.
+
+A L{Profiler} records how often each attribute of a schema is validated, how
+long it takes and how often it fails, while it's active:
+
+>>> from schemaish import Structure, Sequence, String
+>>> import validatish
+>>> schema = Structure([('tags', Sequence(String(
+...     validator=validatish.Required())))])
+>>> with Profiler() as profiler:
+...     try:
+...         schema.validate({'tags': ['a', '', 'c']})
+...     except Exception:
+...         pass
+>>> stats = profiler.stats()
+>>> sorted(stats)
+['', 'tags', 'tags.*']
+>>> stats['tags.*']['calls'], stats['tags.*']['failures']
+(3, 1)
+
+Attributes are identified by their path, as error keys are, but with the
+items of sequences collected together under '*'. Each path's stats are:
+
+ - calls: the number of times the attribute was validated.
+ - time: the total time, in seconds, spent validating it, including the
+   attributes it contains.
+ - self_time: the part of time not spent in the attributes it contains, i.e.
+   in its own validator.
+ - failures: the number of times an error was found in it, or in anything
+   it contains, and failure_rate the proportion of calls that failed.
+ - attr: the name of the attribute's class.
+
+The same data can be exported as collapsed stacks, one line per path of the
+form 'validate;people;*;name 1234' where the number is the self time in
+microseconds, as read by flamegraph.pl and speedscope.
+
+A profiler records calls of validate (and so of every validation of a
+structure's fields and a sequence's items) in every thread while it's active.
+Compiled plans, generated validators, stream validation, avalidate and
+items validated by an executor are not recorded. Only one profiler can be
+active at a time. When none is, validation only checks that, once per call.
+"""
+
+import threading
+import timeit
+
+from schemaish import attr as _attr
+from schemaish.attr import Sequence, _Collector
+
+
+_timer = timeit.default_timer
+
+
+class Profiler(object):
+    """
+    Recorder of validation statistics by attribute path.
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._local = threading.local()
+
+    def enable(self):
+        """
+        Start recording validation.
+
+        @raise RuntimeError: Another profiler is active.
+        """
+        if _attr._profiler is not None and _attr._profiler is not self:
+            raise RuntimeError('Another profiler is active')
+        _attr._profiler = self
+
+    def disable(self):
+        """
+        Stop recording validation.
+        """
+        if _attr._profiler is self:
+            _attr._profiler = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def clear(self):
+        """
+        Forget everything recorded.
+        """
+        self._stats = {}
+
+    def _collector(self, fail_fast, executor, chunk_size):
+        if getattr(self._local, 'busy', False):
+            # validate called by an attribute's own validate, which is
+            # already being timed.
+            return _Collector(fail_fast, executor, chunk_size)
+        return _ProfilingCollector(self, fail_fast, executor, chunk_size)
+
+    def stats(self):
+        """
+        Return a dict of the stats of each path recorded, keyed by the path.
+        """
+        result = {}
+        for path, (cls, calls, time, self_time, failures) in \
+                self._stats.iteritems():
+            result['.'.join(path)] = {
+                'attr': cls.__name__, 'calls': calls, 'time': time,
+                'self_time': self_time, 'failures': failures,
+                'failure_rate': float(failures) / calls}
+        return result
+
+    def collapsed(self):
+        """
+        Return the self time of each path recorded, in microseconds, as
+        collapsed stacks.
+        """
+        lines = []
+        for path, entry in sorted(self._stats.iteritems()):
+            frames = ['validate'] + [p.replace(';', ':').replace(' ', '_')
+                                     for p in path]
+            lines.append('%s %d' % (';'.join(frames),
+                                    round(entry[3] * 1e6)))
+        return '\n'.join(lines) + '\n'
+
+
+class _ProfilingCollector(_Collector):
+    """
+    Collector that validates every attribute through visit, timing each one.
+    """
+
+    inline = False
+
+    def __init__(self, profiler, fail_fast, executor, chunk_size):
+        super(_ProfilingCollector, self).__init__(fail_fast, executor,
+                                                  chunk_size)
+        self._local = profiler._local
+        self._record = profiler._stats
+        # Stack of the profiled path, the containers on it and the time
+        # spent in the children of each.
+        self._frames = []
+        self._parents = []
+        self._children = [0.0]
+
+    def root(self, attr, value):
+        self._local.busy = True
+        try:
+            self._profile(_Collector.root, attr, value, None)
+        finally:
+            self._local.busy = False
+
+    def visit(self, attr, value):
+        parents = self._parents
+        if parents and isinstance(parents[-1], Sequence):
+            frame = '*'
+        else:
+            frame = '%s' % (self.path[-1],)
+        self._profile(_Collector.visit, attr, value, frame)
+
+    def _profile(self, validate, attr, value, frame):
+        frames, parents, children = self._frames, self._parents, self._children
+        if frame is not None:
+            frames.append(frame)
+        parents.append(attr)
+        children.append(0.0)
+        found = len(self.errors)
+        start = _timer()
+        try:
+            validate(self, attr, value)
+        finally:
+            elapsed = _timer() - start
+            inner = children.pop()
+            parents.pop()
+            path = tuple(frames)
+            if frame is not None:
+                frames.pop()
+            entry = self._record.get(path)
+            if entry is None:
+                entry = self._record[path] = [type(attr), 0, 0.0, 0.0, 0]
+            entry[1] += 1
+            entry[2] += elapsed
+            entry[3] += elapsed - inner
+            if len(self.errors) != found:
+                entry[4] += 1
+            # Don't count the time spent recording in the parent's own time.
+            children[-1] += _timer() - start
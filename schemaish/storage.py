@@ -0,0 +1,238 @@
+"""
+Storage for the content of uploaded files.
+
+A storage keeps the content of files, e.g. of uploads, and gives a key to open
+each one by again. L{store} copies an upload into a storage, in one pass, and
+returns a L{schemaish.type.File} that opens its content from the storage the
+first time its file is used:
+
+>>> from StringIO import StringIO
+>>> storage = SpooledStorage()
+>>> value = store(storage, StringIO('content'), 'a.txt', 'text/plain')
+>>> value.file.read()
+'content'
+
+Two storages are provided, and any object with the same save, open and
+delete methods can be used as a storage:
+
+ - L{SpooledStorage} keeps small files in memory and writes larger ones to
+   temporary files on disk, which are removed when they're deleted or the
+   storage is garbage collected.
+ - L{ContentStore} keeps files in a directory, named by the sha256 digest of
+   their content, so identical files are only stored once.
+
+Files are read and written in chunks of schemaish.type.CHUNK_SIZE bytes, using
+one buffer, so storing a file never holds all of it in memory (except below
+SpooledStorage's threshold) and copies it only once.
+"""
+
+import errno
+import hashlib
+import itertools
+import os
+import re
+import tempfile
+
+from schemaish.type import CHUNK_SIZE, File
+
+
+def store(storage, fp, filename, mimetype, metadata=None):
+    """
+    Copy a file into a storage and return a File value whose file is opened
+    from the storage when it's first used.
+
+    @param storage: The storage to save the file's content in.
+    @param fp: File-like object to read the content from, from its current
+        position.
+    @param filename: The file's name.
+    @param mimetype: The file's mimetype.
+    @keyword metadata: Optional dict of the file's metadata.
+    """
+    key = storage.save(fp)
+    return File(None, filename, mimetype, metadata, storage=storage, key=key)
+
+
+def _chunks(fp, chunk_size=CHUNK_SIZE):
+    """
+    Iterate over the rest of a file in chunks read into a single buffer. Each
+    chunk is only valid until the next one is read.
+    """
+    readinto = getattr(fp, 'readinto', None)
+    if readinto is None:
+        while True:
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    while True:
+        n = readinto(buf)
+        if not n:
+            return
+        if n < chunk_size:
+            yield view[:n]
+        else:
+            yield view
+
+
+class SpooledStorage(object):
+    """
+    Storage of files in memory, for files up to threshold bytes, and in
+    temporary files on disk for larger ones, using
+    tempfile.SpooledTemporaryFile.
+
+    Opening a file returns the stored file object itself, rewound, rather than
+    a copy, so it's shared by every File value with its key.
+
+    @ivar threshold: Size in bytes above which files are stored on disk.
+    @ivar dir: Directory to create temporary files in, or None for the
+        default.
+    """
+
+    def __init__(self, threshold=1024 * 1024, dir=None):
+        """
+        Create an empty storage.
+
+        @keyword threshold: Size in bytes above which files are stored on
+            disk.
+        @keyword dir: Directory to create temporary files in.
+        """
+        self.threshold = threshold
+        self.dir = dir
+        self._files = {}
+        self._keys = itertools.count()
+
+    def save(self, fp):
+        """
+        Store the rest of a file, returning its key.
+        """
+        out = tempfile.SpooledTemporaryFile(self.threshold, dir=self.dir)
+        if self.threshold <= 0:
+            # A max_size of 0 means no limit to SpooledTemporaryFile.
+            out.rollover()
+        for chunk in _chunks(fp):
+            out.write(chunk)
+        out.seek(0)
+        key = '%d' % self._keys.next()
+        self._files[key] = out
+        return key
+
+    def open(self, key):
+        """
+        Return the stored file object with the key, rewound.
+
+        @raise KeyError: There is no file with the key.
+        """
+        fp = self._files[key]
+        fp.seek(0)
+        return fp
+
+    def delete(self, key):
+        """
+        Remove the file with the key, if there is one.
+        """
+        fp = self._files.pop(key, None)
+        if fp is not None:
+            fp.close()
+
+    def __len__(self):
+        return len(self._files)
+
+
+_KEY = re.compile(r'[0-9a-f]{64}$')
+
+
+class ContentStore(object):
+    """
+    Storage of files in a local directory, content addressed.
+
+    A file's key is the sha256 hex digest of its content and it's stored as
+    root/<first two digits>/<remaining digits>, so a file whose content is
+    already stored takes no more space. Files are written to a temporary file
+    in root and renamed into place, so a stored file is always complete.
+
+    @ivar root: The directory files are stored in.
+    """
+
+    def __init__(self, root):
+        """
+        Create a store in a directory, which is created if it doesn't exist.
+
+        @param root: The directory to store files in.
+        """
+        self.root = root
+        if not os.path.isdir(root):
+            os.makedirs(root)
+
+    def path(self, key):
+        """
+        Return the path of the file with the key.
+
+        @raise KeyError: The key is not a valid key.
+        """
+        if not isinstance(key, basestring) or not _KEY.match(key):
+            raise KeyError(key)
+        return os.path.join(self.root, key[:2], key[2:])
+
+    def save(self, fp):
+        """
+        Store the rest of a file, returning its key, the sha256 digest of
+        its content.
+        """
+        digest = hashlib.sha256()
+        out = tempfile.NamedTemporaryFile(dir=self.root, prefix='.upload-',
+                                          delete=False)
+        try:
+            try:
+                for chunk in _chunks(fp):
+                    digest.update(chunk)
+                    out.write(chunk)
+            finally:
+                out.close()
+            key = digest.hexdigest()
+            path = self.path(key)
+            if os.path.exists(path):
+                os.remove(out.name)
+                return key
+            try:
+                os.mkdir(os.path.dirname(path))
+            except OSError, e:
+                if e.errno != errno.EEXIST:
+                    raise
+            os.rename(out.name, path)
+        except:
+            if os.path.exists(out.name):
+                os.remove(out.name)
+            raise
+        return key
+
+    def open(self, key):
+        """
+        Open the file with the key for reading.
+
+        @raise KeyError: There is no file with the key.
+        """
+        try:
+            return open(self.path(key), 'rb')
+        except IOError, e:
+            if e.errno == errno.ENOENT:
+                raise KeyError(key)
+            raise
+
+    def delete(self, key):
+        """
+        Remove the file with the key, if there is one. The file is removed
+        for every File value with the key.
+        """
+        try:
+            os.remove(self.path(key))
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def __contains__(self, key):
+        try:
+            return os.path.exists(self.path(key))
+        except KeyError:
+            return False
@@ -0,0 +1,443 @@
+"""
+Streaming validation of JSON documents.
+
+L{validate_json} validates a JSON document read from a file against an
+attribute without loading the whole document into memory. The document is
+read as a stream of parser events and the attribute tree is walked alongside
+it. Objects and arrays that fit in the read buffer, e.g. the records of a long
+array, are parsed whole by json's own scanner and validated as usual, so
+memory use is bounded by the buffer size and nesting depth of the document
+rather than its size.
+
+>>> from StringIO import StringIO
+>>> from schemaish import Sequence, Structure, String
+>>> from schemaish.stream import validate_json
+>>> import validatish
+>>> schema = Sequence(Structure([('name', String(validator=validatish.Required()))]))
+>>> validate_json(schema, StringIO('[{"name": "Tim"}, {"name": "Matt"}]'))
+
+The Invalid raised is the same as validating the loaded document, with the
+same error keys.
+
+Some values can only be validated whole and are read into memory first: the
+value of a container attribute with a validator of its own (e.g. a Sequence
+with a Required validator), of a Tuple, of an attribute that overrides
+validate or _validate, and of a leaf attribute given a JSON object or array.
+A sequence of millions of records should therefore not have a validator of
+its own.
+
+Events are (event, value) pairs in the form of ijson's basic_parse: start_map,
+map_key, end_map, start_array, end_array, string, number, boolean and null.
+L{basic_parse} provides them using only the standard library; any other
+source of them, e.g. ijson.basic_parse(fp), can be used with
+L{validate_events} instead.
+"""
+
+import functools
+import json
+import re
+from json.decoder import scanstring
+from json.scanner import make_scanner
+
+from schemaish.attr import Sequence, Structure, Invalid
+from schemaish.attr import _Collector, _Stop, _MISSING
+from schemaish.plan import _is_native
+
+
+def validate_json(attr, fp, fail_fast=False, buf_size=65536):
+    """
+    Validate the JSON document read from fp against attr, raising Invalid
+    if it's not valid.
+
+    @param attr: Attribute to validate against.
+    @param fp: File-like object to read the document from.
+    @keyword fail_fast: Stop at the first error found, as for validate.
+    @keyword buf_size: Number of bytes read from fp at a time.
+    @raise ValueError: The document is not valid JSON.
+    """
+    _validate(attr, basic_parse(fp, buf_size), fail_fast, True)
+
+
+def validate_events(attr, events, fail_fast=False):
+    """
+    Validate the JSON document described by an iterable of parser events
+    against attr, raising Invalid if it's not valid.
+
+    @param attr: Attribute to validate against.
+    @param events: Iterable of (event, value) pairs.
+    @keyword fail_fast: Stop at the first error found, as for validate.
+    """
+    _validate(attr, iter(events), fail_fast, False)
+
+
+def _validate(attr, events, fail_fast, whole):
+    collector = _Collector(fail_fast)
+    walker = _Walker(events, collector, whole)
+    try:
+        walker.walk(attr, walker.next())
+    except _Stop:
+        pass
+    except StopIteration:
+        raise ValueError("Unexpected end of JSON events")
+    errors = collector.errors
+    if errors:
+        if fail_fast:
+            errors = dict(errors)
+        raise Invalid(errors)
+
+
+class _Walker(object):
+    """
+    Walks an attribute tree alongside a stream of parser events, recording
+    errors with a collector.
+
+    @ivar next: Function returning the next event.
+    @ivar next_value: Function returning the next event where a value is
+        expected, which may be a ('value', value) event for the whole value
+        if whole was true (see basic_parse).
+    @ivar starts: Dict of the event that starts a value each attribute walks
+        rather than builds, if any.
+    """
+
+    def __init__(self, events, collector, whole):
+        self.next = events.next
+        if whole:
+            self.next_value = functools.partial(events.send, True)
+        else:
+            self.next_value = events.next
+        self.collector = collector
+        self.starts = {}
+
+    def walk(self, attr, event):
+        """
+        Validate the value starting with event, consuming the rest of its
+        events.
+        """
+        kind = event[0]
+        if kind != 'start_map' and kind != 'start_array':
+            self.collector.visit(attr, event[1])
+            return
+        start = self.starts.get(attr, _MISSING)
+        if start is _MISSING:
+            start = self.starts[attr] = _start(attr)
+        if kind != start:
+            self.collector.visit(attr, self.build(event))
+        elif kind == 'start_map':
+            self._structure(attr)
+        else:
+            self._sequence(attr)
+
+    def _structure(self, attr):
+        attrs, index = attr._current_attrs(), attr._index()
+        next, next_value = self.next, self.next_value
+        walk, path = self.walk, self.collector.path
+        path.append(None)
+        seen = set()
+        while True:
+            kind, name = next()
+            if kind == 'end_map':
+                break
+            n = index.get(name)
+            if n is None:
+                self.skip(next_value())
+                continue
+            # Every occurrence of a repeated key is validated, whereas loading
+            # the document keeps the last.
+            name, child = attrs[n]
+            seen.add(name)
+            path[-1] = name
+            walk(child, next_value())
+        if len(seen) != len(attrs):
+            for name, child in attrs:
+                if name not in seen:
+                    path[-1] = name
+                    self.collector.visit(child, None)
+        path.pop()
+
+    def _sequence(self, attr):
+        next_value, walk, path = self.next_value, self.walk, self.collector.path
+        attr = attr.attr
+        path.append(None)
+        n = 0
+        while True:
+            event = next_value()
+            if event[0] == 'end_array':
+                break
+            path[-1] = n
+            walk(attr, event)
+            n += 1
+        path.pop()
+
+    def build(self, event):
+        """
+        Return the value starting with event, consuming the rest of its
+        events.
+        """
+        kind, value = event
+        if kind == 'start_map':
+            value = {}
+            while True:
+                kind, key = self.next()
+                if kind == 'end_map':
+                    return value
+                value[key] = self.build(self.next())
+        if kind == 'start_array':
+            value = []
+            while True:
+                event = self.next()
+                if event[0] == 'end_array':
+                    return value
+                value.append(self.build(event))
+        return value
+
+    def skip(self, event):
+        """
+        Consume the rest of the value starting with event.
+        """
+        if event[0] not in ('start_map', 'start_array'):
+            return
+        depth = 1
+        while depth:
+            kind = self.next()[0]
+            if kind in ('start_map', 'start_array'):
+                depth += 1
+            elif kind in ('end_map', 'end_array'):
+                depth -= 1
+
+
+def _start(attr):
+    """
+    Return the event starting the values attr's items can be walked for
+    rather than built and validated whole: start_map for structures,
+    start_array for sequences, or None.
+    """
+    if attr.validator:
+        return None
+    if _is_native(attr, Structure) and \
+            len(attr._checked_index()) == len(attr._current_attrs()):
+        return 'start_map'
+    if _is_native(attr, Sequence):
+        return 'start_array'
+    return None
+
+
+# The next token, after any whitespace: punctuation, a simple string (printable
+# ASCII, no escapes) and any colon following it, a number, a constant or the
+# opening quote of any other string.
+_TOKEN = re.compile(r"""[ \t\n\r]*(?:
+    ([][{}:,])
+    | "([ !#-\[\]-~]*)"([ \t\n\r]*:)?
+    | (-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?)
+    | (true|false|null|NaN|Infinity|-Infinity)
+    | ")""", re.VERBOSE)
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_scan_once = make_scanner(json.JSONDecoder())
+_CONSTANTS = {
+    'true': ('boolean', True),
+    'false': ('boolean', False),
+    'null': ('null', None),
+    'NaN': ('number', float('nan')),
+    'Infinity': ('number', float('inf')),
+    '-Infinity': ('number', float('-inf')),
+    }
+
+# Parser states: what's expected next.
+_VALUE = 0
+_VALUE_OR_CLOSE = 1
+_KEY = 2
+_KEY_OR_CLOSE = 3
+_COLON = 4
+_COMMA_OR_CLOSE = 5
+
+# Errors for tokens found in states not expecting a value.
+_EXPECTING = {
+    _KEY: 'Expecting property name',
+    _KEY_OR_CLOSE: 'Expecting property name',
+    _COLON: 'Expecting : delimiter',
+    _COMMA_OR_CLOSE: 'Expecting , delimiter',
+    }
+
+
+def basic_parse(fp, buf_size=65536):
+    """
+    Parse the JSON document read from fp incrementally, generating (event,
+    value) pairs in the form of ijson's basic_parse.
+
+    Values are as json.load gives them: strings are unicode and numbers are
+    ints, longs or floats. Only the token being parsed and about buf_size
+    bytes are held in memory at a time.
+
+    Sending True to the generator where a value is expected asks for the
+    whole value at once. If it's an object or array that is already in the
+    buffer it's parsed with json's own scanner and a ('value', value) event
+    generated; otherwise parsing continues with the value's first event.
+
+    @param fp: File-like object to read the document from.
+    @keyword buf_size: Number of bytes read from fp at a time.
+    @raise ValueError: The document is not valid JSON.
+    """
+    read, match_token = fp.read, _TOKEN.match
+    buf, pos, offset, eof = '', 0, 0, False
+    closers = []
+    state = _VALUE
+    event = None
+    while True:
+        if event is not None:
+            whole = yield event
+            event = None
+            if whole:
+                pos = _WHITESPACE.match(buf, pos).end()
+                if len(buf) - pos < buf_size // 2 and not eof:
+                    # Top up the buffer so the value is likely to be in it.
+                    data = read(buf_size)
+                    if data:
+                        offset += pos
+                        buf, pos = buf[pos:] + data, 0
+                        pos = _WHITESPACE.match(buf, pos).end()
+                    else:
+                        eof = True
+                c = buf[pos:pos + 1]
+                if c == ':' and state == _COLON or \
+                        c == ',' and state == _COMMA_OR_CLOSE and \
+                        closers and closers[-1] == ']':
+                    # Move on to where the value starts.
+                    pos = _WHITESPACE.match(buf, pos + 1).end()
+                    state = _VALUE
+                    c = buf[pos:pos + 1]
+                if (c == '{' or c == '[') and \
+                        (state == _VALUE or state == _VALUE_OR_CLOSE):
+                    try:
+                        value, end = _scan_once(buf, pos)
+                    except (ValueError, StopIteration):
+                        # Not all in the buffer, or not valid, which parsing
+                        # it event by event will report.
+                        pass
+                    else:
+                        pos = end
+                        state = _COMMA_OR_CLOSE
+                        event = 'value', value
+                        continue
+        match = match_token(buf, pos)
+        if match is None or match.end() + 2 >= len(buf):
+            # The token may continue in data not read yet, e.g. the exponent
+            # of a number.
+            if not eof:
+                data = read(buf_size)
+                if data:
+                    offset += pos
+                    buf, pos = buf[pos:] + data, 0
+                    continue
+                eof = True
+            if match is None:
+                pos = _WHITESPACE.match(buf, pos).end()
+                if pos == len(buf) and state == _COMMA_OR_CLOSE and \
+                        not closers:
+                    return
+                raise _error('No JSON object could be decoded', offset + pos)
+        if state == _COMMA_OR_CLOSE and not closers:
+            raise _error('Extra data', offset + pos)
+        punctuation, simple, colon, number, frac, exp, constant = \
+            match.groups()
+        pos = match.end()
+        if punctuation:
+            if state == _COMMA_OR_CLOSE:
+                if punctuation == ',':
+                    if closers[-1] == '}':
+                        state = _KEY
+                    else:
+                        state = _VALUE
+                    continue
+                if punctuation != closers[-1]:
+                    raise _error('Expecting , delimiter', offset + pos - 1)
+            elif state == _COLON:
+                if punctuation != ':':
+                    raise _error('Expecting : delimiter', offset + pos - 1)
+                state = _VALUE
+                continue
+            elif state == _KEY_OR_CLOSE:
+                if punctuation != '}':
+                    raise _error('Expecting property name', offset + pos - 1)
+            elif state == _VALUE_OR_CLOSE and punctuation == ']':
+                pass
+            elif state != _KEY and punctuation in '[{':
+                if punctuation == '{':
+                    closers.append('}')
+                    state = _KEY_OR_CLOSE
+                    event = 'start_map', None
+                else:
+                    closers.append(']')
+                    state = _VALUE_OR_CLOSE
+                    event = 'start_array', None
+                continue
+            else:
+                raise _error('No JSON object could be decoded',
+                             offset + pos - 1)
+            # The container is closed.
+            closers.pop()
+            state = _COMMA_OR_CLOSE
+            if punctuation == '}':
+                event = 'end_map', None
+            else:
+                event = 'end_array', None
+            continue
+        if simple is not None:
+            if state == _KEY or state == _KEY_OR_CLOSE:
+                if colon:
+                    state = _VALUE
+                else:
+                    state = _COLON
+                event = 'map_key', unicode(simple)
+                continue
+            if state == _VALUE or state == _VALUE_OR_CLOSE:
+                if colon:
+                    raise _error('Expecting , delimiter',
+                                 offset + pos - len(colon.lstrip()))
+                state = _COMMA_OR_CLOSE
+                event = 'string', unicode(simple)
+                continue
+        scalar = number or constant
+        if state == _COLON or state == _COMMA_OR_CLOSE or \
+                scalar and state != _VALUE and state != _VALUE_OR_CLOSE:
+            raise _error(_EXPECTING[state], offset + match.start(2) - 1
+                         if simple is not None else
+                         offset + pos - len(scalar or '"'))
+        if scalar:
+            state = _COMMA_OR_CLOSE
+            if constant is not None:
+                event = _CONSTANTS[constant]
+            elif frac or exp:
+                event = 'number', float(number)
+            else:
+                event = 'number', int(number)
+            continue
+        # A string. Make sure all of it is in the buffer before decoding it:
+        # a quote ends it unless escaped by an odd number of backslashes.
+        start = end = pos
+        while True:
+            end = buf.find('"', end)
+            if end == -1:
+                end = len(buf)
+                data = not eof and read(buf_size)
+                if not data:
+                    raise _error('Unterminated string', offset + start - 1)
+                # Keep the opening quote.
+                offset += start - 1
+                buf, end, start = buf[start - 1:] + data, end - start + 1, 1
+                continue
+            n = end - 1
+            while n >= start and buf[n] == '\\':
+                n -= 1
+            if not (end - 1 - n) % 2:
+                break
+            end += 1
+        value, pos = scanstring(buf, start)
+        if state == _KEY or state == _KEY_OR_CLOSE:
+            state = _COLON
+            event = 'map_key', value
+        else:
+            state = _COMMA_OR_CLOSE
+            event = 'string', value
+
+
+def _error(message, char):
+    return ValueError('%s: char %d' % (message, char))
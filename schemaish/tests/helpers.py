@@ -0,0 +1,49 @@
+"""
+Helpers shared by the test modules.
+"""
+
+import validatish
+
+from schemaish import Invalid
+
+
+def required(value):
+    """
+    Validator defined at module level, so it can be pickled and imported.
+    """
+    if not value:
+        raise validatish.Invalid('required')
+
+
+def error_dict(validate, *args, **kw):
+    """
+    Return the error_dict of the Invalid validate(*args, **kw) raises, or
+    None if it raises none.
+    """
+    try:
+        validate(*args, **kw)
+    except Invalid, e:
+        return e.error_dict
+    return None
+
+
+def error_messages(validate, *args, **kw):
+    """
+    Return the messages of the errors validate(*args, **kw) finds, by key,
+    or None if it finds none.
+    """
+    errors = error_dict(validate, *args, **kw)
+    if errors is None:
+        return None
+    return dict((k, v.message) for k, v in errors.items())
+
+
+def assert_same_errors(test, value, validate, *others):
+    """
+    Check that others find the same errors in value as validate does,
+    returning their messages.
+    """
+    expected = error_messages(validate, value)
+    for other in others:
+        test.assertEqual(error_messages(other, value), expected)
+    return expected
@@ -1,5 +1,7 @@
 import unittest
 
+from schemaish.tests.helpers import error_dict, error_messages
+
 
 class TestAttribute(unittest.TestCase):
     def _getTargetClass(self):
@@ -41,6 +43,61 @@ class TestAttribute(unittest.TestCase):
     def test_args(self):
         self.assertRaises(TypeError, self._makeOne, wibble=1)
 
+    def test_slots(self):
+        from schemaish import String
+        attr = String(title='Title')
+        self.assertFalse(hasattr(attr, '__dict__'))
+        self.assertRaises(AttributeError, setattr, attr, 'wibble', 1)
+
+    def test_pickle(self):
+        import pickle
+        import weakref
+        from schemaish import Sequence, String, Tuple
+        for attr in [String(title='Title', validator=required, default='x'),
+                     Sequence(String(), vectorize=True),
+                     Tuple([String(), String()])]:
+            for protocol in (0, 2):
+                copy = pickle.loads(pickle.dumps(attr, protocol))
+                self.assertEqual(type(copy), type(attr))
+                self.assertEqual(repr(copy), repr(attr))
+                self.assertEqual(copy._meta_order, attr._meta_order)
+        self.assertTrue(weakref.ref(attr)() is attr)
+
+    def test_freeze(self):
+        from schemaish import Sequence, String, Structure, Tuple
+        leaf = String(title='Title')
+        seq = Sequence(leaf)
+        t = Tuple([String()])
+        s = Structure([('a', seq), ('t', t)])
+        self.assertFalse(s.frozen)
+        self.assertTrue(s.freeze() is s)
+        for attr in (s, seq, leaf, t):
+            self.assertTrue(attr.frozen)
+            self.assertRaises(AttributeError, setattr, attr, 'title', 'x')
+            self.assertRaises(AttributeError, delattr, attr, 'title')
+        self.assertEqual(leaf.title, 'Title')
+        self.assertTrue(isinstance(leaf, String))
+        self.assertEqual(type(leaf).__name__, 'String')
+        self.assertRaises(TypeError, s.add, 'b', String())
+        self.assertRaises(TypeError, t.add, String())
+        self.assertEqual(s.names(), ['a', 't'])
+        self.assertTrue(s.get('a') is seq)
+        self.assertTrue(s.freeze() is s)
+
+    def test_freeze_pickle(self):
+        import copy
+        import pickle
+        from schemaish import Sequence, String, Structure
+        s = Structure([('a', Sequence(String(title='Title')))]).freeze()
+        copies = [pickle.loads(pickle.dumps(s, protocol))
+                  for protocol in (0, 2)]
+        copies.append(copy.deepcopy(s))
+        for c in copies:
+            self.assertTrue(c.frozen)
+            self.assertTrue(c.get('a').attr.frozen)
+            self.assertEqual(repr(c), repr(s))
+            self.assertEqual(c._meta_order, s._meta_order)
+
     def test__repr__(self):
         attr = self._makeOne(title='title',
                              default=True,
@@ -107,6 +164,86 @@ class TestDate(unittest.TestCase):
                           Date(validator=required).validate, None)
 
 
+class TestFile(unittest.TestCase):
+
+    def _getTargetClass(self):
+        from schemaish import File
+        return File
+
+    def _value(self, data, mimetype='application/octet-stream', **metadata):
+        from StringIO import StringIO
+        from schemaish.type import File
+        return File(StringIO(data), 'name', mimetype, metadata)
+
+    def test_no_checks(self):
+        from schemaish import Invalid
+        File = self._getTargetClass()
+        File().validate(None)
+        File().validate(self._value('data'))
+        self.assertRaises(Invalid, File(validator=required).validate, None)
+
+    def test_max_size(self):
+        File = self._getTargetClass()
+        value = self._value('data')
+        self.assertEqual(error_messages(File(max_size=4).validate, value),
+                         None)
+        self.assertEqual(error_messages(File(max_size=3).validate, value),
+                         {'': 'must be at most 3 bytes'})
+
+    def test_mimetypes(self):
+        File = self._getTargetClass()
+        attr = File(mimetypes=['image/*', 'application/pdf'])
+        def errors(*args):
+            return error_messages(attr.validate, self._value(*args))
+        png = '\x89PNG\r\n\x1a\n' + 'x' * 10
+        self.assertEqual(errors(png, 'text/plain'), None)
+        self.assertEqual(errors('%PDF-1.4'), None)
+        self.assertEqual(errors('GIF89a', None), None)
+        # Unrecognized content falls back to the value's mimetype.
+        self.assertEqual(errors('x', 'image/svg'), None)
+        self.assertEqual(errors('x', 'text/html'),
+                         {'': 'is not an allowed type of file'})
+        self.assertEqual(errors('PK\x03\x04', 'image/png'),
+                         {'': 'is not an allowed type of file'})
+
+    def test_mimetypes_unseekable(self):
+        from schemaish.type import File, SNIFF_SIZE
+        class Stream(object):
+            def __init__(self, data):
+                self.data = data
+            def read(self, size):
+                data, self.data = self.data[:size], self.data[size:]
+                return data
+        stream = Stream('%PDF-1.4' + 'x' * 100000)
+        attr = self._getTargetClass()(mimetypes=['application/pdf'])
+        attr.validate(File(stream, 'name', 'text/plain'))
+        # Only the head is read to sniff the type.
+        self.assertEqual(len(stream.data), 100008 - SNIFF_SIZE)
+
+    def test_digests(self):
+        import hashlib
+        File = self._getTargetClass()
+        attr = File(digests=['sha256', 'md5'])
+        value = self._value('data')
+        attr.validate(value)
+        self.assertEqual(value.metadata,
+                         {'sha256': hashlib.sha256('data').hexdigest(),
+                          'md5': hashlib.md5('data').hexdigest()})
+        self.assertEqual(value.file.tell(), 0)
+        attr.validate(value)
+        value = self._value('data', md5=hashlib.md5('data').hexdigest().upper())
+        attr.validate(value)
+        value = self._value('data', md5=hashlib.md5('date').hexdigest())
+        self.assertEqual(error_messages(attr.validate, value),
+                         {'': 'does not match its md5 checksum'})
+
+    def test_checks_first(self):
+        File = self._getTargetClass()
+        attr = File(max_size=1, validator=required)
+        self.assertEqual(error_messages(attr.validate, self._value('data')),
+                         {'': 'must be at most 1 bytes'})
+
+
 class TestSequence(unittest.TestCase):
 
     def _getTargetClass(self):
@@ -150,6 +287,10 @@ class TestSequence(unittest.TestCase):
             attr = Date()
         assert isinstance(StringSequence().attr, String)
         assert isinstance(DateSequence().attr, Date)
+        s = StringSequence(Date(), vectorize=True)
+        assert isinstance(s.attr, Date)
+        assert s.vectorize
+        assert StringSequence.attr is StringSequence().attr
 
     def test_item_error(self):
         """
@@ -200,6 +341,44 @@ class TestTuple(unittest.TestCase):
         self.assertRaises(Invalid, self._makeOne(
             [Attr(), Attr()]).validate, ("one",))
 
+    def test_error_keys(self):
+        from schemaish import Invalid
+        import validatish
+        def different(value):
+            if value[0] == value[1]:
+                raise validatish.Invalid('same')
+        t = self._makeOne([Attr(validator=validatish.Required()),
+                           Attr(validator=validatish.Required()), Attr()],
+                          validator=different)
+        try:
+            t.validate(('', '', 'x'))
+            self.fail() # pragma: no cover
+        except Invalid, e:
+            self.assertEqual(dict((k, str(v))
+                                  for k, v in e.error_dict.iteritems()),
+                             {'0': 'is required', '1': 'is required',
+                              '': 'same'})
+        try:
+            t.validate(('', ''))
+            self.fail() # pragma: no cover
+        except Invalid, e:
+            self.assertEqual(e.error_dict.keys(), [''])
+
+    def test_changed_attrs(self):
+        from schemaish import Invalid
+        t = self._makeOne([Attr()])
+        t.validate(('a',))
+        t.attrs.append(Attr(validator=required))
+        self.assertRaises(Invalid, t.validate, ('a',))
+        self.assertRaises(Invalid, t.validate, ('a', ''))
+        t.attrs = [Attr()]
+        t.validate(('a',))
+        t.freeze()
+        t.validate(('a',))
+        self.assertRaises(Invalid, t.validate, ('a', 'b'))
+        self.assertRaises(Invalid, self._makeOne().validate, ('a',))
+        self._makeOne().freeze().validate(())
+
     def test_subclass(self):
         from schemaish import Date
         from schemaish import String
@@ -306,6 +485,118 @@ class TestStructure(unittest.TestCase):
         self.assertTrue(s.get("one") is one)
         self.assertRaises(KeyError, s.get, "two")
 
+    def test_get_after_add(self):
+        one, two = Attr(), Attr()
+        s = self._makeOne([("one", one)])
+        self.assertTrue(s.get("one") is one)
+        s.add("two", two)
+        self.assertTrue(s.get("two") is two)
+        self.assertTrue(s.get("one") is one)
+
+    def test_get_duplicate(self):
+        first, second = Attr(), Attr()
+        s = self._makeOne([("one", first)])
+        s.add("one", second)
+        self.assertTrue(s.get("one") is first)
+
+    def test_get_attrs_modified(self):
+        one, two, three = Attr(), Attr(), Attr()
+        s = self._makeOne([("one", one)])
+        s.get("one")
+        s.attrs.append(("two", two))
+        self.assertTrue(s.get("two") is two)
+        s.attrs = [("three", three)]
+        self.assertTrue(s.get("three") is three)
+        self.assertRaises(KeyError, s.get, "one")
+
+    def test_get_item_replaced(self):
+        one, two, three = Attr(), Attr(), Attr()
+        s = self._makeOne([("one", one), ("two", two)])
+        self.assertTrue(s.get("one") is one)
+        s.attrs[0] = ("three", three)
+        self.assertTrue(s.get("three") is three)
+        self.assertTrue("three" in s)
+        self.assertFalse("one" in s)
+        self.assertRaises(KeyError, s.get, "one")
+        self.assertTrue(s.get("two") is two)
+        s.attrs[1] = ("three", two)
+        self.assertTrue(s.get("three") is three)
+        self.assertFalse("two" in s)
+        del s.attrs[0]
+        s.attrs.append(("one", one))
+        self.assertTrue(s.get("three") is two)
+        self.assertTrue(s.get("one") is one)
+
+    def test_get_frozen(self):
+        s = self._makeOne([("one", Attr())]).freeze()
+        self.assertTrue("one" in s)
+        self.assertFalse("two" in s)
+        self.assertRaises(KeyError, s.get, "two")
+
+    def test_get_meta(self):
+        klass = self._getTargetClass()
+        class Test(klass):
+            a = Attr()
+            b = Attr()
+        s = Test()
+        self.assertTrue(s.get("b") is Test.b)
+        s.add("c", Attr())
+        self.assertTrue(s.get("a") is Test.a)
+        self.assertTrue("c" in s)
+        self.assertFalse("c" in Test())
+
+    def test_meta_attrs_shared(self):
+        klass = self._getTargetClass()
+        class Test(klass):
+            a = Attr(validator=required)
+        s = Test()
+        self.assertFalse('attrs' in s.__dict__)
+        self.assertEqual(s.names(), ["a"])
+        self.assertTrue(s.get("a") is Test.a)
+        self.assertTrue("a" in s)
+        self.assertFalse('attrs' in s.__dict__)
+        self.assertTrue(s.compile().validate({"a": "x"}) is None)
+        self.assertFalse('attrs' in s.__dict__)
+
+    def test_meta_attrs_copy_on_write(self):
+        klass = self._getTargetClass()
+        class Test(klass):
+            a = Attr()
+        s = Test()
+        s.add("b", Attr())
+        self.assertEqual(s.names(), ["a", "b"])
+        self.assertEqual([name for (name, attr) in Test.attrs], ["a"])
+        self.assertEqual(Test().names(), ["a"])
+        self.assertFalse("b" in Test())
+        s = Test()
+        s.attrs.append(("c", Attr()))
+        self.assertEqual(s.names(), ["a", "c"])
+        self.assertTrue("c" in s)
+        self.assertEqual(Test().names(), ["a"])
+        self.assertFalse("c" in Test())
+
+    def test_meta_attrs_pickle(self):
+        import pickle
+        from schemaish import String
+        s = Pickled()
+        copy = pickle.loads(pickle.dumps(s, 2))
+        self.assertEqual(copy.names(), ["a"])
+        s.add("b", String())
+        copy = pickle.loads(pickle.dumps(s, 2))
+        self.assertEqual(copy.names(), ["a", "b"])
+        self.assertEqual(Pickled().names(), ["a"])
+
+    def test_names(self):
+        s = self._makeOne([("one", Attr()), ("two", Attr())])
+        self.assertEqual(s.names(), ["one", "two"])
+        s.add("three", Attr())
+        self.assertEqual(s.names(), ["one", "two", "three"])
+
+    def test_contains(self):
+        s = self._makeOne([("one", Attr())])
+        self.assertTrue("one" in s)
+        self.assertFalse("two" in s)
+
     def test_meta_order(self):
         klass = self._getTargetClass()
 
@@ -367,6 +658,65 @@ class TestStructure(unittest.TestCase):
         self.assertEquals([i[0] for i in S3.attrs],
                           ['first', 'second', 'third'])
 
+    def test_meta_inheritance_order(self):
+        Structure = self._getTargetClass()
+        early, shared = Attr(), Attr()
+        class S1(Structure):
+            a = Attr()
+            b = shared
+        class S2(S1):
+            pass
+        class S3(S2):
+            # Created before S1's attributes so sorted in among them.
+            c = early
+            d = Attr()
+            b = shared
+        class S4(Structure):
+            e = Attr()
+        class S5(S3, S4):
+            f = Attr()
+        for cls in (S1, S2, S3, S4, S5):
+            self.assertEqual(cls.attrs, _sorted_attrs(cls))
+            self.assertEqual(cls._attr_index[2],
+                             dict((name, n) for (n, (name, attr))
+                                  in reversed(list(enumerate(cls.attrs)))))
+        self.assertEqual([i[0] for i in S3.attrs], ['c', 'b', 'b', 'a', 'd'])
+        self.assertEqual(S3().names(), ['c', 'b', 'b', 'a', 'd'])
+        self.assertEqual([i[0] for i in S5.attrs],
+                         ['c', 'b', 'b', 'a', 'd', 'e', 'f'])
+
+    def test_meta_attrs_changed(self):
+        Structure = self._getTargetClass()
+        class S1(Structure):
+            a = Attr()
+        S1.attrs.append(('b', Attr()))
+        class S2(S1):
+            c = Attr()
+        self.assertEqual([i[0] for i in S2.attrs], ['a', 'c'])
+        self.assertEqual(S2().names(), ['a', 'c'])
+        self.assertFalse('b' in S2())
+
+    def test_meta_attrs_replaced(self):
+        from schemaish import Invalid, String
+        Structure = self._getTargetClass()
+        class S(Structure):
+            a = String()
+        b = String(validator=required)
+        S.attrs = [('b', b)]
+        self.assertTrue(S.attrs[0][1] is b)
+        s = S()
+        self.assertEqual(s.names(), ['b'])
+        self.assertTrue(s.get('b') is b)
+        self.assertFalse('a' in s)
+        for validate in (s.validate, s.compile().validate,
+                         s.compile(generate=True).validate):
+            self.assertRaises(Invalid, validate, {'a': 'x', 'b': ''})
+            validate({'b': 'x'})
+        # Subclasses gather their attrs from the declarations, as before.
+        class T(S):
+            c = String()
+        self.assertEqual(T().names(), ['a', 'c'])
+
     def test__repr__(self):
         attr = self._makeOne()
         self.assertEqual(repr(attr), 'schemaish.Structure()')
@@ -389,6 +739,183 @@ class TestRecursiveValidate(unittest.TestCase):
         s = Structure([('list',Sequence(String(validator=required)))])
         self.assertRaises(Invalid, s.validate, {'list':["",""]})
 
+    def test_error_keys(self):
+        from schemaish import Sequence
+        from schemaish import String
+        from schemaish import Structure
+        from schemaish import Tuple
+        from schemaish.attr import Invalid
+        s = Structure([
+            ('list', Sequence(Structure([
+                ('a', String(validator=required)),
+                ('b', Tuple([String(), String(validator=required)])),
+                ]), validator=required)),
+            ('c', String(validator=required)),
+            ], validator=required)
+        try:
+            s.validate({'list': [{'a': 'a', 'b': ('', 'b')},
+                                 {'b': ('', '')}]})
+            self.fail() # pragma: no cover
+        except Invalid, e:
+            self.assertEqual(sorted(e.error_dict),
+                             ['c', 'list.1.a', 'list.1.b.1'])
+        try:
+            s.validate({'list': []})
+            self.fail() # pragma: no cover
+        except Invalid, e:
+            self.assertEqual(sorted(e.error_dict), ['c', 'list'])
+
+    def test_custom_validate(self):
+        from schemaish import Sequence
+        from schemaish import Structure
+        from schemaish.attr import Attribute
+        from schemaish.attr import Invalid
+        import validatish
+        class Custom(Attribute):
+            def validate(self, value):
+                if value != 'ok':
+                    raise Invalid({'': validatish.Invalid('custom'),
+                                   'sub': validatish.Invalid('sub')})
+        s = Structure([('a', Custom()), ('b', Sequence(Custom()))])
+        try:
+            s.validate({'a': 'ok', 'b': ['ok', 'bad']})
+            self.fail() # pragma: no cover
+        except Invalid, e:
+            self.assertEqual(sorted(e.error_dict), ['b.1', 'b.1.sub'])
+
+    def test_validate_again(self):
+        from schemaish import Sequence
+        from schemaish import String
+        from schemaish import Structure
+        from schemaish.attr import Invalid
+        import validatish
+        inner = Structure([('x', String(validator=required))])
+        def nested(value):
+            try:
+                inner.validate({'x': value})
+            except Invalid, e:
+                raise validatish.Invalid(e.error_dict['x'].message)
+        def broken(value):
+            if value == 'raise':
+                raise ValueError(value)
+        s = Structure([
+            ('a', String(validator=required)),
+            ('b', Sequence(String(validator=nested))),
+            ('c', Sequence(String(validator=broken))),
+            ])
+        self.assertEqual(error_dict(s.validate, {'a': 'a'}), None)
+        self.assertEqual(sorted(error_dict(s.validate, {'b': ['', 'b']})),
+                         ['a', 'b.0'])
+        self.assertRaises(ValueError, s.validate, {'a': 'a', 'c': ['raise']})
+        self.assertEqual(sorted(error_dict(s.validate, {'b': ['b']})), ['a'])
+        self.assertEqual(error_dict(s.validate, {'a': 'a'}), None)
+
+class TestFailFast(unittest.TestCase):
+
+    def _errors(self, schema, value):
+        return error_dict(schema.validate, value, fail_fast=True)
+
+    def test_sequence(self):
+        from schemaish import Sequence
+        from schemaish import String
+        s = Sequence(String(validator=required))
+        self.assertEqual(self._errors(s, ['a', 'b']), None)
+        self.assertEqual(self._errors(s, ['a', '', '']).keys(), ['1'])
+
+    def test_structure(self):
+        from schemaish import Sequence
+        from schemaish import String
+        from schemaish import Structure
+        s = Structure([
+            ('a', String()),
+            ('b', Sequence(Structure([('c', String(validator=required))]))),
+            ('d', String(validator=required)),
+            ], validator=required)
+        self.assertEqual(self._errors(s, {'b': [{'c': 'c'}], 'd': 'd'}), None)
+        self.assertEqual(self._errors(s, {'b': [{'c': 'c'}, {}]}).keys(),
+                         ['b.1.c'])
+        self.assertEqual(self._errors(s, {}).keys(), ['d'])
+        self.assertEqual(self._errors(s, None).keys(), [''])
+
+    def test_tuple(self):
+        from schemaish import String
+        from schemaish import Tuple
+        t = Tuple([String(validator=required), String(validator=required)])
+        self.assertEqual(self._errors(t, ('a', 'b')), None)
+        self.assertEqual(self._errors(t, ('', '')).keys(), ['0'])
+        self.assertEqual(self._errors(t, ('a', '')).keys(), ['1'])
+        self.assertEqual(self._errors(t, ('a',)).keys(), [''])
+
+    def test_custom_validate(self):
+        from schemaish import Sequence
+        from schemaish.attr import Attribute
+        from schemaish.attr import Invalid
+        import validatish
+        class Custom(Attribute):
+            def validate(self, value):
+                raise Invalid({'': validatish.Invalid('custom')})
+        s = Sequence(Custom())
+        self.assertEqual(self._errors(s, ['a', 'b']).keys(), ['0'])
+
+    def test_error_dict_type(self):
+        from schemaish import String
+        errors = self._errors(String(validator=required), '')
+        self.assertTrue(type(errors) is dict)
+
+
+class TestAValidate(unittest.TestCase):
+
+    def _schema(self, events):
+        from schemaish import Sequence
+        from schemaish import String
+        from schemaish import Structure
+        import validatish
+        class Pending(object):
+            def __init__(self, value):
+                self.value = value
+            def result(self):
+                events.append(('wait', self.value))
+                if not self.value:
+                    raise validatish.Invalid('is unknown')
+        def lookup(value):
+            events.append(('start', value))
+            return Pending(value)
+        return Structure([
+            ('a', String(validator=lookup)),
+            ('b', Sequence(String(validator=lookup))),
+            ('c', String(validator=required)),
+            ])
+
+    def test_concurrent(self):
+        from schemaish.attr import Invalid
+        events = []
+        schema = self._schema(events)
+        schema.avalidate({'a': 'a', 'b': ['b', 'c'], 'c': 'c'})
+        self.assertEqual([e[0] for e in events], ['start'] * 3 + ['wait'] * 3)
+        try:
+            schema.avalidate({'a': '', 'b': ['b', '']})
+            self.fail() # pragma: no cover
+        except Invalid, e:
+            self.assertEqual(sorted(e.error_dict), ['a', 'b.1', 'c'])
+
+    def test_validate_waits(self):
+        from schemaish.attr import Invalid
+        events = []
+        schema = self._schema(events)
+        schema.validate({'a': 'a', 'b': ['b'], 'c': 'c'})
+        self.assertEqual([e[0] for e in events], ['start', 'wait'] * 2)
+        try:
+            schema.validate({'a': '', 'b': ['b', ''], 'c': 'c'})
+            self.fail() # pragma: no cover
+        except Invalid, e:
+            self.assertEqual(sorted(e.error_dict), ['a', 'b.1'])
+
+    def test_other_results_ignored(self):
+        from schemaish import String
+        String(validator=lambda v: True).avalidate('x')
+        String(validator=lambda v: True).validate('x')
+
+
 class TestInvalid(unittest.TestCase):
     def _getTargetClass(self):
         from schemaish.attr import Invalid
@@ -411,6 +938,40 @@ class TestInvalid(unittest.TestCase):
         d = self._makeOne(error_dict)
         self.assertEqual(str(d), 'field "a" 1')
 
+    def test_message_lazy(self):
+        class Dummy:
+            reads = 0
+            def _message(self):
+                self.reads += 1
+                return '1'
+            message = property(_message)
+        dummy = Dummy()
+        d = self._makeOne({'a': dummy})
+        self.assertEqual(dummy.reads, 0)
+        self.assertEqual(d.message, 'field "a" 1')
+        self.assertEqual(str(d), 'field "a" 1')
+        self.assertEqual(dummy.reads, 1)
+
+    def test_message_set(self):
+        d = self._makeOne({})
+        d.message = 'message'
+        self.assertEqual(str(d), 'message')
+
+import schemaish
+
+class Pickled(schemaish.Structure):
+    a = schemaish.String()
+
+def _sorted_attrs(cls):
+    """
+    Combine and sort a structure class's attrs from scratch.
+    """
+    attrs = []
+    for c in cls.__mro__:
+        attrs.extend(c.__dict__.get('__schemaish_structure_attrs__', []))
+    attrs.sort(key=lambda i: i[1]._meta_order)
+    return attrs
+
 def required(s):
     if not s:
         import validatish
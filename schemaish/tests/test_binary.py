@@ -0,0 +1,215 @@
+import unittest
+
+
+class TestBinary(unittest.TestCase):
+
+    def _roundTrip(self, attr):
+        from schemaish import binary
+        return binary.loads(binary.dumps(attr))
+
+    def assertRoundTrip(self, attr):
+        from schemaish.fingerprint import fingerprint
+        loaded = self._roundTrip(attr)
+        self.assertFalse(loaded is attr)
+        self.assertEqual(fingerprint(loaded), fingerprint(attr))
+        return loaded
+
+    def test_attributes(self):
+        import schemaish
+        for attr in [schemaish.String(), schemaish.Integer(),
+                     schemaish.Float(), schemaish.Decimal(),
+                     schemaish.Date(), schemaish.Time(),
+                     schemaish.DateTime(), schemaish.Boolean(),
+                     schemaish.File(), schemaish.Structure(),
+                     schemaish.Sequence(), schemaish.Tuple()]:
+            loaded = self.assertRoundTrip(attr)
+            self.assertTrue(type(loaded) is type(attr))
+
+    def test_settings(self):
+        import datetime
+        import decimal
+        import schemaish
+        attr = schemaish.String(title=u'T\xedtle', description='Description')
+        loaded = self.assertRoundTrip(attr)
+        self.assertEqual(loaded.title, u'T\xedtle')
+        self.assertEqual(loaded.description, 'Description')
+        defaults = [None, True, 1, 2L, 1.5, 'x', u'y', [1, (2, 3)],
+                    {'a': [1], 2: None}, set([1, 2]), frozenset(['a']),
+                    datetime.date(2010, 2, 10), datetime.time(12, 30, 1, 5),
+                    datetime.datetime(2010, 2, 10, 12, 30),
+                    decimal.Decimal('1.10')]
+        for default in defaults:
+            loaded = self.assertRoundTrip(schemaish.String(default=default))
+            self.assertEqual(loaded.default, default)
+            self.assertTrue(type(loaded.default) is type(default))
+
+    def test_validators(self):
+        import validatish
+        import schemaish
+        validators = [
+            validatish.Required(),
+            validatish.Range(min=1, max=10),
+            validatish.Length(max=5),
+            validatish.OneOf(['a', 'b']),
+            validatish.Email(),
+            validatish.All(validatish.Required(),
+                           validatish.Any(validatish.Length(min=1),
+                                          validatish.Range(min=0))),
+            required,
+            ]
+        for validator in validators:
+            attr = schemaish.String(validator=validator)
+            loaded = self.assertRoundTrip(attr)
+            self.assertEqual(repr(loaded), repr(attr))
+        loaded = self.assertRoundTrip(schemaish.String())
+        self.assertTrue(loaded.validator is schemaish.String().validator)
+
+    def test_containers(self):
+        import validatish
+        import schemaish
+        schema = schemaish.Structure([
+            ('a', schemaish.String(validator=validatish.Required())),
+            ('s', schemaish.Sequence(schemaish.Structure([
+                ('b', schemaish.Integer(validator=validatish.Range(min=0)))]),
+                vectorize=True)),
+            ('t', schemaish.Tuple([schemaish.Integer(), schemaish.String()],
+                                  validator=validatish.Required())),
+            ('f', schemaish.File()),
+            ])
+        loaded = self.assertRoundTrip(schema)
+        self.assertEqual(loaded.names(), ['a', 's', 't', 'f'])
+        self.assertTrue(loaded.get('s').vectorize)
+        value = {'a': '', 's': [{'b': -1}], 't': ()}
+        self.assertEqual(error_messages(loaded.validate, value),
+                         error_messages(schema.validate, value))
+        loaded.add('c', schemaish.String())
+        self.assertEqual(loaded.names(), ['a', 's', 't', 'f', 'c'])
+
+    def test_shared(self):
+        import schemaish
+        from schemaish.interning import Interner
+        schema = Interner().intern(schemaish.Structure([
+            ('a', schemaish.String(title='x')),
+            ('b', schemaish.String(title='x')),
+            ('c', schemaish.Sequence(schemaish.String(title='x')))]))
+        loaded = self.assertRoundTrip(schema)
+        self.assertTrue(loaded.frozen)
+        self.assertTrue(loaded.get('a').frozen)
+        self.assertTrue(loaded.get('a') is loaded.get('b'))
+        self.assertTrue(loaded.get('c').attr is loaded.get('a'))
+
+    def test_equal_validators_shared(self):
+        import validatish
+        import schemaish
+        schema = schemaish.Structure([
+            ('a', schemaish.String(validator=validatish.Range(min=1))),
+            ('b', schemaish.String(validator=validatish.Range(min=1))),
+            ('c', schemaish.String(validator=validatish.Range(min=2)))])
+        loaded = self.assertRoundTrip(schema)
+        self.assertTrue(loaded.get('a').validator is
+                        loaded.get('b').validator)
+        self.assertFalse(loaded.get('a').validator is
+                         loaded.get('c').validator)
+
+    def test_frozen_child(self):
+        import schemaish
+        schema = schemaish.Structure([('a', schemaish.String().freeze())])
+        loaded = self._roundTrip(schema)
+        self.assertFalse(loaded.frozen)
+        self.assertTrue(loaded.get('a').frozen)
+
+    def test_declarative(self):
+        import schemaish
+        loaded = self._roundTrip(Declared())
+        self.assertTrue(type(loaded) is schemaish.Structure)
+        self.assertEqual(loaded.names(), ['a', 'b'])
+        self.assertEqual(loaded.get('b').title, 'B')
+        self.assertTrue(type(loaded.get('b')) is schemaish.String)
+        loaded = self._roundTrip(Custom())
+        self.assertTrue(type(loaded) is Custom)
+
+    def test_files(self):
+        import os
+        import tempfile
+        from StringIO import StringIO
+        import schemaish
+        from schemaish import binary
+        schema = schemaish.Structure([('a', schemaish.String(title='A'))])
+        fp = StringIO()
+        binary.dump(schema, fp)
+        fp.seek(0)
+        self.assertEqual(binary.load(fp).get('a').title, 'A')
+        fd, path = tempfile.mkstemp()
+        try:
+            os.close(fd)
+            fp = open(path, 'wb')
+            binary.dump(schema, fp)
+            fp.close()
+            fp = open(path, 'rb')
+            try:
+                self.assertEqual(binary.load(fp).get('a').title, 'A')
+            finally:
+                fp.close()
+        finally:
+            os.remove(path)
+
+    def test_file_offset(self):
+        import mmap
+        import tempfile
+        from StringIO import StringIO
+        import schemaish
+        from schemaish import binary
+        schema = schemaish.Structure([('a', schemaish.String(title='A'))])
+        # Before, at and after the mmap allocation granularity.
+        for start in (3, mmap.ALLOCATIONGRANULARITY,
+                      mmap.ALLOCATIONGRANULARITY + 5):
+            for fp in (StringIO(), tempfile.TemporaryFile()):
+                fp.write('x' * start)
+                binary.dump(schema, fp)
+                fp.write('trailing')
+                fp.seek(start)
+                self.assertEqual(binary.load(fp).get('a').title, 'A')
+                fp.seek(0)
+                self.assertRaises(ValueError, binary.load, fp)
+                fp.close()
+        fp = tempfile.TemporaryFile()
+        self.assertRaises(ValueError, binary.load, fp)
+        fp.close()
+
+    def test_invalid_data(self):
+        import schemaish
+        from schemaish import binary
+        data = binary.dumps(schemaish.String())
+        self.assertRaises(ValueError, binary.loads, 'x' + data)
+        self.assertRaises(ValueError, binary.loads,
+                          binary.MAGIC + chr(binary.VERSION + 1) +
+                          data[len(binary.MAGIC) + 1:])
+        self.assertRaises(ValueError, binary.loads, data[:-3])
+        self.assertRaises(ValueError, binary.loads, binary.MAGIC)
+
+    def test_unserializable(self):
+        import schemaish
+        from schemaish import binary
+        self.assertRaises(ValueError, binary.dumps,
+                          schemaish.String(validator=lambda v: None))
+        self.assertRaises(ValueError, binary.dumps,
+                          schemaish.String(default=object()))
+
+
+import schemaish
+from schemaish.tests.helpers import error_messages, required
+
+
+class Declared(schemaish.Structure):
+    """
+    Structure only declaring attributes.
+    """
+    a = schemaish.String()
+    b = schemaish.String(title='B')
+
+
+class Custom(schemaish.Structure):
+    a = schemaish.String()
+
+    def extra(self):
+        pass # pragma: no cover
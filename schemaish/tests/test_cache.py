@@ -0,0 +1,201 @@
+import unittest
+
+from schemaish.tests.helpers import error_messages
+
+
+class TestValidationCache(unittest.TestCase):
+
+    def _makeOne(self, **kw):
+        from schemaish.cache import ValidationCache
+        return ValidationCache(**kw)
+
+    def test_hits_and_misses(self):
+        from schemaish import String
+        import validatish
+        cache = self._makeOne()
+        attr = String(validator=validatish.Required(), cache=cache)
+        self.assertEqual(error_messages(attr.validate, 'a'), None)
+        self.assertEqual(error_messages(attr.validate, 'a'), None)
+        required = {'': 'is required'}
+        self.assertEqual(error_messages(attr.validate, ''), required)
+        self.assertEqual(error_messages(attr.validate, ''), required)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (2, 2, 2))
+        self.assertEqual(cache.info(), {'hits': 2, 'misses': 2, 'size': 2,
+                                        'maxsize': 1024})
+
+    def test_validators_not_called_again(self):
+        from schemaish import Sequence, String
+        calls = []
+        def validator(value):
+            calls.append(value)
+        attr = Sequence(String(validator=validator, cache=self._makeOne()))
+        attr.validate(['a', 'b', 'a', 'a'])
+        self.assertEqual(calls, ['a', 'b'])
+
+    def test_lru(self):
+        from schemaish import String
+        cache = self._makeOne(maxsize=2)
+        attr = String(cache=cache)
+        attr.validate('a')
+        attr.validate('b')
+        attr.validate('a')
+        attr.validate('c')
+        self.assertEqual(len(cache), 2)
+        key = cache.key
+        self.assertEqual(cache.get(attr, key('b')), None)
+        self.assertEqual(cache.get(attr, key('a')), ())
+        self.assertEqual(cache.get(attr, key('c')), ())
+        attr.validate('d')
+        self.assertEqual(cache.get(attr, key('a')), None)
+        self.assertEqual(cache.get(attr, key('c')), ())
+        self.assertEqual(cache.get(attr, key('d')), ())
+        cache.clear()
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+
+    def test_default_key(self):
+        cache = self._makeOne()
+        self.assertEqual(cache.key([1]), None)
+        self.assertEqual(cache.key({'a': 1}), None)
+        self.assertEqual(cache.key((1, [2])), None)
+        self.assertNotEqual(cache.key(1), None)
+        self.assertNotEqual(cache.key(1), cache.key(1.0))
+        self.assertNotEqual(cache.key((1,)), cache.key((True,)))
+        self.assertNotEqual(cache.key('a'), cache.key(u'a'))
+
+    def test_frozen_key(self):
+        from schemaish.cache import frozen_key
+        self.assertEqual(frozen_key({'a': [1, (2,)]}),
+                         frozen_key({'a': [1, (2,)]}))
+        self.assertNotEqual(frozen_key([1]), frozen_key((1,)))
+        self.assertNotEqual(frozen_key({'a': 1}), frozen_key({'a': True}))
+        self.assertEqual(frozen_key({'a': object()}), None)
+        self.assertEqual(frozen_key([set()]), None)
+
+    def test_uncacheable_values(self):
+        from schemaish import Structure, String
+        cache = self._makeOne()
+        attr = Structure([('a', String())], cache=cache)
+        attr.validate({'a': 'x'})
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+
+    def test_disabled(self):
+        from schemaish import String
+        cache = self._makeOne(enabled=False)
+        attr = String(cache=cache)
+        attr.validate('a')
+        attr.validate('a')
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+
+    def test_same_errors(self):
+        from schemaish import Integer, Sequence, Structure, String, Tuple
+        from schemaish.cache import frozen_key
+        import validatish
+        def schema(cache=None):
+            address = Structure([
+                ('street', String(validator=validatish.Required())),
+                ('number', Integer(validator=validatish.Range(min=1),
+                                   cache=cache))],
+                validator=validatish.Required(), cache=cache)
+            return Structure([
+                ('home', address),
+                ('others', Sequence(address)),
+                ('pair', Tuple([Integer(), address], cache=cache))])
+        value = {
+            'home': {'street': '', 'number': 0},
+            'others': [{'street': 'x', 'number': 1}, {'number': 0}, {},
+                       {'street': '', 'number': 0}],
+            'pair': (1, {'number': 2})}
+        plain = schema()
+        cached = schema(self._makeOne(key=frozen_key))
+        for fail_fast in (False, True):
+            expected = error_messages(plain.validate, value,
+                                      fail_fast=fail_fast)
+            self.assertTrue(expected)
+            for n in range(2):
+                self.assertEqual(error_messages(cached.validate, value,
+                                                fail_fast=fail_fast),
+                                 expected)
+        expected = error_messages(plain.validate, value)
+        for validator in (cached.compile(), cached.compile(generate=True)):
+            self.assertEqual(error_messages(validator.validate, value),
+                             expected)
+
+    def test_top_level(self):
+        from schemaish import Structure, String
+        from schemaish.cache import frozen_key
+        import validatish
+        attr = Structure([('a', String(validator=validatish.Required()))],
+                         cache=self._makeOne(key=frozen_key))
+        for n in range(2):
+            self.assertEqual(error_messages(attr.validate, {'a': ''}),
+                             {'a': 'is required'})
+
+    def test_threads(self):
+        import sys
+        import threading
+        from schemaish import String
+        cache = self._makeOne(maxsize=8)
+        attr = String(cache=cache)
+        def validate():
+            for n in range(2000):
+                attr.validate(n % 13)
+        interval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+        try:
+            threads = [threading.Thread(target=validate) for n in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setcheckinterval(interval)
+        self.assertEqual(cache.hits + cache.misses, 8000)
+        self.assertEqual(len(cache), 8)
+        # The linked list holds exactly the cached entries.
+        keys = []
+        link = cache._root[1]
+        while link is not cache._root:
+            keys.append(link[2])
+            link = link[1]
+        self.assertEqual(sorted(keys), sorted(cache._entries))
+
+    def test_not_pickled(self):
+        from schemaish import String
+        import pickle
+        cache = self._makeOne(maxsize=5)
+        attr = String(cache=cache)
+        attr.validate('a')
+        copy = pickle.loads(pickle.dumps(attr))
+        self.assertEqual(len(copy.cache), 0)
+        self.assertEqual(copy.cache.maxsize, 5)
+
+    def test_fingerprint(self):
+        from schemaish import String
+        from schemaish.fingerprint import fingerprint
+        self.assertEqual(fingerprint(String(cache=self._makeOne())),
+                         fingerprint(String()))
+
+    def test_generated_frozen(self):
+        from schemaish import Structure, String
+        import validatish
+        def schema(**kw):
+            return Structure([('x', String(validator=validatish.Required(),
+                                           **kw))]).freeze()
+        # Equivalent frozen schemas, but only one is generated with a cache.
+        for cached_first in (False, True):
+            cache = self._makeOne()
+            plain, cached = schema(), schema(cache=cache)
+            order = [plain, cached]
+            if cached_first:
+                order.reverse()
+            generated = [attr.compile(generate=True) for attr in order]
+            if cached_first:
+                generated.reverse()
+            for n in range(2):
+                self.assertEqual(
+                    error_messages(generated[1].validate, {'x': ''}),
+                    {'x': 'is required'})
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            self.assertEqual(error_messages(generated[0].validate, {'x': ''}),
+                             {'x': 'is required'})
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
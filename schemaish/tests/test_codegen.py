@@ -0,0 +1,237 @@
+import unittest
+
+from schemaish.tests.helpers import assert_same_errors, error_messages
+from schemaish.tests.helpers import required
+
+
+class TestGeneratedValidator(unittest.TestCase):
+
+    def assertSame(self, schema, value):
+        return assert_same_errors(self, value, schema.validate,
+                                  schema.compile(generate=True).validate)
+
+    def test_leaf(self):
+        from schemaish import String
+        s = String(validator=required)
+        self.assertEqual(self.assertSame(s, ''), {'': 'required'})
+        self.assertEqual(self.assertSame(s, 'x'), None)
+        self.assertEqual(self.assertSame(String(), None), None)
+
+    def test_always_dropped(self):
+        from schemaish import Structure, String
+        s = Structure([('a', String()), ('b', String(validator=required))])
+        source = s.compile(generate=True).source
+        self.assertTrue("'b'" in source)
+        self.assertFalse("'a'" in source)
+
+    def test_structure(self):
+        from schemaish import Structure, String
+        inner = Structure([('b', String(validator=required))],
+                          validator=required)
+        s = Structure([('a', inner), ('c', String(validator=required))],
+                      validator=required)
+        self.assertEqual(self.assertSame(s, {'a': {}}),
+                         {'a.b': 'required', 'a': 'required',
+                          'c': 'required'})
+        self.assertEqual(self.assertSame(s, {'c': 'x'}), {'a': 'required'})
+        self.assertEqual(self.assertSame(s, None), {'': 'required'})
+        self.assertEqual(self.assertSame(Structure(), {}), None)
+
+    def test_inlined_validators(self):
+        from schemaish import Integer, Structure, String
+        import validatish
+        s = Structure([
+            ('r', String(validator=validatish.Required())),
+            ('lo', Integer(validator=validatish.Range(min=0))),
+            ('hi', Integer(validator=validatish.Range(max=10))),
+            ('both', Integer(validator=validatish.Range(min=0, max=10))),
+            ('none', Integer(validator=validatish.Range()))])
+        self.assertFalse("'none'" in s.compile(generate=True).source)
+        for value in [{}, {'r': 0, 'lo': 0, 'hi': 10, 'both': 5},
+                      {'r': '', 'lo': -1, 'hi': 11, 'both': 11},
+                      {'r': [], 'both': -1, 'none': 1}]:
+            self.assertSame(s, value)
+        self.assertEqual(self.assertSame(s, {'r': '', 'lo': -1, 'hi': 11}),
+                         {'r': 'is required',
+                          'lo': 'must be greater than or equal to 0',
+                          'both': 'must have between 0 and 10',
+                          'hi': 'must be less than or equal to 10'})
+
+    def test_names(self):
+        from schemaish import Sequence, Structure, String
+        s = Structure([('%d', String(validator=required)),
+                       (u'\xe9', String(validator=required)),
+                       (1, Structure([(2, String(validator=required))])),
+                       ('l', Sequence(Structure([
+                           ('%s', String(validator=required))])))])
+        self.assertEqual(self.assertSame(s, {1: {}, 'l': [{}]}),
+                         {'%d': 'required', u'\xe9': 'required',
+                          '1.2': 'required', 'l.0.%s': 'required'})
+
+    def test_sequence(self):
+        from schemaish import Sequence, Structure, String
+        s = Sequence(String(validator=required), validator=required)
+        self.assertEqual(self.assertSame(s, ['x', '', 'y', '']),
+                         {'1': 'required', '3': 'required'})
+        self.assertEqual(self.assertSame(s, []), {'': 'required'})
+        self.assertEqual(self.assertSame(s, None), {'': 'required'})
+        s = Structure([('l', Sequence(Structure([
+            ('a', String(validator=required)),
+            ('b', Sequence(String(validator=required)))])))])
+        self.assertEqual(
+            self.assertSame(s, {'l': [{'a': 'x', 'b': ['', 'y']}, {}]}),
+            {'l.0.b.0': 'required', 'l.1.a': 'required'})
+
+    def test_vectorized(self):
+        from schemaish import Integer, Sequence
+        import validatish
+        s = Sequence(Integer(validator=validatish.Range(min=0)),
+                     vectorize=True)
+        self.assertEqual(self.assertSame(s, [1, -1, 2, -2]),
+                         {'1': 'must be greater than or equal to 0',
+                          '3': 'must be greater than or equal to 0'})
+
+    def test_empty_items(self):
+        from schemaish import Integer, Sequence, Structure, String
+        import validatish
+        for items in (Sequence(Structure()),
+                      Sequence(String(), vectorize=True),
+                      Sequence(Integer(validator=validatish.Range()))):
+            self.assertEqual(self.assertSame(items, [{}, {}]), None)
+            self.assertEqual(self.assertSame(Structure([('l', items)]),
+                                             {'l': [{}]}), None)
+        s = Sequence(Structure(), validator=required)
+        self.assertEqual(self.assertSame(s, []), {'': 'required'})
+
+    def test_deep(self):
+        from schemaish import Sequence, Structure, String
+        s = String(validator=required)
+        for n in range(30):
+            s = Structure([('s', Sequence(s))])
+        value = ''
+        for n in range(30):
+            value = {'s': [value]}
+        self.assertEqual(self.assertSame(s, value),
+                         {'.'.join(['s.0'] * 30): 'required'})
+
+    def test_tuple(self):
+        from schemaish import Structure, Tuple, String
+        t = Tuple([String(validator=required), String(validator=required)],
+                  validator=required)
+        self.assertEqual(self.assertSame(t, ('', '')),
+                         {'0': 'required', '1': 'required'})
+        self.assertEqual(self.assertSame(t, ('x', '')), {'1': 'required'})
+        self.assertEqual(self.assertSame(t, ('x',)), {'': 'Incorrect size'})
+        self.assertEqual(self.assertSame(t, ()), {'': 'required'})
+        self.assertEqual(self.assertSame(t, ('x', 'y')), None)
+        s = Structure([('t', t),
+                       ('u', Tuple([String(), String(validator=required)]))])
+        self.assertEqual(self.assertSame(s, {'t': ('x', ''), 'u': ('', '')}),
+                         {'t.1': 'required', 'u.1': 'required'})
+        self.assertEqual(self.assertSame(s, {'u': ('',)}),
+                         {'t': 'required', 'u': 'Incorrect size'})
+        self.assertEqual(self.assertSame(Tuple(), None), None)
+        self.assertEqual(self.assertSame(Tuple(), ('x',)),
+                         {'': 'Incorrect size'})
+
+    def test_custom(self):
+        from schemaish import Structure, Invalid
+        from schemaish.attr import Attribute
+        import validatish
+        class Custom(Attribute):
+            def validate(self, value):
+                if value != 'ok':
+                    raise Invalid({'': validatish.Invalid('custom'),
+                                   'sub': validatish.Invalid('sub')})
+        class Extended(Structure):
+            def _validate(self, value, collector):
+                super(Extended, self)._validate(value, collector)
+                collector.add(validatish.Invalid('extended'))
+        s = Structure([('a', Custom()),
+                       ('s', Structure([('b', Custom())])),
+                       ('e', Extended([('c', Custom())]))])
+        self.assertEqual(
+            self.assertSame(s, {'a': 'ok', 's': {}, 'e': {'c': 'ok'}}),
+            {'s.b': 'custom', 's.b.sub': 'sub', 'e': 'extended'})
+        self.assertEqual(self.assertSame(Custom(), None),
+                         {'': 'custom', 'sub': 'sub'})
+
+    def test_futures(self):
+        from schemaish import Structure, String
+        import validatish
+        class Future(object):
+            def __init__(self, value):
+                self.value = value
+            def result(self):
+                if not self.value:
+                    raise validatish.Invalid('later')
+        s = Structure([('a', String(validator=Future)),
+                       ('b', String(validator=Future))])
+        self.assertEqual(self.assertSame(s, {'a': 'x'}), {'b': 'later'})
+
+    def test_fail_fast(self):
+        from schemaish import Sequence, Structure, String
+        schema = Structure([
+            ('a', Sequence(String(validator=required))),
+            ('b', String(validator=required))])
+        generated = schema.compile(generate=True)
+        generated.validate({'a': ['x'], 'b': 'x'}, fail_fast=True)
+        self.assertEqual(error_messages(generated.validate,
+                                        {'a': ['x', '', ''], 'b': ''},
+                                        fail_fast=True),
+                         {'a.1': 'required'})
+
+    def test_validate_many(self):
+        from schemaish import Structure, String
+        schema = Structure([('a', String(validator=required))])
+        results = list(schema.compile(generate=True).validate_many(
+            [{}, {'a': 'x'}, None]))
+        self.assertEqual([n for n, errors in results], [0, 1, 2])
+        self.assertEqual(results[0][1].keys(), ['a'])
+        self.assertEqual(results[1][1], None)
+        self.assertEqual(results[2][1], None)
+
+    def test_cache(self):
+        from schemaish import Structure, String
+        from schemaish import codegen
+        codegen.clear_cache()
+        def schema(validator):
+            return Structure([('a', String(validator=validator))])
+        first = schema(required).compile(generate=True)
+        second = schema(lambda v: None).compile(generate=True)
+        self.assertEqual(first.source, second.source)
+        self.assertEqual(len(codegen._cache), 1)
+        # The code is shared but each validator keeps its own validators.
+        self.assertEqual(error_messages(first.validate, {}), {'a': 'required'})
+        self.assertEqual(error_messages(second.validate, {}), None)
+        codegen.clear_cache()
+        self.assertEqual(len(codegen._cache), 0)
+
+    def test_frozen_cache(self):
+        from schemaish import Structure, String
+        from schemaish import codegen
+        import validatish
+        codegen.clear_cache()
+        class Counting(validatish.Required):
+            def __call__(self, value):
+                self.calls.append(value)
+                return super(Counting, self).__call__(value)
+        def schema():
+            validator = Counting()
+            validator.calls = []
+            return Structure([('a', String(validator=validator))]).freeze()
+        one, two = schema(), schema()
+        first = one.compile(generate=True)
+        self.assertTrue(one.compile(generate=True).source is first.source)
+        second = two.compile(generate=True)
+        self.assertEqual(first.source, second.source)
+        self.assertEqual(len(codegen._cache), 1)
+        self.assertEqual(len(codegen._generated), 2)
+        # Equivalent schemas share the code but not their validators.
+        self.assertEqual(error_messages(second.validate, {}),
+                         {'a': 'is required'})
+        self.assertEqual(one.get('a').validator.calls, [])
+        self.assertEqual(two.get('a').validator.calls, [None])
+        del one, two, first, second
+        self.assertEqual(len(codegen._generated), 0)
+        codegen.clear_cache()
@@ -0,0 +1,194 @@
+import unittest
+
+from schemaish.tests.helpers import error_messages
+
+
+class TestConverter(unittest.TestCase):
+
+    def _makeOne(self, attr, format='json'):
+        from schemaish.convert import Converter
+        return Converter(attr, format)
+
+    def test_leaves_to_python(self):
+        import datetime
+        import decimal
+        from schemaish import Boolean, Date, DateTime, Decimal, Float
+        from schemaish import Integer, String, Time
+        cases = [
+            (String(), [('x', 'x'), (u'', u''), (1, 1)]),
+            (Integer(), [('12', 12), (' -3 ', -3), (12, 12), (2.0, 2),
+                         ('', None)]),
+            (Float(), [('1.5', 1.5), (2, 2.0), ('', None)]),
+            (Decimal(), [('1.10', decimal.Decimal('1.10')),
+                         (1.1, decimal.Decimal('1.1')),
+                         (3, decimal.Decimal(3))]),
+            (Boolean(), [('true', True), ('Off', False), ('1', True),
+                         (0, False), (True, True), ('', None)]),
+            (Date(), [('2010-02-10', datetime.date(2010, 2, 10)),
+                      (datetime.date(2010, 2, 10),
+                       datetime.date(2010, 2, 10))]),
+            (Time(), [('12:30', datetime.time(12, 30)),
+                      ('12:30:15.5', datetime.time(12, 30, 15, 500000))]),
+            (DateTime(), [('2010-02-10T12:30:15',
+                           datetime.datetime(2010, 2, 10, 12, 30, 15)),
+                          ('2010-02-10 12:30',
+                           datetime.datetime(2010, 2, 10, 12, 30))]),
+            ]
+        for attr, values in cases:
+            converter = self._makeOne(attr)
+            self.assertEqual(converter.to_python(None), None)
+            for value, expected in values:
+                result = converter.to_python(value)
+                self.assertEqual(result, expected)
+                self.assertEqual(type(result), type(expected))
+
+    def test_invalid_leaves(self):
+        import datetime
+        from schemaish import Boolean, Date, DateTime, Decimal, Float
+        from schemaish import Integer, Time
+        cases = [
+            (Integer(), ['x', '1.5', 1.5, True, float('inf')],
+             'must be an integer'),
+            (Float(), ['x', True, []], 'must be a number'),
+            (Decimal(), ['x', True], 'must be a decimal'),
+            (Boolean(), ['maybe', 2], 'must be a boolean'),
+            (Date(), ['2010-13-01', '10/02/2010',
+                      datetime.datetime(2010, 2, 10)], 'must be a date'),
+            (Time(), ['25:00', 'noon'], 'must be a time'),
+            (DateTime(), ['2010-02-10', '2010-02-10T12:30+01:00'],
+             'must be a datetime'),
+            ]
+        for attr, values, message in cases:
+            converter = self._makeOne(attr)
+            for value in values:
+                self.assertEqual(error_messages(converter.to_python, value),
+                                 {'': message})
+
+    def test_leaves_from_python(self):
+        import datetime
+        import decimal
+        from schemaish import Boolean, Date, DateTime, Decimal, Float
+        from schemaish import Integer, String, Time
+        when = datetime.datetime(2010, 2, 10, 12, 30)
+        cases = [
+            (String(), u'x', u'x', u'x'),
+            (Integer(), 12, 12, '12'),
+            (Float(), 1.5, 1.5, '1.5'),
+            (Float(), 2, 2, '2.0'),
+            (Decimal(), decimal.Decimal('1.10'), '1.10', '1.10'),
+            (Boolean(), False, False, 'false'),
+            (Date(), when.date(), '2010-02-10', '2010-02-10'),
+            (Time(), when.time(), '12:30:00', '12:30:00'),
+            (DateTime(), when, '2010-02-10T12:30:00', '2010-02-10T12:30:00'),
+            ]
+        for attr, value, json, string in cases:
+            self.assertEqual(self._makeOne(attr).from_python(value), json)
+            self.assertEqual(self._makeOne(attr, 'string').from_python(value),
+                             string)
+            self.assertEqual(self._makeOne(attr).from_python(None), None)
+        self.assertEqual(error_messages(self._makeOne(Integer()).from_python,
+                                        True),
+                         {'': 'must be an integer'})
+        self.assertEqual(error_messages(self._makeOne(Date()).from_python,
+                                        when),
+                         {'': 'must be a date'})
+
+    def test_round_trip(self):
+        import datetime
+        import decimal
+        from schemaish import Boolean, Date, Decimal, Integer, Sequence
+        from schemaish import Structure, String, Tuple
+        schema = Structure([
+            ('name', String()),
+            ('count', Integer()),
+            ('price', Decimal()),
+            ('items', Sequence(Structure([('when', Date()),
+                                          ('done', Boolean())]))),
+            ('pair', Tuple([Integer(), String()])),
+            ])
+        value = {'name': u'x', 'count': 3, 'price': decimal.Decimal('9.99'),
+                 'items': [{'when': datetime.date(2010, 2, 10),
+                            'done': True}],
+                 'pair': (1, u'a')}
+        for format in ('json', 'string'):
+            converter = self._makeOne(schema, format)
+            self.assertEqual(
+                converter.to_python(converter.from_python(value)), value)
+        self.assertEqual(self._makeOne(schema).from_python(value),
+                         {'name': u'x', 'count': 3, 'price': '9.99',
+                          'items': [{'when': '2010-02-10', 'done': True}],
+                          'pair': [1, u'a']})
+
+    def test_containers(self):
+        from schemaish import Integer, Sequence, Structure, Tuple
+        schema = Structure([('a', Integer()),
+                            ('b', Sequence(Integer())),
+                            ('c', Tuple([Integer(), Integer()])),
+                            ('d', Structure([('e', Integer())]))])
+        converter = self._makeOne(schema)
+        self.assertEqual(converter.to_python({'a': '1', 'x': 'y'}),
+                         {'a': 1, 'b': None, 'c': None, 'd': None})
+        self.assertEqual(converter.to_python({'b': ['1', None], 'd': {}}),
+                         {'a': None, 'b': [1, None], 'c': None,
+                          'd': {'e': None}})
+        self.assertEqual(
+            error_messages(converter.to_python,
+                           {'a': 'x', 'b': ['1', 'y', 'z'], 'c': ['1', 'q'],
+                            'd': {'e': 'w'}}),
+            {'a': 'must be an integer', 'b.1': 'must be an integer',
+             'b.2': 'must be an integer', 'c.1': 'must be an integer',
+             'd.e': 'must be an integer'})
+        self.assertEqual(
+            error_messages(converter.to_python,
+                           {'b': 'x', 'c': [1], 'd': []}),
+            {'b': 'must be a sequence', 'c': 'must have 2 items',
+             'd': 'must be a structure'})
+        self.assertEqual(
+            error_messages(self._makeOne(Sequence(Integer())).to_python,
+                           ['1', 'x']),
+            {'1': 'must be an integer'})
+
+    def test_empty_containers(self):
+        from schemaish import Sequence, Tuple
+        converter = self._makeOne(Sequence())
+        self.assertEqual(converter.to_python(['1', None]), ['1', None])
+        self.assertEqual(converter.from_python(['1']), ['1'])
+        converter = self._makeOne(Tuple())
+        self.assertEqual(converter.to_python([]), ())
+        self.assertEqual(converter.from_python(()), [])
+        self.assertEqual(error_messages(converter.to_python, ['1']),
+                         {'': 'must have 0 items'})
+
+    def test_declarative(self):
+        from schemaish import Integer, Structure
+        class Record(Structure):
+            n = Integer()
+        class Counted(Integer):
+            pass
+        converter = self._makeOne(Structure([('r', Record()),
+                                             ('c', Counted())]))
+        self.assertEqual(converter.to_python({'r': {'n': '1'}, 'c': '2'}),
+                         {'r': {'n': 1}, 'c': 2})
+
+    def test_unconverted_leaves(self):
+        from StringIO import StringIO
+        from schemaish import File, String, Structure
+        from schemaish.attr import Attribute
+        from schemaish.type import File as FileValue
+        class Custom(Attribute):
+            type = 'Custom'
+        upload = FileValue(StringIO('data'), 'a.txt', 'text/plain')
+        marker = object()
+        schema = Structure([('s', String()), ('f', File()), ('c', Custom())])
+        value = {'s': 1, 'f': upload, 'c': marker}
+        for format in ('json', 'string'):
+            converter = self._makeOne(schema, format)
+            for convert in (converter.to_python, converter.from_python):
+                result = convert(value)
+                self.assertEqual(result, value)
+                self.assertTrue(result['f'] is upload)
+                self.assertTrue(result['c'] is marker)
+
+    def test_format(self):
+        from schemaish import Integer
+        self.assertRaises(ValueError, self._makeOne, Integer(), 'xml')
@@ -0,0 +1,100 @@
+import unittest
+
+from schemaish.tests.helpers import required
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def _callFUT(self, attr):
+        from schemaish.fingerprint import fingerprint
+        return fingerprint(attr)
+
+    def test_equivalent(self):
+        from schemaish import Integer, Sequence, Structure, String, Tuple
+        import validatish
+        def schema():
+            return Structure([
+                ('a', String(title='A', validator=validatish.Required())),
+                ('b', Sequence(Integer(default=1))),
+                ('c', Tuple([String(), Integer()]))])
+        fingerprint = self._callFUT(schema())
+        self.assertEqual(len(fingerprint), 40)
+        self.assertEqual(self._callFUT(schema()), fingerprint)
+        self.assertEqual(self._callFUT(schema().freeze()), fingerprint)
+
+    def test_different(self):
+        from schemaish import Integer, Structure, String
+        import validatish
+        fingerprint = self._callFUT
+        def differ(a, b):
+            self.assertNotEqual(fingerprint(a), fingerprint(b))
+        differ(String(), Integer())
+        differ(String(), String(title='x'))
+        differ(String(title='x'), String(title=u'x'))
+        differ(String(default=1), String(default=True))
+        differ(String(default=[1]), String(default=(1,)))
+        differ(String(validator=validatish.Range(min=1)),
+               String(validator=validatish.Range(max=1)))
+        differ(String(validator=validatish.Required()),
+               String(validator=required))
+        differ(String(validator=lambda v: None),
+               String(validator=lambda v: None))
+        differ(Structure([('a', String())]), Structure([('b', String())]))
+        differ(Structure([('a', String()), ('b', Integer())]),
+               Structure([('b', Integer()), ('a', String())]))
+        differ(Structure([('a', Structure([('b', String())]))]),
+               Structure([('a', Structure([('b', Integer())]))]))
+
+    def test_identified(self):
+        from schemaish import String
+        import validatish
+        fingerprint = self._callFUT
+        self.assertEqual(fingerprint(String(validator=required)),
+                         fingerprint(String(validator=required)))
+        self.assertEqual(
+            fingerprint(String(validator=validatish.Range(min=1))),
+            fingerprint(String(validator=validatish.Range(min=1))))
+        always = String()
+        self.assertEqual(fingerprint(String(validator=always.validator)),
+                         fingerprint(always))
+
+    def test_declarative(self):
+        import schemaish
+        class Form(schemaish.Structure):
+            a = schemaish.String()
+        form = Form()
+        fingerprint = self._callFUT(form)
+        self.assertEqual(self._callFUT(Form()), fingerprint)
+        form.add('b', schemaish.String())
+        self.assertNotEqual(self._callFUT(form), fingerprint)
+        self.assertEqual(self._callFUT(Form()), fingerprint)
+
+    def test_memoized(self):
+        from schemaish import Structure, String
+        from schemaish import fingerprint
+        schema = Structure([('a', String())])
+        self._callFUT(schema)
+        self.assertFalse(schema in fingerprint._memo)
+        schema.freeze()
+        result = self._callFUT(schema)
+        self.assertEqual(fingerprint._memo[schema], result)
+        self.assertTrue(schema.get('a') in fingerprint._memo)
+        self.assertEqual(self._callFUT(schema), result)
+
+    def test_stable(self):
+        import subprocess
+        import sys
+        import schemaish
+        script = ('import validatish, schemaish\n'
+                  'from schemaish.fingerprint import fingerprint\n'
+                  'print fingerprint(schemaish.Structure(['
+                  '("a", schemaish.String(validator=validatish.Required())),'
+                  '("b", schemaish.Sequence(schemaish.Date()))]))\n')
+        process = subprocess.Popen([sys.executable, '-c', script],
+                                   stdout=subprocess.PIPE)
+        output = process.communicate()[0]
+        import validatish
+        expected = self._callFUT(schemaish.Structure([
+            ('a', schemaish.String(validator=validatish.Required())),
+            ('b', schemaish.Sequence(schemaish.Date()))]))
+        self.assertEqual(output.strip(), expected)
@@ -0,0 +1,163 @@
+import unittest
+
+from schemaish.tests.helpers import error_dict
+
+
+def _strings(errors):
+    return dict((k, str(v)) for k, v in (errors or {}).iteritems())
+
+
+def _schema():
+    from schemaish import Integer, Invalid, Sequence, Structure, String, Tuple
+    import validatish
+    def different(value):
+        if value and value['first'] and value['first'] == value['last']:
+            raise validatish.Invalid('same names')
+    class Checked(String):
+        __slots__ = ()
+        def validate(self, value):
+            if value and len(value) > 3:
+                raise Invalid({'': validatish.Invalid('too long'),
+                               'sub': validatish.Invalid('sub')})
+    person = Structure([
+        ('first', String(validator=validatish.Required())),
+        ('last', String(validator=validatish.Length(min=2))),
+        ('age', Integer(validator=validatish.Range(min=0))),
+        ('code', Checked()),
+        ('pair', Tuple([Integer(validator=validatish.Required()),
+                        String(validator=validatish.Required())]))],
+        validator=different)
+    return Structure([
+        ('owner', person),
+        ('people', Sequence(person, validator=validatish.Length(max=4))),
+        ('note', String(validator=validatish.Required()))])
+
+
+def _person(n):
+    return {'first': 'A%d' % n, 'last': 'B%d' % n, 'age': n,
+            'code': 'c', 'pair': (1, 'x')}
+
+
+class TestRevalidate(unittest.TestCase):
+
+    def _callFUT(self, attr, value, errors, changed):
+        from schemaish.incremental import revalidate
+        return revalidate(attr, value, errors, changed)
+
+    def test_whole(self):
+        schema = _schema()
+        value = {'owner': _person(0), 'people': [], 'note': ''}
+        self.assertEqual(_strings(self._callFUT(schema, value, None, [''])),
+                         {'note': 'is required'})
+        self.assertEqual(_strings(self._callFUT(schema, value, None, [()])),
+                         {'note': 'is required'})
+
+    def test_leaf(self):
+        schema = _schema()
+        value = {'owner': _person(0), 'people': [_person(1)], 'note': 'x'}
+        value['people'][0]['age'] = -1
+        errors = self._callFUT(schema, value, None, ['people.0.age'])
+        self.assertEqual(_strings(errors), {'people.0.age': 'must be greater '
+                                            'than or equal to 0'})
+        value['people'][0]['age'] = 1
+        value['owner']['last'] = value['owner']['first']
+        errors = self._callFUT(schema, value, errors,
+                               [('people', 0, 'age'), 'owner.last'])
+        self.assertEqual(_strings(errors), {'owner': 'same names'})
+
+    def test_unchanged_not_validated(self):
+        from schemaish import Sequence, String
+        calls = []
+        def validator(value):
+            calls.append(value)
+        schema = Sequence(String(validator=validator))
+        value = ['a', 'b', 'c']
+        self.assertEqual(self._callFUT(schema, value, None, ['1']), {})
+        self.assertEqual(calls, ['b'])
+        self.assertEqual(self._callFUT(schema, value, {}, []), {})
+        self.assertEqual(calls, ['b'])
+
+    def test_previous_errors_kept(self):
+        schema = _schema()
+        value = {'owner': _person(0), 'people': [], 'note': ''}
+        errors = error_dict(schema.validate, value)
+        value['owner']['age'] = -1
+        result = self._callFUT(schema, value, errors, ['owner.age'])
+        self.assertEqual(sorted(result), ['note', 'owner.age'])
+        self.assertTrue(result['note'] is errors['note'])
+        self.assertTrue('owner.age' not in errors)
+
+    def test_sequence_length(self):
+        schema = _schema()
+        value = {'owner': _person(0), 'people': [_person(1)], 'note': 'x'}
+        errors = error_dict(schema.validate, value)
+        value['people'].extend([_person(n) for n in range(2, 6)])
+        value['people'][4]['first'] = ''
+        errors = self._callFUT(schema, value, errors, ['people'])
+        self.assertEqual(sorted(errors), ['people', 'people.4.first'])
+        del value['people'][3:]
+        # An index past the end is validated as the whole sequence.
+        self.assertEqual(self._callFUT(schema, value, errors,
+                                       ['people.4.first']), {})
+
+    def test_unknown_path(self):
+        schema = _schema()
+        value = {'owner': _person(0), 'people': [], 'note': ''}
+        errors = error_dict(schema.validate, value)
+        value['other'] = 1
+        self.assertEqual(_strings(self._callFUT(schema, value, errors,
+                                                ['other.x'])),
+                         {'note': 'is required'})
+
+    def test_none_container(self):
+        schema = _schema()
+        value = {'owner': _person(0), 'people': [], 'note': 'x'}
+        errors = error_dict(schema.validate, value)
+        value['owner'] = None
+        expected = _strings(error_dict(schema.validate, value))
+        self.assertEqual(_strings(self._callFUT(schema, value, errors,
+                                                ['owner.first'])), expected)
+
+    def test_same_as_validate(self):
+        import random
+        schema = _schema()
+        rnd = random.Random(0)
+        value = {'owner': _person(0),
+                 'people': [_person(n) for n in range(1, 4)], 'note': 'x'}
+        errors = error_dict(schema.validate, value)
+        leaves = {'first': ['', 'A', 'B'], 'last': ['', 'A', 'BB'],
+                  'age': [-1, 0, None], 'code': ['', 'long'],
+                  'pair': [(1, 'x'), (0, 'x'), (1, ''), (1,), None]}
+        for n in range(300):
+            owner = rnd.randrange(len(value['people']) + 1)
+            name = rnd.choice(sorted(leaves))
+            if owner:
+                path = 'people.%d.%s' % (owner - 1, name)
+                person = value['people'][owner - 1]
+            else:
+                path = 'owner.%s' % name
+                person = value['owner']
+            person[name] = rnd.choice(leaves[name])
+            changed = [path]
+            if rnd.random() < 0.1:
+                value['people'].append(_person(n))
+                changed.append('people')
+            errors = self._callFUT(schema, value, errors, changed)
+            self.assertEqual(_strings(errors),
+                             _strings(error_dict(schema.validate, value)))
+
+
+class TestAttributeRevalidate(unittest.TestCase):
+
+    def test_raises(self):
+        from schemaish import Invalid
+        schema = _schema()
+        value = {'owner': _person(0), 'people': [], 'note': 'x'}
+        schema.revalidate(value, None, ['note'])
+        value['note'] = ''
+        try:
+            schema.revalidate(value, None, ['note'])
+        except Invalid, e:
+            self.assertEqual(_strings(e.error_dict), {'note': 'is required'})
+        else:
+            self.fail('Invalid not raised')
@@ -0,0 +1,138 @@
+import unittest
+
+from schemaish.tests.helpers import required
+
+
+class TestInterner(unittest.TestCase):
+
+    def _makeOne(self):
+        from schemaish.interning import Interner
+        return Interner()
+
+    def test_leaf(self):
+        from schemaish import String
+        interner = self._makeOne()
+        attr = String(title='Title')
+        shared = interner.intern(attr)
+        self.assertFalse(shared is attr)
+        self.assertFalse(attr.frozen)
+        self.assertTrue(shared.frozen)
+        self.assertEqual(shared.title, 'Title')
+        self.assertTrue(interner.intern(String(title='Title')) is shared)
+        self.assertTrue(interner.intern(shared) is shared)
+        self.assertFalse(interner.intern(String()) is shared)
+        self.assertFalse(interner.intern(String(title=u'Other')) is shared)
+
+    def test_settings_compared(self):
+        from schemaish import Integer, String
+        interner = self._makeOne()
+        intern = interner.intern
+        self.assertFalse(intern(String()) is intern(Integer()))
+        self.assertFalse(intern(String(default=1)) is
+                         intern(String(default=True)))
+        self.assertFalse(intern(String(default=[1])) is
+                         intern(String(default=(1,))))
+        self.assertTrue(intern(String(default=[1])) is
+                        intern(String(default=[1])))
+        self.assertTrue(intern(String(default={'a': [1]})) is
+                        intern(String(default={'a': [1]})))
+
+    def test_caches_compared(self):
+        from schemaish import Sequence, String
+        from schemaish.cache import ValidationCache
+        interner = self._makeOne()
+        intern = interner.intern
+        cache = ValidationCache()
+        a = intern(String(cache=cache))
+        self.assertTrue(intern(String(cache=cache)) is a)
+        self.assertFalse(intern(String(cache=ValidationCache())) is a)
+        self.assertFalse(intern(String()) is a)
+        # Containers of attributes that only differ by cache differ too.
+        self.assertFalse(intern(Sequence(String(cache=cache))) is
+                         intern(Sequence(String())))
+
+    def test_validators(self):
+        import validatish
+        from schemaish import String
+        interner = self._makeOne()
+        intern = interner.intern
+        a = intern(String(validator=validatish.Range(min=1)))
+        b = intern(String(validator=validatish.Range(min=1)))
+        self.assertTrue(a is b)
+        self.assertFalse(intern(String(validator=validatish.Range(max=1)))
+                         is a)
+        self.assertTrue(intern(String(validator=required)) is
+                        intern(String(validator=required)))
+        self.assertFalse(intern(String(validator=required)) is
+                         intern(String(validator=lambda v: None)))
+        # Equal validators are shared by attributes that differ otherwise.
+        c = intern(String(title='c', validator=validatish.Range(min=1)))
+        self.assertTrue(c.validator is a.validator)
+
+    def test_subtrees(self):
+        from schemaish import Sequence, String, Structure, Tuple
+        interner = self._makeOne()
+        def address():
+            return Structure([('street', String()), ('town', String())])
+        schema = Structure([('home', address()),
+                            ('work', address()),
+                            ('previous', Sequence(address())),
+                            ('pair', Tuple([String(), String()]))])
+        shared = interner.intern(schema)
+        self.assertTrue(shared.frozen)
+        self.assertFalse(schema.frozen)
+        self.assertFalse(schema.get('home').frozen)
+        home = shared.get('home')
+        self.assertTrue(home is shared.get('work'))
+        self.assertTrue(home is shared.get('previous').attr)
+        self.assertTrue(home.get('street') is home.get('town'))
+        self.assertTrue(shared.get('pair').attrs[0] is home.get('street'))
+        self.assertEqual(shared.names(), schema.names())
+        self.assertTrue(interner.intern(schema) is shared)
+        self.assertTrue(interner.intern(address()) is home)
+        self.assertFalse(interner.intern(Structure([('town', String()),
+                                                   ('street', String())]))
+                         is home)
+
+    def test_validate(self):
+        from schemaish import Invalid, String, Structure
+        schema = Structure([('a', String(validator=required)),
+                            ('b', Structure([('a', String(validator=required))]))])
+        shared = self._makeOne().intern(schema)
+        for attr in (schema, shared):
+            try:
+                attr.validate({'b': {}})
+                self.fail() # pragma: no cover
+            except Invalid, e:
+                self.assertEqual(sorted(e.error_dict), ['a', 'b.a'])
+
+    def test_declarative(self):
+        from schemaish import String, Structure
+        class Name(Structure):
+            first = String()
+            last = String()
+        interner = self._makeOne()
+        a = interner.intern(Name())
+        self.assertTrue(isinstance(a, Name))
+        self.assertTrue(interner.intern(Name()) is a)
+        self.assertFalse(interner.intern(Structure(list(Name.attrs))) is a)
+        self.assertFalse(Name.first.frozen)
+
+    def test_weak(self):
+        import gc
+        from schemaish import String
+        interner = self._makeOne()
+        attr = interner.intern(String(validator=None))
+        self.assertEqual(len(interner), 1)
+        del attr
+        gc.collect()
+        self.assertEqual(len(interner), 0)
+        interner.intern(String())
+        interner.clear()
+        self.assertEqual(len(interner), 0)
+
+    def test_intern_schema(self):
+        from schemaish import String
+        from schemaish.interning import intern_schema
+        a = intern_schema(String(title='intern_schema'))
+        self.assertTrue(intern_schema(String(title='intern_schema')) is a)
@@ -0,0 +1,116 @@
+import pickle
+import unittest
+
+import validatish
+
+import schemaish
+from schemaish.tests.helpers import error_messages
+
+
+class Record(schemaish.Structure):
+    name = schemaish.String(validator=validatish.Required())
+    scores = schemaish.Sequence(schemaish.Integer(
+        validator=validatish.Range(min=0, max=10)))
+
+
+class Future(object):
+
+    def __init__(self, result):
+        self._result = result
+        self.cancelled = False
+
+    def result(self):
+        return self._result
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class PicklingExecutor(object):
+    """
+    Executor that runs tasks immediately, pickling the task and its result as
+    a process pool would.
+    """
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        fn, args = pickle.loads(pickle.dumps((fn, args), 2))
+        future = Future(pickle.loads(pickle.dumps(fn(*args), 2)))
+        self.submitted.append(future)
+        return future
+
+
+class TestParallel(unittest.TestCase):
+
+    def _records(self):
+        return [{'name': n % 7 and 'name' or '', 'scores': [n % 12, 5]}
+                for n in range(50)]
+
+    def test_pickle_schema(self):
+        schema = schemaish.Sequence(Record(), validator=validatish.Required())
+        copy = pickle.loads(pickle.dumps(schema, 2))
+        self.assertTrue(isinstance(copy.attr, Record))
+        self.assertEqual(copy.attr.names(), ['name', 'scores'])
+        self.assertEqual(error_messages(copy.validate, self._records()),
+                         error_messages(schema.validate, self._records()))
+
+    def test_sequence(self):
+        schema = schemaish.Sequence(Record())
+        executor = PicklingExecutor()
+        expected = error_messages(schema.validate, self._records())
+        self.assertTrue(expected)
+        self.assertEqual(error_messages(schema.validate, self._records(),
+                                        executor=executor, chunk_size=8),
+                         expected)
+        self.assertEqual(len(executor.submitted), 7)
+
+    def test_nested(self):
+        schema = schemaish.Structure([
+            ('records', schemaish.Sequence(Record(),
+                                           validator=validatish.Required())),
+            ('numbers', schemaish.Sequence(schemaish.Integer(
+                validator=validatish.Range(min=0)), vectorize=True)),
+            ])
+        value = {'records': self._records(), 'numbers': range(-5, 20)}
+        expected = error_messages(schema.validate, value)
+        self.assertEqual(error_messages(schema.validate, value,
+                                        executor=PicklingExecutor(),
+                                        chunk_size=3),
+                         expected)
+        self.assertTrue('numbers.4' in expected)
+        self.assertTrue('records.11.scores.0' in expected)
+        self.assertEqual(error_messages(schema.validate, {'records': []},
+                                        executor=PicklingExecutor()),
+                         {'records': 'is required'})
+
+    def test_generator(self):
+        schema = schemaish.Sequence(Record())
+        self.assertEqual(error_messages(schema.validate, iter(self._records()),
+                                        executor=PicklingExecutor(),
+                                        chunk_size=10),
+                         error_messages(schema.validate, self._records()))
+
+    def test_fail_fast(self):
+        schema = schemaish.Sequence(Record())
+        executor = PicklingExecutor()
+        errors = error_messages(schema.validate, self._records(),
+                                executor=executor, chunk_size=10,
+                                fail_fast=True)
+        self.assertEqual(errors, {'0.name': 'is required'})
+        self.assertTrue(executor.submitted[-1].cancelled)
+
+    def test_process_pool(self):
+        try:
+            from concurrent.futures import ProcessPoolExecutor
+        except ImportError:
+            return
+        schema = schemaish.Sequence(Record())
+        executor = ProcessPoolExecutor(2)
+        try:
+            self.assertEqual(error_messages(schema.validate, self._records(),
+                                            executor=executor, chunk_size=10),
+                             error_messages(schema.validate, self._records()))
+        finally:
+            executor.shutdown()
@@ -0,0 +1,157 @@
+import unittest
+
+from schemaish.tests.helpers import assert_same_errors, error_messages
+from schemaish.tests.helpers import required
+
+
+class TestValidationPlan(unittest.TestCase):
+
+    def assertSame(self, schema, value):
+        return assert_same_errors(self, value, schema.validate,
+                                  schema.compile().validate)
+
+    def test_leaf(self):
+        from schemaish import String
+        s = String(validator=required)
+        self.assertEqual(self.assertSame(s, ''), {'': 'required'})
+        self.assertEqual(self.assertSame(s, 'x'), None)
+        self.assertEqual(self.assertSame(String(), None), None)
+
+    def test_always_dropped(self):
+        from schemaish import Structure, String
+        s = Structure([('a', String()), ('b', String())])
+        self.assertEqual(s.compile().steps, [])
+
+    def test_structure(self):
+        from schemaish import Structure, String
+        s = Structure([('a', String(validator=required)),
+                       ('b', String())], validator=required)
+        self.assertEqual(self.assertSame(s, {}),
+                         {'a': 'required', '': 'required'})
+        self.assertEqual(self.assertSame(s, {'a': 'x'}), None)
+        self.assertEqual(self.assertSame(s, None), {'': 'required'})
+
+    def test_nested(self):
+        from schemaish import Structure, String
+        inner = Structure([('b', String(validator=required))],
+                          validator=required)
+        s = Structure([('a', inner), ('c', String(validator=required))])
+        self.assertEqual(self.assertSame(s, {'a': {}}),
+                         {'a.b': 'required', 'a': 'required',
+                          'c': 'required'})
+        # Children of a missing structure are not validated.
+        self.assertEqual(self.assertSame(s, {'c': 'x'}), {'a': 'required'})
+        deep = Structure([('x', Structure([('y', s)]))])
+        self.assertEqual(self.assertSame(deep, {'x': {'y': {'a': {}}}}),
+                         {'x.y.a.b': 'required', 'x.y.a': 'required',
+                          'x.y.c': 'required'})
+        self.assertEqual(self.assertSame(deep, {'x': {}}), None)
+
+    def test_sequence(self):
+        from schemaish import Sequence, Structure, String
+        s = Sequence(String(validator=required), validator=required)
+        self.assertEqual(self.assertSame(s, ['x', '', 'y', '']),
+                         {'1': 'required', '3': 'required'})
+        self.assertEqual(self.assertSame(s, []), {'': 'required'})
+        self.assertEqual(self.assertSame(s, None), {'': 'required'})
+        s = Structure([('l', Sequence(Structure([
+            ('a', String(validator=required)),
+            ('b', Sequence(String(validator=required)))])))])
+        self.assertEqual(
+            self.assertSame(s, {'l': [{'a': 'x', 'b': ['', 'y']}, {}]}),
+            {'l.0.b.0': 'required', 'l.1.a': 'required'})
+
+    def test_tuple(self):
+        from schemaish import Structure, Tuple, String
+        t = Tuple([String(validator=required), String(validator=required)],
+                  validator=required)
+        self.assertEqual(self.assertSame(t, ('', '')),
+                         {'0': 'required', '1': 'required'})
+        self.assertEqual(self.assertSame(t, ('x',)), {'': 'Incorrect size'})
+        self.assertEqual(self.assertSame(t, ()), {'': 'required'})
+        self.assertEqual(self.assertSame(t, ('x', 'y')), None)
+        s = Structure([('t', t)])
+        self.assertEqual(self.assertSame(s, {'t': ('x', '')}),
+                         {'t.1': 'required'})
+        self.assertEqual(self.assertSame(s, {'t': ('x', 'y', 'z')}),
+                         {'t': 'Incorrect size'})
+        s = Structure([('s', Structure([('t', t)]))])
+        self.assertEqual(self.assertSame(s, {}), None)
+        nested = Tuple([Tuple([String(validator=required)]), String()])
+        self.assertEqual(self.assertSame(nested, (('',), 'x')),
+                         {'0.0': 'required'})
+
+    def test_custom_validate(self):
+        from schemaish import Structure, Invalid
+        from schemaish.attr import Attribute
+        import validatish
+        class Custom(Attribute):
+            def validate(self, value):
+                if value != 'ok':
+                    raise Invalid({'': validatish.Invalid('custom'),
+                                   'sub': validatish.Invalid('sub')})
+        s = Structure([('a', Custom()),
+                       ('s', Structure([('b', Custom())]))])
+        self.assertEqual(
+            self.assertSame(s, {'a': 'ok', 's': {}}),
+            {'s.b': 'custom', 's.b.sub': 'sub'})
+        self.assertEqual(self.assertSame(Custom(), None),
+                         {'': 'custom', 'sub': 'sub'})
+
+    def test_fail_fast(self):
+        from schemaish import Sequence, Structure, String, Invalid
+        schema = Structure([
+            ('a', Sequence(String(validator=required))),
+            ('b', String(validator=required))])
+        plan = schema.compile()
+        plan.validate({'a': ['x'], 'b': 'x'}, fail_fast=True)
+        try:
+            plan.validate({'a': ['x', '', ''], 'b': ''}, fail_fast=True)
+            self.fail() # pragma: no cover
+        except Invalid, e:
+            self.assertEqual(e.error_dict.keys(), ['a.1'])
+            self.assertTrue(type(e.error_dict) is dict)
+
+    def test_validate_many(self):
+        from schemaish import Structure, String
+        schema = Structure([('a', String(validator=required))])
+        rows = ({'a': str(n % 3)} for n in range(6))
+        results = schema.validate_many(rows)
+        self.assertEqual(results.next(), (0, None))
+        self.assertEqual(results.next()[1], None)
+        n, errors = results.next()
+        self.assertEqual(n, 2)
+        self.assertEqual(errors, None)
+        results = list(schema.validate_many([{}, {'a': 'x'}, None]))
+        self.assertEqual([n for n, errors in results], [0, 1, 2])
+        self.assertEqual(results[0][1].keys(), ['a'])
+        self.assertEqual(results[1][1], None)
+        self.assertEqual(results[2][1], None)
+
+    def test_futures(self):
+        from schemaish import Sequence, Structure, String, Tuple
+        import validatish
+        class Future(object):
+            def __init__(self, value):
+                self.value = value
+            def result(self):
+                if not self.value:
+                    raise validatish.Invalid('later')
+        schema = Structure([
+            ('a', String(validator=Future)),
+            ('b', Sequence(String(validator=Future), validator=Future)),
+            ('c', Tuple([String(validator=Future)]))])
+        value = {'a': '', 'b': ['x', ''], 'c': ('',)}
+        self.assertEqual(self.assertSame(schema, value),
+                         {'a': 'later', 'b.1': 'later', 'c.0': 'later'})
+        self.assertEqual(self.assertSame(schema, {'b': []}),
+                         {'a': 'later', 'b': 'later'})
+        results = list(schema.compile().validate_many([value]))
+        self.assertEqual(sorted(results[0][1]), ['a', 'b.1', 'c.0'])
+
+    def test_plan_is_reusable(self):
+        from schemaish import Structure, String, Invalid
+        plan = Structure([('a', String(validator=required))]).compile()
+        for i in range(3):
+            plan.validate({'a': 'x'})
+            self.assertRaises(Invalid, plan.validate, {})
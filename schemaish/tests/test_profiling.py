@@ -0,0 +1,100 @@
+import unittest
+
+from schemaish.tests.helpers import error_messages
+
+
+def _schema():
+    from schemaish import Integer, Invalid, Sequence, Structure, String
+    import validatish
+    class Custom(String):
+        __slots__ = ()
+        def validate(self, value):
+            super(Custom, self).validate(value)
+            if value == 'bad':
+                raise Invalid({'': validatish.Invalid('custom')})
+    return Structure([
+        ('name', String(validator=validatish.Required())),
+        ('custom', Custom()),
+        ('people', Sequence(Structure([
+            ('age', Integer(validator=validatish.Range(min=0)))])))])
+
+
+class TestProfiler(unittest.TestCase):
+
+    def _makeOne(self):
+        from schemaish.profiling import Profiler
+        return Profiler()
+
+    def _value(self):
+        return {'name': '', 'custom': 'bad',
+                'people': [{'age': 1}, {'age': -1}, {'age': 2}]}
+
+    def test_stats(self):
+        schema = _schema()
+        profiler = self._makeOne()
+        profiler.enable()
+        try:
+            error_messages(schema.validate, self._value())
+            error_messages(schema.validate, self._value())
+        finally:
+            profiler.disable()
+        stats = profiler.stats()
+        self.assertEqual(sorted(stats), ['', 'custom', 'name', 'people',
+                                         'people.*', 'people.*.age'])
+        age = stats['people.*.age']
+        self.assertEqual((age['attr'], age['calls'], age['failures']),
+                         ('Integer', 6, 2))
+        self.assertAlmostEqual(age['failure_rate'], 1 / 3.0)
+        self.assertEqual(stats['']['calls'], 2)
+        self.assertEqual(stats['custom']['calls'], 2)
+        self.assertEqual(stats['name']['failure_rate'], 1.0)
+        for entry in stats.itervalues():
+            self.failUnless(0 <= entry['self_time'] <= entry['time'])
+        self.failUnless(stats['']['time'] >= stats['people']['time'])
+
+    def test_collapsed(self):
+        from schemaish import Structure, String
+        profiler = self._makeOne()
+        schema = Structure([('a b;c', String())])
+        with profiler:
+            schema.validate({})
+        lines = profiler.collapsed().splitlines()
+        self.assertEqual([line.rsplit(' ', 1)[0] for line in lines],
+                         ['validate', 'validate;a_b:c'])
+        for line in lines:
+            int(line.rsplit(' ', 1)[1])
+
+    def test_same_errors(self):
+        schema = _schema()
+        for fail_fast in (False, True):
+            expected = error_messages(schema.validate, self._value(),
+                                      fail_fast=fail_fast)
+            with self._makeOne():
+                self.assertEqual(error_messages(schema.validate, self._value(),
+                                                fail_fast=fail_fast),
+                                 expected)
+
+    def test_disabled(self):
+        from schemaish import attr
+        schema = _schema()
+        profiler = self._makeOne()
+        with profiler:
+            self.failUnless(attr._profiler is profiler)
+        self.failUnless(attr._profiler is None)
+        error_messages(schema.validate, self._value())
+        self.assertEqual(profiler.stats(), {})
+
+    def test_one_active(self):
+        profiler = self._makeOne()
+        with profiler:
+            profiler.enable()
+            self.assertRaises(RuntimeError, self._makeOne().enable)
+        self._makeOne().disable()
+
+    def test_clear(self):
+        from schemaish import String
+        profiler = self._makeOne()
+        with profiler:
+            String().validate('a')
+        profiler.clear()
+        self.assertEqual(profiler.stats(), {})
@@ -0,0 +1,162 @@
+import unittest
+
+
+class Stream(object):
+    """
+    Unseekable upload stream without readinto.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def read(self, size):
+        data, self.data = self.data[:size], self.data[size:]
+        return data
+
+
+class TestSpooledStorage(unittest.TestCase):
+
+    def _makeOne(self, **kw):
+        from schemaish.storage import SpooledStorage
+        return SpooledStorage(**kw)
+
+    def test_memory(self):
+        storage = self._makeOne(threshold=10)
+        key = storage.save(Stream('0123456789'))
+        fp = storage.open(key)
+        self.failIf(fp._rolled)
+        self.assertEqual(fp.read(), '0123456789')
+        self.assertEqual(storage.open(key).read(), '0123456789')
+
+    def test_disk(self):
+        import io
+        from schemaish.type import CHUNK_SIZE
+        data = 'x' * (CHUNK_SIZE * 2 + 5)
+        storage = self._makeOne(threshold=CHUNK_SIZE + 1)
+        key = storage.save(io.BytesIO(data))
+        fp = storage.open(key)
+        self.failUnless(fp._rolled)
+        self.assertEqual(fp.read(), data)
+        storage = self._makeOne(threshold=0)
+        fp = storage.open(storage.save(Stream('x')))
+        self.failUnless(fp._rolled)
+        self.assertEqual(fp.read(), 'x')
+
+    def test_disk_mapped(self):
+        import io
+        from schemaish.type import _regular_file, scan
+        storage = self._makeOne(threshold=3)
+        fp = storage.open(storage.save(io.BytesIO('data')))
+        self.failUnless(_regular_file(fp) is not None)
+        self.assertEqual(scan(fp).size, 4)
+        fp = storage.open(storage.save(io.BytesIO('dat')))
+        self.failUnless(_regular_file(fp) is None)
+        self.assertEqual(scan(fp).size, 3)
+
+    def test_delete(self):
+        storage = self._makeOne()
+        key = storage.save(Stream('data'))
+        self.assertNotEqual(storage.save(Stream('data')), key)
+        self.assertEqual(len(storage), 2)
+        storage.delete(key)
+        storage.delete(key)
+        self.assertEqual(len(storage), 1)
+        self.assertRaises(KeyError, storage.open, key)
+
+
+class TestContentStore(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.root)
+
+    def _makeOne(self):
+        import os
+        from schemaish.storage import ContentStore
+        return ContentStore(os.path.join(self.root, 'store'))
+
+    def test_save(self):
+        import hashlib
+        import os
+        store = self._makeOne()
+        key = store.save(Stream('data'))
+        self.assertEqual(key, hashlib.sha256('data').hexdigest())
+        self.assertEqual(store.path(key),
+                         os.path.join(self.root, 'store', key[:2], key[2:]))
+        self.failUnless(key in store)
+        fp = store.open(key)
+        self.assertEqual(fp.read(), 'data')
+        fp.close()
+
+    def test_dedup(self):
+        import os
+        from StringIO import StringIO
+        store = self._makeOne()
+        key = store.save(Stream('data'))
+        self.assertEqual(store.save(StringIO('data')), key)
+        self.assertEqual(sorted(os.listdir(store.root)), [key[:2]])
+        self.assertEqual(os.listdir(os.path.join(store.root, key[:2])),
+                         [key[2:]])
+
+    def test_delete(self):
+        store = self._makeOne()
+        key = store.save(Stream('data'))
+        store.delete(key)
+        store.delete(key)
+        self.failIf(key in store)
+        self.assertRaises(KeyError, store.open, key)
+
+    def test_bad_key(self):
+        store = self._makeOne()
+        self.assertRaises(KeyError, store.open, '../../etc/passwd')
+        self.assertRaises(KeyError, store.path, 'A' * 64)
+        self.failIf('../x' in store)
+
+    def test_failed_save(self):
+        import os
+        class Broken(object):
+            def read(self, size):
+                raise IOError('connection lost')
+        store = self._makeOne()
+        self.assertRaises(IOError, store.save, Broken())
+        self.assertEqual(os.listdir(store.root), [])
+
+
+class TestStore(unittest.TestCase):
+
+    def test_lazy(self):
+        from schemaish.storage import store
+        class Storage(object):
+            opened = 0
+            def save(self, fp):
+                self.data = fp.read(100)
+                return 'key'
+            def open(self, key):
+                from StringIO import StringIO
+                self.opened += 1
+                return StringIO(self.data)
+        storage = Storage()
+        value = store(storage, Stream('data'), 'a.txt', 'text/plain',
+                      {'a': 1})
+        self.assertEqual((value.storage, value.key), (storage, 'key'))
+        self.assertEqual(value.metadata, {'a': 1})
+        self.failUnless("unopened 'key'" in repr(value))
+        self.assertEqual(storage.opened, 0)
+        self.assertEqual(value.file.read(), 'data')
+        value.file
+        self.assertEqual(storage.opened, 1)
+
+    def test_validate(self):
+        import hashlib
+        import schemaish
+        from schemaish.storage import SpooledStorage, store
+        storage = SpooledStorage(threshold=0)
+        value = store(storage, Stream('%PDF-1.4'), 'a.pdf', None)
+        schemaish.File(max_size=100, mimetypes=['application/pdf'],
+                       digests=['sha256']).validate(value)
+        self.assertEqual(value.metadata['sha256'],
+                         hashlib.sha256('%PDF-1.4').hexdigest())
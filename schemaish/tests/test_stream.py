@@ -0,0 +1,220 @@
+import unittest
+
+from schemaish.tests.helpers import error_messages, required
+
+
+class TestBasicParse(unittest.TestCase):
+
+    def _events(self, text, buf_size=65536):
+        from StringIO import StringIO
+        from schemaish.stream import basic_parse
+        return list(basic_parse(StringIO(text), buf_size))
+
+    def test_events(self):
+        self.assertEqual(
+            self._events('{"a": [1, -2.5, true, false, null, "x"], "b": {}}'),
+            [('start_map', None),
+             ('map_key', u'a'), ('start_array', None),
+             ('number', 1), ('number', -2.5), ('boolean', True),
+             ('boolean', False), ('null', None), ('string', u'x'),
+             ('end_array', None),
+             ('map_key', u'b'), ('start_map', None), ('end_map', None),
+             ('end_map', None)])
+        self.assertEqual(self._events(' []\n'),
+                         [('start_array', None), ('end_array', None)])
+        self.assertEqual(self._events('12'), [('number', 12)])
+
+    def test_values_as_json(self):
+        import json
+        text = json.dumps([u'\xe9\u2603', u'"\\', 'x' * 50, '\\"' * 20,
+                           12345678901234567890, 1e100, -0.5, 0])
+        values = [value for (kind, value) in self._events(text)
+                  if kind in ('string', 'number')]
+        self.assertEqual(values, json.loads(text))
+        self.assertEqual([type(v) for v in values],
+                         [type(v) for v in json.loads(text)])
+
+    def test_buffer_boundaries(self):
+        import json
+        doc = {'a': [1, 23.5e-3, None, True, u'\xe9 "q" \\', {'b': []}],
+               'c': 'x' * 100, 'd': -12345}
+        for text in (json.dumps(doc), json.dumps(doc, indent=2),
+                     json.dumps(doc, ensure_ascii=False).encode('utf-8')):
+            expected = self._events(text)
+            for buf_size in (1, 2, 3, 5, 8):
+                self.assertEqual(self._events(text, buf_size), expected)
+
+    def test_numbers_at_boundaries(self):
+        text = '[1.5e-3, 2E+10, -0.25, 10, -7]'
+        for buf_size in (1, 2, 3, 4, 5):
+            self.assertEqual([v for (k, v) in self._events(text, buf_size)
+                              if k == 'number'],
+                             [1.5e-3, 2E+10, -0.25, 10, -7])
+
+    def test_whole_values(self):
+        from StringIO import StringIO
+        from schemaish.stream import basic_parse
+        text = '{"a": [{"b": 1}, [2], 3, {"c": "d"}], "e" : {"f": null}}'
+        parse = basic_parse(StringIO(text))
+        self.assertEqual(parse.next(), ('start_map', None))
+        self.assertEqual(parse.next(), ('map_key', u'a'))
+        self.assertEqual(parse.next(), ('start_array', None))
+        self.assertEqual(parse.send(True), ('value', {u'b': 1}))
+        self.assertEqual(parse.send(True), ('value', [2]))
+        self.assertEqual(parse.send(True), ('number', 3))
+        self.assertEqual(parse.next(), ('start_map', None))
+        self.assertEqual(parse.next(), ('map_key', u'c'))
+        self.assertEqual(parse.next(), ('string', u'd'))
+        self.assertEqual(parse.next(), ('end_map', None))
+        self.assertEqual(parse.send(True), ('end_array', None))
+        self.assertEqual(parse.next(), ('map_key', u'e'))
+        self.assertEqual(parse.send(True), ('value', {u'f': None}))
+        self.assertEqual(parse.next(), ('end_map', None))
+        self.assertRaises(StopIteration, parse.next)
+
+    def test_whole_values_not_buffered(self):
+        from StringIO import StringIO
+        from schemaish.stream import basic_parse
+        parse = basic_parse(StringIO('[{"b": 1234567890}]'), 4)
+        self.assertEqual(parse.next(), ('start_array', None))
+        self.assertEqual(parse.send(True), ('start_map', None))
+        # Invalid values are parsed event by event, to the error.
+        parse = basic_parse(StringIO('[{"b": 1,}]'))
+        parse.next()
+        self.assertEqual(parse.send(True), ('start_map', None))
+        self.assertEqual(parse.next(), ('map_key', u'b'))
+        self.assertEqual(parse.next(), ('number', 1))
+        self.assertRaises(ValueError, parse.next)
+
+    def test_invalid(self):
+        for text in ('', '{', '[1,]', '{"a" 1}', '{"a": 1,}', '[1 2]',
+                     '"abc', '1 2', 'tru', '[nul]', '{1: 2}'):
+            for buf_size in (1, 65536):
+                self.assertRaises(ValueError, self._events, text, buf_size)
+
+
+class TestValidateJSON(unittest.TestCase):
+
+    def assertSame(self, schema, value):
+        import json
+        from StringIO import StringIO
+        from schemaish.stream import basic_parse, validate_events
+        from schemaish.stream import validate_json
+        text = json.dumps(value)
+        expected = error_messages(schema.validate, json.loads(text))
+        # Small buffers parse everything event by event.
+        for buf_size in (7, 65536):
+            self.assertEqual(
+                error_messages(validate_json, schema, StringIO(text), False,
+                               buf_size),
+                expected)
+        self.assertEqual(
+            error_messages(validate_events, schema,
+                           basic_parse(StringIO(text))),
+            expected)
+        return expected
+
+    def test_leaf(self):
+        from schemaish import String
+        s = String(validator=required)
+        self.assertEqual(self.assertSame(s, ''), {'': 'required'})
+        self.assertEqual(self.assertSame(s, 'x'), None)
+        self.assertEqual(self.assertSame(s, None), {'': 'required'})
+        self.assertEqual(self.assertSame(s, {'a': 1}), None)
+
+    def test_structure(self):
+        from schemaish import Structure, String
+        s = Structure([('a', String(validator=required)),
+                       ('b', Structure([('c', String(validator=required))])),
+                       ('d', String())])
+        self.assertEqual(self.assertSame(s, {}), {'a': 'required'})
+        self.assertEqual(self.assertSame(s, {'b': {}, 'x': {'a': [1, {}]}}),
+                         {'a': 'required', 'b.c': 'required'})
+        self.assertEqual(self.assertSame(s, {'a': 'x', 'b': None}), None)
+        self.assertEqual(self.assertSame(s, None), None)
+        s.get('a')
+        s.attrs[0] = ('e', String(validator=required))
+        self.assertEqual(self.assertSame(s, {'a': 'x', 'b': {'c': 'x'}}),
+                         {'e': 'required'})
+
+    def test_sequence(self):
+        from schemaish import Sequence, Structure, String
+        s = Sequence(Structure([
+            ('a', String(validator=required)),
+            ('b', Sequence(String(validator=required)))]))
+        self.assertEqual(
+            self.assertSame(s, [{'a': 'x', 'b': ['', 'y']}, {}, None]),
+            {'0.b.0': 'required', '1.a': 'required'})
+        self.assertEqual(self.assertSame(s, []), None)
+        self.assertEqual(self.assertSame(Sequence(String(), vectorize=True),
+                                         ['', 'x']), None)
+
+    def test_container_validators(self):
+        from schemaish import Sequence, Structure, String
+        s = Structure([
+            ('l', Sequence(String(validator=required), validator=required)),
+            ('s', Structure([('a', String(validator=required))],
+                            validator=required))])
+        self.assertEqual(self.assertSame(s, {'l': [], 's': {}}),
+                         {'l': 'required', 's': 'required',
+                          's.a': 'required'})
+        self.assertEqual(self.assertSame(s, {'l': ['', 'x'], 's': {'a': 'x'}}),
+                         {'l.0': 'required'})
+        self.assertEqual(self.assertSame(s, {}),
+                         {'l': 'required', 's': 'required'})
+
+    def test_tuple(self):
+        from schemaish import Structure, Tuple, String
+        t = Tuple([String(validator=required), String(validator=required)],
+                  validator=required)
+        s = Structure([('t', t)])
+        self.assertEqual(self.assertSame(s, {'t': ['x', '']}),
+                         {'t.1': 'required'})
+        self.assertEqual(self.assertSame(s, {'t': ['x']}),
+                         {'t': 'Incorrect size'})
+        self.assertEqual(self.assertSame(s, {'t': ['x', 'y']}), None)
+
+    def test_custom_validate(self):
+        from schemaish import Structure, Invalid
+        from schemaish.attr import Attribute
+        import validatish
+        class Custom(Attribute):
+            def validate(self, value):
+                if value != {'ok': True}:
+                    raise Invalid({'': validatish.Invalid('custom'),
+                                   'sub': validatish.Invalid('sub')})
+        s = Structure([('a', Custom()),
+                       ('s', Structure([('b', Custom())]))])
+        self.assertEqual(
+            self.assertSame(s, {'a': {'ok': True}, 's': {'b': [1]}}),
+            {'s.b': 'custom', 's.b.sub': 'sub'})
+
+    def test_fail_fast(self):
+        from StringIO import StringIO
+        from schemaish import Invalid, Sequence, String
+        from schemaish.stream import validate_json
+        s = Sequence(String(validator=required))
+        try:
+            validate_json(s, StringIO('["x", "", "", "x"'), fail_fast=True)
+            self.fail() # pragma: no cover
+        except Invalid, e:
+            self.assertEqual(e.error_dict.keys(), ['1'])
+            self.assertTrue(type(e.error_dict) is dict)
+
+    def test_invalid_json(self):
+        from StringIO import StringIO
+        from schemaish import Sequence, String
+        from schemaish.stream import validate_json
+        s = Sequence(String())
+        self.assertRaises(ValueError, validate_json, s, StringIO('["x", '))
+
+    def test_events(self):
+        from schemaish import Invalid, Structure, String
+        from schemaish.stream import validate_events
+        s = Structure([('a', String(validator=required))])
+        events = [('start_map', None), ('map_key', 'a'), ('string', ''),
+                  ('end_map', None)]
+        self.assertRaises(Invalid, validate_events, s, events)
+        self.assertRaises(ValueError, validate_events, s, events[:-1])
+        validate_events(s, [('start_map', None), ('map_key', 'a'),
+                            ('string', 'x'), ('end_map', None)])
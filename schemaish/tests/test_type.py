@@ -19,5 +19,121 @@ class FileTests(unittest.TestCase):
             """<schemaish.type.File file="\'file\'" filename=\"filename\""""))
         self.failUnless(result.endswith(
             """mimetype="mimetype", metadata="{}" >"""))
-        
-        
+
+    def test_without_init(self):
+        import copy
+        from schemaish.type import File
+        f = File.__new__(File)
+        self.assertEqual((f.file, f.storage, f.key), (None, None, None))
+        f = copy.copy(self._makeOne('file', 'filename', 'mimetype'))
+        self.assertEqual(f.file, 'file')
+
+    def test_legacy_pickle(self):
+        import pickle
+        from schemaish.type import File
+        # As pickled when File kept file in its __dict__.
+        f = File.__new__(File)
+        f.__dict__.update({'file': 'file', 'filename': 'filename',
+                           'mimetype': 'mimetype', 'metadata': {}})
+        f = pickle.loads(pickle.dumps(f))
+        self.assertEqual(f.file, 'file')
+        self.failUnless('file="\'file\'"' in repr(f))
+
+
+
+class ScanTests(unittest.TestCase):
+
+    def _callFUT(self, fp, *arg, **kw):
+        from schemaish.type import scan
+        return scan(fp, *arg, **kw)
+
+    def _check(self, fp, data):
+        import hashlib
+        fp.seek(2)
+        result = self._callFUT(fp, ('sha256', 'md5'), chunk_size=7)
+        self.assertEqual(result.size, len(data) - 2)
+        self.assertEqual(result.head, data[2:34])
+        self.assertEqual(result.digests,
+                         {'sha256': hashlib.sha256(data[2:]).hexdigest(),
+                          'md5': hashlib.md5(data[2:]).hexdigest()})
+        self.failUnless(result.complete)
+        self.assertEqual(fp.tell(), 2)
+        result = self._callFUT(fp, ('md5',), max_size=len(data) - 3,
+                               chunk_size=7)
+        self.failIf(result.complete)
+        self.assertEqual(result.digests, {})
+        self.failUnless(result.size > len(data) - 3)
+        self.assertEqual(fp.tell(), 2)
+
+    def test_read(self):
+        from StringIO import StringIO
+        data = ''.join([chr(n % 256) for n in range(1000)])
+        self._check(StringIO(data), data)
+
+    def test_readinto(self):
+        import io
+        data = ''.join([chr(n % 256) for n in range(1000)])
+        self._check(io.BytesIO(data), data)
+
+    def test_mapped(self):
+        import tempfile
+        data = ''.join([chr(n % 256) for n in range(1000)])
+        for fp in (tempfile.TemporaryFile(), tempfile.NamedTemporaryFile()):
+            fp.write(data)
+            self._check(fp, data)
+            fp.close()
+
+    def test_empty(self):
+        import tempfile
+        from StringIO import StringIO
+        for fp in (StringIO(''), tempfile.TemporaryFile()):
+            result = self._callFUT(fp, ('md5',))
+            self.assertEqual((result.size, result.head, result.complete),
+                             (0, '', True))
+            self.assertEqual(result.digests,
+                             {'md5': 'd41d8cd98f00b204e9800998ecf8427e'})
+
+    def test_unseekable(self):
+        class Stream(object):
+            def __init__(self, data):
+                self.data = data
+            def read(self, size):
+                data, self.data = self.data[:size], self.data[size:]
+                return data
+        result = self._callFUT(Stream('x' * 100), chunk_size=16)
+        self.assertEqual(result.size, 100)
+        stream = Stream('x' * 100)
+        result = self._callFUT(stream, head_only=True)
+        self.assertEqual((result.size, result.head), (32, 'x' * 32))
+        self.assertEqual(len(stream.data), 68)
+        result = self._callFUT(Stream('x' * 100), ('md5',), head_only=True)
+        self.assertEqual(result.size, 100)
+
+    def test_head_only(self):
+        import io
+        data = 'x' * 100
+        fp = io.BytesIO(data)
+        fp.seek(2)
+        result = self._callFUT(fp, chunk_size=7, head_only=True)
+        self.assertEqual((result.size, result.head), (35, data[2:34]))
+        self.failUnless(result.complete)
+        self.assertEqual(fp.tell(), 2)
+        result = self._callFUT(fp, max_size=50, head_only=True)
+        self.failIf(result.complete)
+
+
+class SniffTests(unittest.TestCase):
+
+    def _callFUT(self, head):
+        from schemaish.type import sniff
+        return sniff(head)
+
+    def test_sniff(self):
+        self.assertEqual(self._callFUT('\x89PNG\r\n\x1a\n...'), 'image/png')
+        self.assertEqual(self._callFUT('\xff\xd8\xff\xe0'), 'image/jpeg')
+        self.assertEqual(self._callFUT('RIFF\0\0\0\0WEBPVP8'), 'image/webp')
+        self.assertEqual(self._callFUT('RIFF\0\0\0\0WAVEfmt'), 'audio/wav')
+        self.assertEqual(self._callFUT('\0\0\0\x18ftypmp42'), 'video/mp4')
+        self.assertEqual(self._callFUT('XXXX\0\0\0\0WEBP'), None)
+        self.assertEqual(self._callFUT('hello'), None)
+        self.assertEqual(self._callFUT(''), None)
@@ -0,0 +1,103 @@
+import array
+import unittest
+
+import validatish
+
+from schemaish.tests.helpers import assert_same_errors, error_messages
+from schemaish.tests.helpers import required
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestVectorize(unittest.TestCase):
+
+    def assertSame(self, attr, value):
+        from schemaish import Sequence
+        vectorized = Sequence(attr, vectorize=True)
+        return assert_same_errors(self, value, Sequence(attr).validate,
+                                  vectorized.validate,
+                                  vectorized.compile().validate)
+
+    def test_required(self):
+        from schemaish import String
+        attr = String(validator=validatish.Required())
+        errors = self.assertSame(attr, ['a', '', None, 0, 'b', []])
+        self.assertEqual(sorted(errors), ['1', '2', '5'])
+
+    def test_range(self):
+        from schemaish import Integer
+        for validator in [validatish.Range(min=0, max=10),
+                          validatish.Range(min=0),
+                          validatish.Range(max=10),
+                          validatish.Range()]:
+            attr = Integer(validator=validator)
+            self.assertSame(attr, [-1, 0, 5, 10, 11, 3.5, None])
+            self.assertSame(attr, array.array('i', [-5, 5, 50]))
+
+    def test_one_of(self):
+        from schemaish import String
+        attr = String(validator=validatish.OneOf(['a', 'b', ('c',)]))
+        errors = self.assertSame(attr, ['a', 'x', None, ['c'], [], 'b'])
+        self.assertEqual(sorted(errors), ['1', '4'])
+        self.assertSame(String(validator=validatish.OneOf([])), ['a', None])
+
+    def test_length(self):
+        from schemaish import String
+        for validator in [validatish.Length(min=1, max=3),
+                          validatish.Length(min=2),
+                          validatish.Length(max=2)]:
+            self.assertSame(String(validator=validator),
+                            ['', 'a', 'abc', 'abcd', None, [1, 2]])
+
+    def test_all(self):
+        from schemaish import Integer
+        attr = Integer(validator=validatish.All(
+            validatish.Required(), validatish.Range(max=10),
+            validatish.OneOf([0, 1, 2, 20])))
+        errors = self.assertSame(attr, [0, 1, 20, 3, None, 11])
+        self.assertEqual(sorted(errors), ['2', '3', '4', '5'])
+        from schemaish import Sequence
+        errors = error_messages(Sequence(attr, vectorize=True).validate,
+                                iter([0, 3, 20]))
+        self.assertEqual(sorted(errors), ['1', '2'])
+
+    def test_unsupported(self):
+        from schemaish import Sequence, String
+        attr = String(validator=required)
+        self.assertEqual(Sequence(attr, vectorize=True)._batch_check(), None)
+        self.assertSame(attr, ['a', ''])
+        attr = String(validator=validatish.Any(validatish.Required()))
+        self.assertEqual(Sequence(attr, vectorize=True)._batch_check(), None)
+        self.assertSame(attr, ['a', ''])
+
+    def test_nested_keys(self):
+        from schemaish import Integer, Sequence, Structure
+        s = Structure([('numbers', Sequence(
+            Integer(validator=validatish.Range(min=0)), vectorize=True))])
+        errors = error_messages(s.validate, {'numbers': [1, -1, 2, -2]})
+        self.assertEqual(sorted(errors), ['numbers.1', 'numbers.3'])
+        errors = error_messages(s.validate, {'numbers': [1, -1, 2, -2]},
+                                fail_fast=True)
+        self.assertEqual(sorted(errors), ['numbers.1'])
+
+    def test_numpy(self):
+        if numpy is None:
+            return
+        from schemaish import Float, Integer
+        values = numpy.array([-2, -1, 0, 1, 2, 30])
+        self.assertEqual(
+            sorted(self.assertSame(
+                Integer(validator=validatish.Range(min=0, max=10)), values)),
+            ['0', '1', '5'])
+        self.assertEqual(
+            sorted(self.assertSame(
+                Integer(validator=validatish.OneOf([0, 2, 30])), values)),
+            ['0', '1', '3'])
+        self.assertEqual(
+            self.assertSame(Integer(validator=validatish.Required()), values),
+            None)
+        floats = numpy.array([0.5, numpy.nan, -1.5])
+        self.assertSame(Float(validator=validatish.Range(min=0)), floats)
@@ -1,17 +1,243 @@
 """
 basic class object for storing files
 """
+
+import hashlib
+import mmap
+import os
+import stat
+import tempfile
+
+
+# Size of the buffer files are read into by scan.
+CHUNK_SIZE = 65536
+
+# Number of bytes at the start of a file that sniff looks at.
+SNIFF_SIZE = 32
+
+
 class File(object):
-    def __init__(self, file, filename, mimetype, metadata=None):
+    """
+    A file, e.g. an upload.
+
+    The file object may instead be opened from a storage (see
+    L{schemaish.storage}), by key, the first time it's used.
+    """
+
+    # Defaults for instances made without __init__, e.g. by copy or pickle.
+    _file = None
+    storage = None
+    key = None
+
+    def __init__(self, file, filename, mimetype, metadata=None, storage=None,
+                 key=None):
         self.file = file
         self.filename = filename
         self.mimetype = mimetype
         if metadata is None:
             metadata = {}
         self.metadata = metadata
+        self.storage = storage
+        self.key = key
+
+    def _get_file(self):
+        file = self._file
+        if file is None:
+            # Files pickled before file was a property keep it in __dict__.
+            file = self.__dict__.get('file')
+            if file is None and self.storage is not None:
+                file = self.storage.open(self.key)
+            if file is not None:
+                self._file = file
+        return file
+    def _set_file(self, file): self._file = file
+    file = property(_get_file, _set_file)
 
     def __repr__(self):
+        file = self._file
+        if file is None:
+            file = self.__dict__.get('file')
+        if file is None and self.storage is not None:
+            file = 'unopened %r' % (self.key,)
         return ('<schemaish.type.File file="%r" filename="%s", '
                 'mimetype="%s", metadata="%r" >' % (
-                    self.file, self.filename, self.mimetype, self.metadata))
+                    file, self.filename, self.mimetype, self.metadata))
+
+
+class Scan(object):
+    """
+    The result of scanning a file.
+
+    @ivar size: Size of the file in bytes, or the number of bytes read before
+        the scan stopped if it's not complete or only read the head.
+    @ivar head: The first SNIFF_SIZE (or fewer) bytes of the file.
+    @ivar digests: Dict of hex digests of the file, by algorithm name.
+    @ivar complete: False if the scan stopped early, when the file turned out
+        to be larger than max_size.
+    """
+
+    def __init__(self, size, head, digests, complete):
+        self.size = size
+        self.head = head
+        self.digests = digests
+        self.complete = complete
+
+    def __repr__(self):
+        return '<schemaish.type.Scan size=%d digests=%r complete=%r>' % (
+            self.size, self.digests, self.complete)
+
+
+def scan(fp, digests=(), max_size=None, chunk_size=CHUNK_SIZE,
+         head_only=False):
+    """
+    Find the size, start and digests of a file in a single pass.
+
+    Files are read in chunks into one reusable buffer, so a file of any size
+    is scanned in constant memory. Regular files on disk (file objects,
+    including temporary files) are memory mapped instead of read, and their
+    size is known without reading them at all. Scanning starts at the file's
+    current position, which is restored afterwards if the file is seekable.
+
+    @param fp: File-like object to scan.
+    @keyword digests: Names of the hashlib algorithms to digest the file
+        with, e.g. ('sha256', 'md5').
+    @keyword max_size: Stop scanning as soon as more than max_size bytes have
+        been found.
+    @keyword chunk_size: Size of the read buffer.
+    @keyword head_only: Stop reading as soon as the head has been read if
+        there are no digests or max_size to check, e.g. when only sniffing
+        the file's type. The size is then only that of what was read.
+    @return: A L{Scan}.
+    """
+    hashes = [(name, hashlib.new(name)) for name in digests]
+    head_only = head_only and not hashes and max_size is None
+    mapped = _regular_file(fp)
+    if mapped is not None:
+        size, head, complete = _scan_mapped(mapped, hashes, max_size)
+    else:
+        if head_only:
+            chunk_size = min(chunk_size, SNIFF_SIZE)
+        size, head, complete = _scan_read(fp, hashes, max_size, chunk_size,
+                                          head_only)
+    if not complete:
+        hashes = []
+    return Scan(size, head, dict((name, h.hexdigest()) for name, h in hashes),
+                complete)
+
+
+def _regular_file(fp):
+    """
+    Return the real file object of fp, if it's a regular file on disk.
+    """
+    if not isinstance(fp, file):
+        if isinstance(fp, tempfile.SpooledTemporaryFile):
+            # Its file on disk, once it has been rolled over.
+            fp = fp._file
+        else:
+            # e.g. tempfile.NamedTemporaryFile's wrapper.
+            fp = getattr(fp, 'file', None)
+        if not isinstance(fp, file):
+            return None
+    try:
+        mode = os.fstat(fp.fileno()).st_mode
+    except (OSError, ValueError):
+        return None
+    if not stat.S_ISREG(mode):
+        return None
+    return fp
+
+
+def _scan_mapped(fp, hashes, max_size):
+    fp.flush()
+    start = fp.tell()
+    size = max(os.fstat(fp.fileno()).st_size - start, 0)
+    if max_size is not None and size > max_size:
+        return size, '', False
+    if not size:
+        return 0, '', True
+    data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        view = buffer(data, start)
+        for name, h in hashes:
+            h.update(view)
+        return size, data[start:start + SNIFF_SIZE], True
+    finally:
+        data.close()
+
+
+def _scan_read(fp, hashes, max_size, chunk_size, head_only):
+    try:
+        start = fp.tell()
+    except (AttributeError, IOError):
+        start = None
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    readinto = getattr(fp, 'readinto', None)
+    size, head, complete = 0, '', True
+    try:
+        while True:
+            if readinto is not None:
+                n = readinto(buf) or 0
+                chunk = view
+                if n < chunk_size:
+                    chunk = view[:n]
+            else:
+                chunk = fp.read(chunk_size)
+                n = len(chunk)
+            if not n:
+                break
+            if len(head) < SNIFF_SIZE:
+                piece = chunk[:SNIFF_SIZE - len(head)]
+                if readinto is not None:
+                    piece = piece.tobytes()
+                head += piece
+            size += n
+            if head_only and len(head) == SNIFF_SIZE:
+                break
+            if max_size is not None and size > max_size:
+                complete = False
+                break
+            for name, h in hashes:
+                h.update(chunk)
+    finally:
+        if start is not None:
+            fp.seek(start)
+    return size, head, complete
+
+
+# (offset, signature, mimetype) of the file types sniff recognizes.
+_signatures = [
+    (0, '\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, '\xff\xd8\xff', 'image/jpeg'),
+    (0, 'GIF87a', 'image/gif'),
+    (0, 'GIF89a', 'image/gif'),
+    (0, 'BM', 'image/bmp'),
+    (0, 'II*\x00', 'image/tiff'),
+    (0, 'MM\x00*', 'image/tiff'),
+    (8, 'WEBP', 'image/webp'),
+    (0, '%PDF-', 'application/pdf'),
+    (0, 'PK\x03\x04', 'application/zip'),
+    (0, '\x1f\x8b', 'application/gzip'),
+    (0, 'BZh', 'application/x-bzip2'),
+    (0, '7z\xbc\xaf\x27\x1c', 'application/x-7z-compressed'),
+    (0, '\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),
+    (8, 'WAVE', 'audio/wav'),
+    (0, 'OggS', 'audio/ogg'),
+    (0, 'fLaC', 'audio/flac'),
+    (0, 'ID3', 'audio/mpeg'),
+    (4, 'ftyp', 'video/mp4'),
+    (0, '\x1aE\xdf\xa3', 'video/webm'),
+    ]
+
 
+def sniff(head):
+    """
+    Return the mimetype of a file recognized from the bytes it starts with,
+    or None if it's not recognized.
+    """
+    for offset, signature, mimetype in _signatures:
+        if head.startswith(signature, offset):
+            if offset == 8 and not head.startswith('RIFF'):
+                continue
+            return mimetype
+    return None
@@ -0,0 +1,159 @@
+"""
+Batched checks for sequences of simple values.
+
+A batched check finds the items of a sequence that fail a validator in one
+pass, without calling the validator for every item. It's used by
+L{schemaish.attr.Sequence} when created with vectorize=True.
+
+Checks are available for the validatish Required, Range, OneOf and Length
+validators and for All combinations of them. Lists, tuples, array.array
+instances and other iterables are checked in pure Python; one dimensional
+numeric NumPy arrays are checked with NumPy, if the value is a NumPy array.
+NumPy itself is never imported by this module.
+"""
+
+import sys
+
+import validatish
+
+
+def batch_check(validator):
+    """
+    Return a function that takes an iterable of values and returns a list of
+    (index, value) pairs for the values that fail validator, or None if the
+    validator can't be checked in a batch.
+
+    The result may include values that the validator would in fact accept,
+    so the validator must still be called for each of them.
+    """
+    if not validator:
+        return _check_none
+    factory = _factories.get(type(validator))
+    if factory is None:
+        return None
+    return factory(validator)
+
+
+def _check_none(values):
+    return []
+
+
+def _numeric_array(values):
+    """
+    Return the NumPy module if values is a one dimensional numeric array, or
+    None.
+    """
+    numpy = sys.modules.get('numpy')
+    if numpy is None or not isinstance(values, numpy.ndarray):
+        return None
+    if values.ndim != 1 or values.dtype.kind not in 'biuf':
+        return None
+    return numpy
+
+
+def _number(value):
+    return isinstance(value, (int, long, float)) and \
+            not isinstance(value, bool)
+
+
+def _required(validator):
+    def check(values):
+        if _numeric_array(values) is not None:
+            # Numbers, including zero, always pass.
+            return []
+        return [(n, v) for n, v in enumerate(values) if not v and v != 0]
+    return check
+
+
+def _range(validator):
+    lo, hi = validator.min, validator.max
+    if lo is None and hi is None:
+        return _check_none
+    def check(values):
+        numpy = _numeric_array(values)
+        if numpy is not None and \
+                (lo is None or _number(lo)) and (hi is None or _number(hi)):
+            mask = numpy.zeros(len(values), dtype=bool)
+            # NaN compares False, as it does for the validator.
+            olderr = numpy.seterr(invalid='ignore')
+            try:
+                if hi is not None:
+                    mask |= values > hi
+                if lo is not None:
+                    mask |= values < lo
+            finally:
+                numpy.seterr(**olderr)
+            return [(n, values[n]) for n in numpy.flatnonzero(mask).tolist()]
+        if lo is None:
+            return [(n, v) for n, v in enumerate(values) if v > hi]
+        if hi is None:
+            return [(n, v) for n, v in enumerate(values) if v < lo]
+        return [(n, v) for n, v in enumerate(values) if v > hi or v < lo]
+    return check
+
+
+def _one_of(validator):
+    if not validator.set_of_values:
+        return _not_none
+    try:
+        allowed = set(validator.set_of_values)
+    except TypeError:
+        return None
+    numeric = [v for v in allowed if _number(v)]
+    def check(values):
+        numpy = _numeric_array(values)
+        if numpy is not None and len(numeric) == len(allowed):
+            mask = ~numpy.in1d(values, numeric)
+            return [(n, values[n]) for n in numpy.flatnonzero(mask).tolist()]
+        return [(n, v) for n, v in enumerate(values) if v is not None and
+                (tuple(v) if isinstance(v, list) else v) not in allowed]
+    return check
+
+
+def _not_none(values):
+    return [(n, v) for n, v in enumerate(values) if v is not None]
+
+
+def _length(validator):
+    lo, hi = validator.min, validator.max
+    if lo is None and hi is None:
+        return _check_none
+    def check(values):
+        # Numbers have no length so the validator must see every one of them
+        # to fail in the same way.
+        if _numeric_array(values) is not None:
+            return list(enumerate(values))
+        if lo is None:
+            return [(n, v) for n, v in enumerate(values)
+                    if v is not None and len(v) > hi]
+        if hi is None:
+            return [(n, v) for n, v in enumerate(values)
+                    if v is not None and len(v) < lo]
+        return [(n, v) for n, v in enumerate(values)
+                if v is not None and (len(v) > hi or len(v) < lo)]
+    return check
+
+
+def _all(validator):
+    checks = [batch_check(v) for v in validator.validators]
+    if None in checks:
+        return None
+    def check(values):
+        if not isinstance(values, (list, tuple)) and \
+                _numeric_array(values) is None:
+            # Each check makes its own pass so iterate once only.
+            values = list(values)
+        found = {}
+        for c in checks:
+            found.update(c(values))
+        return sorted(found.items())
+    return check
+
+
+_factories = {
+    validatish.Required: _required,
+    validatish.Range: _range,
+    validatish.OneOf: _one_of,
+    validatish.Length: _length,
+    validatish.All: _all,
+    }
@@ -24,7 +24,8 @@ Schemaish is a simple schema library that allow the construction and validation
       author_email='developers@ish.io',
       url='http://schema.ish.io',
       license='BSD',
-      packages=find_packages(exclude=['ez_setup', 'examples', 'tests']),
+      packages=find_packages(exclude=['ez_setup', 'examples', 'tests',
+                                      'benchmarks', 'benchmarks.*']),
       include_package_data=True,
       zip_safe=False,
       install_requires=[